@@ -0,0 +1,88 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import torch
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on; a pinned prefork worker sees only its own share"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class PoolSaturated(Exception):
+    """Raised when the inference pool has no free worker or queue slot"""
+    pass
+
+
+class InferencePool:
+    """Bounded thread pool that keeps blocking torch/OpenCV/PIL work off the event loop
+
+    At most ``max_workers + max_queue`` requests are admitted at once; anything
+    beyond that is rejected immediately with PoolSaturated so the API can
+    answer 503 instead of letting latency pile up. Each worker thread limits
+    torch's intra-op parallelism to ``threads_per_worker`` so that N workers
+    running forward passes side by side do not oversubscribe the cores.
+    """
+    def __init__(self, max_workers: int = None, max_queue: int = 16, threads_per_worker: int = None):
+        cpu_count = available_cpus()
+        self.max_workers = max(1, max_workers or min(4, cpu_count))
+        self.max_queue = max(0, max_queue)
+        self.threads_per_worker = max(1, threads_per_worker or cpu_count // self.max_workers)
+        self.capacity = self.max_workers + self.max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix="inference",
+            initializer=self._init_worker
+        )
+
+    def _init_worker(self):
+        torch.set_num_threads(self.threads_per_worker)
+
+    @property
+    def pending(self) -> int:
+        """Number of admitted requests that are running or waiting for a worker"""
+        return self._pending
+
+    def acquire(self):
+        """Reserve a slot for one request, failing fast when the pool is full"""
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise PoolSaturated(f"Inference queue is full ({self.capacity} requests pending)")
+            self._pending += 1
+
+    def release(self):
+        with self._lock:
+            self._pending -= 1
+
+    @asynccontextmanager
+    async def admit(self):
+        """Hold a slot for the duration of a request"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run a blocking callable on a pool worker and await its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_info(self):
+        return {
+            "workers": self.max_workers,
+            "threads_per_worker": self.threads_per_worker,
+            "capacity": self.capacity,
+            "pending": self._pending
+        }
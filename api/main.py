@@ -1,16 +1,44 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+import time
+
+# Start of module import, for the startup-time breakdown logged once the default model is ready
+_IMPORT_START = time.perf_counter()
+
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import cv2
 import numpy as np
+import torch
 from typing import Optional, List
-import base64
-import io
-from PIL import Image
 import asyncio
+import hashlib
+import itertools
+import json
 import logging
+import os
+import shutil
+import sys
+import tempfile
+from contextlib import asynccontextmanager
 
+# Make the shared ``src`` package importable when running ``python api/main.py``
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from metrics import CACHE_EVENTS, FRAMES, QUEUE_DEPTH, REGISTRY, STAGE_SECONDS, MetricsMiddleware
+from model_registry import ModelRegistry, ModelUnavailable, UnknownModel
 from model_service import ModelService
+from inference_pool import InferencePool, PoolSaturated
+from prediction_cache import PredictionCache
+from video_results import DEGREES_PER_UNIT, VIDEO_FORMATS, VideoPredictions
+from video_jobs import FINISHED_STATES, COMPLETED, RUNNING, JobCancelled, VideoJobQueue
+from src.pipeline.gating import DEFAULT_MAX_SKIP, DEFAULT_THRESHOLD, FrameGate
+from src.pipeline.streams import StreamManager
+from src.pipeline.video_pipeline import FrameSampler, VideoPipeline
+
+IMPORT_SECONDS = time.perf_counter() - _IMPORT_START
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,29 +59,256 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+# Uploads are copied to disk in chunks of this size instead of being read into memory
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Number of frame predictions produced per pool round-trip when streaming
+STREAM_CHUNK_FRAMES = 16
+# Upper bound on frames accepted by one /api/predict/binary request
+MAX_FRAMES_PER_REQUEST = 64
+# Upper bound on throttle x speed grid points per /api/predict-sweep request
+MAX_SWEEP_POINTS = 4096
+# Frames per forward pass when scoring uploaded videos
+VIDEO_BATCH_SIZE = int(os.environ.get("STEERING_VIDEO_BATCH_SIZE", "8"))
+
+# Checkpoints: the default model plus optional extra "name=path" pairs
+DEFAULT_MODEL = os.environ.get("STEERING_DEFAULT_MODEL", "default")
+DEFAULT_MODEL_PATH = os.environ.get("STEERING_MODEL_PATH", os.path.join("data", "steering_model_v2.pth"))
+# /api/models/{name}/load only accepts checkpoint paths inside this directory
+MODEL_DIR = os.path.abspath(os.environ.get("STEERING_MODEL_DIR", os.path.dirname(DEFAULT_MODEL_PATH) or "."))
+
+# Dummy forward passes run before a model reports ready, as comma-separated batch sizes
+# ("max" is STEERING_MAX_BATCH_SIZE; empty disables warmup), each repeated STEERING_WARMUP_ITERATIONS times
+WARMUP_BATCH_SIZES = os.environ.get("STEERING_WARMUP_BATCH_SIZES", "1,max")
+WARMUP_ITERATIONS = int(os.environ.get("STEERING_WARMUP_ITERATIONS", "1"))
+
+# Background video jobs: upload and result store, concurrent jobs, frames per checkpoint
+JOB_DIR = os.environ.get("STEERING_JOB_DIR", os.path.join(tempfile.gettempdir(), "steering-jobs"))
+MAX_VIDEO_JOBS = int(os.environ.get("STEERING_VIDEO_JOBS", "1"))
+JOB_CHECKPOINT_FRAMES = int(os.environ.get("STEERING_JOB_CHECKPOINT_FRAMES", "64"))
+# Seconds between progress events on /api/jobs/{job_id}/events
+JOB_EVENT_INTERVAL = 0.5
+
+# Live sources scored server-side by /api/streams, sharing batched forward passes of the default model.
+# The server opens the sources itself, so the endpoints are off unless STEERING_MAX_STREAMS is set;
+# file sources must be inside STEERING_STREAM_DIR
+MAX_LIVE_STREAMS = int(os.environ.get("STEERING_MAX_STREAMS", "0"))
+STREAM_BATCH_SIZE = int(os.environ.get("STEERING_STREAM_BATCH_SIZE", "8"))
+STREAM_DIR = os.path.abspath(os.environ.get("STEERING_STREAM_DIR", "."))
+STREAM_URL_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https")
+# Seconds /api/streams/events waits for results before checking the connection again
+STREAM_EVENT_WAIT = 0.5
+
+# Global model registry and the worker pool that runs blocking inference work
+model_registry = None
+inference_pool = None
+video_jobs = None
+stream_manager = None
+# Services loaded by preload_model() before forking, adopted by the first load of their name
+_preloaded = {}
+# Seconds spent on imports and on each step of loading the default model at startup
+startup_timings = {}
+# Whole-video results keyed by upload digest and scoring parameters
+video_cache = PredictionCache(
+    int(os.environ.get("STEERING_VIDEO_CACHE_SIZE", "8")),
+    float(os.environ.get("STEERING_CACHE_TTL", "300"))
+)
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request: Request, exc: PoolSaturated):
+    """Shed load quickly instead of queueing more work behind a full pool"""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(UnknownModel)
+async def unknown_model_handler(request: Request, exc: UnknownModel):
+    return JSONResponse(status_code=404, content={"detail": str(exc)})
 
-# Global model service
-model_service = None
+@app.exception_handler(ModelUnavailable)
+async def model_unavailable_handler(request: Request, exc: ModelUnavailable):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+def _build_service(name: str, path: str) -> ModelService:
+    return ModelService(
+        model_path=path,
+        max_batch_size=int(os.environ.get("STEERING_MAX_BATCH_SIZE", "16")),
+        max_wait_ms=float(os.environ.get("STEERING_MAX_WAIT_MS", "5")),
+        cache_size=int(os.environ.get("STEERING_CACHE_SIZE", "1024")),
+        cache_ttl=float(os.environ.get("STEERING_CACHE_TTL", "300")),
+        runtime=os.environ.get("STEERING_RUNTIME", "eager"),
+        calibration_video=os.environ.get("STEERING_CALIBRATION_VIDEO",
+                                         os.path.join(ROOT_DIR, "assets", "solidWhiteRight.mp4")),
+        name=name
+    )
+
+def preload_model(name: str = None, path: str = None) -> ModelService:
+    """Load a model in the current process before worker processes are forked
+
+    Used by ``prefork``: the weights are moved to shared memory so every
+    forked worker serves the same copy, and the workers' startup adopts the
+    loaded service instead of reading the checkpoint again. Warmup and the
+    batching threads are left to each worker, since threads do not survive
+    a fork.
+    """
+    name = name or DEFAULT_MODEL
+    path = path or DEFAULT_MODEL_PATH
+    service = _build_service(name, path)
+    if not service.load_model():
+        raise RuntimeError(f"Failed to load checkpoint {path}")
+    service.share_memory()
+    _preloaded[name] = service
+    return service
+
+def _load_service(name: str, path: str) -> ModelService:
+    """Registry loader: build, load, warm up and start a ModelService for one checkpoint"""
+    service = _preloaded.pop(name, None)
+    if service is None or service.model_path != path:
+        service = _build_service(name, path)
+        if not service.load_model():
+            raise RuntimeError(f"Failed to load checkpoint {path}")
+    batch_sizes = _warmup_batch_sizes(service.max_batch_size)
+    if batch_sizes and WARMUP_ITERATIONS > 0:
+        service.warmup(batch_sizes, WARMUP_ITERATIONS)
+    service.start_batching(num_threads=inference_pool.threads_per_worker)
+    logger.info(f"Model {name} ready: " + ", ".join(
+        f"{step} {seconds:.3f}s" for step, seconds in service.load_timings.items()))
+    return service
+
+def _warmup_batch_sizes(max_batch_size: int) -> tuple:
+    sizes = []
+    for entry in WARMUP_BATCH_SIZES.split(","):
+        entry = entry.strip()
+        if entry:
+            sizes.append(max_batch_size if entry == "max" else int(entry))
+    return tuple(dict.fromkeys(size for size in sizes if size > 0))
+
+def _model_catalog() -> dict:
+    """The default checkpoint plus STEERING_MODELS, a comma-separated list of name=path pairs"""
+    catalog = {DEFAULT_MODEL: DEFAULT_MODEL_PATH}
+    for entry in os.environ.get("STEERING_MODELS", "").split(","):
+        if entry.strip():
+            name, _, path = entry.partition("=")
+            catalog[name.strip()] = path.strip()
+    return catalog
 
 @app.on_event("startup")
 async def startup_event():
-    """Load model on startup"""
-    global model_service
+    """Start loading the default model; other models load on first use
+
+    The load runs in the background so the server answers right away;
+    ``/api/health`` reports ``starting`` until the model is loaded and warmed
+    up, and requests that arrive earlier wait for it.
+    """
+    global model_registry, inference_pool, video_jobs, startup_timings
+    startup_start = time.perf_counter()
+    inference_pool = InferencePool(
+        max_workers=int(os.environ.get("STEERING_INFERENCE_WORKERS", "0")) or None,
+        max_queue=int(os.environ.get("STEERING_MAX_QUEUE", "16"))
+    )
+    model_registry = ModelRegistry(_load_service, DEFAULT_MODEL, int(os.environ.get("STEERING_MAX_MODELS", "2")))
+    for name, path in _model_catalog().items():
+        model_registry.register(name, path)
+    QUEUE_DEPTH.set_function(_queue_depths)
+    CACHE_EVENTS.set_function(_cache_events)
+    startup_timings = {"imports": IMPORT_SECONDS}
+
+    def log_startup(future):
+        if future.exception() is not None:
+            logger.error(f"Failed to load model on startup: {future.exception()}")
+            return
+        startup_timings.update(future.result().load_timings)
+        startup_timings["ready_after_startup"] = time.perf_counter() - startup_start
+        logger.info("Startup: " + ", ".join(f"{step} {seconds:.3f}s" for step, seconds in startup_timings.items()))
+    model_registry.load(DEFAULT_MODEL).add_done_callback(log_startup)
+    video_jobs = VideoJobQueue(JOB_DIR, _run_video_job, MAX_VIDEO_JOBS, JOB_CHECKPOINT_FRAMES,
+                               threads_per_job=inference_pool.threads_per_worker)
+    resumed = video_jobs.resume_unfinished()
+    if resumed:
+        logger.info(f"Resuming {resumed} unfinished video jobs")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Checkpoint running video jobs and stop live streams, then every model's batching scheduler and the worker pool"""
+    if video_jobs is not None:
+        video_jobs.shutdown()
+    if stream_manager is not None:
+        stream_manager.close()
+    if model_registry is not None:
+        model_registry.shutdown()
+    if inference_pool is not None:
+        inference_pool.shutdown()
+
+async def _acquire_model(name: Optional[str]) -> ModelService:
+    """Lease a model from the registry, waiting for it to load if it is not resident"""
+    service = model_registry.acquire(name)
+    while service is None:
+        await asyncio.wrap_future(model_registry.ensure_loaded(name))
+        service = model_registry.acquire(name)
+    return service
+
+@asynccontextmanager
+async def _leased_model(name: Optional[str]):
+    """Hold a model for the duration of a request so a hot swap cannot stop it underneath"""
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Model service not initialized")
+    service = await _acquire_model(name)
     try:
-        model_service = ModelService()
-        success = model_service.load_model()
-        if not success:
-            logger.error("Failed to load model on startup")
-        else:
-            logger.info("Model loaded successfully on startup")
-    except Exception as e:
-        logger.error(f"Error during startup: {e}")
+        yield service
+    finally:
+        model_registry.release(service)
+
+def _queue_depths():
+    depths = {("inference_pool", ""): inference_pool.pending if inference_pool is not None else 0}
+    if model_registry is not None:
+        for name, service in model_registry.resident().items():
+            depths[("batch_scheduler", name)] = service.queue_depth
+    return depths
+
+def _cache_events():
+    caches = {("videos", ""): video_cache}
+    if model_registry is not None:
+        for name, service in model_registry.resident().items():
+            caches[("frames", name)] = service.cache
+            caches[("embeddings", name)] = service.embedding_cache
+    return {
+        (cache_name, model, event): getattr(cache, event)
+        for (cache_name, model), cache in caches.items()
+        for event in ("hits", "misses", "evictions", "expirations")
+    }
+
+def _json_response(model: BaseModel, status_code: int = 200) -> Response:
+    """Serialize a response model once, timed as the ``serialize`` stage
+
+    Returning a Response directly also skips FastAPI's second validation pass
+    over the response_model, which is noticeable for long video results.
+    """
+    with STAGE_SECONDS.time(stage="serialize"):
+        body = model.model_dump_json() if hasattr(model, "model_dump_json") else model.json()
+    return Response(body, status_code=status_code, media_type="application/json")
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that calls ``on_close`` however the response ends
+
+    The body generator's own ``finally`` is not enough: when the client
+    disconnects before the body is started, the generator never runs and
+    its ``finally`` never executes.
+    """
+    def __init__(self, content, on_close, **kwargs):
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
 
 # Request/Response models
 class PredictionRequest(BaseModel):
     image: str  # base64 encoded image
     throttle: Optional[float] = 0.5
     speed: Optional[float] = 20.0
+    model: Optional[str] = None  # registry name; the default model if omitted
 
 class PredictionResponse(BaseModel):
     steering_angle: float
@@ -61,6 +316,24 @@ class PredictionResponse(BaseModel):
     throttle: float
     speed: float
     device: str
+    model: Optional[str] = None  # "name:version" that produced the prediction
+
+class SweepRequest(BaseModel):
+    image: str  # base64 encoded image
+    throttles: List[float]
+    speeds: List[float]
+    model: Optional[str] = None
+
+class SweepResponse(BaseModel):
+    throttles: List[float]
+    speeds: List[float]
+    steering_angles: List[List[float]]  # [throttle index][speed index]
+    steering_angles_degrees: List[List[float]]
+    embedding_cached: bool
+    device: str
+
+class BatchPredictionResponse(BaseModel):
+    predictions: List[PredictionResponse]
 
 class VideoPredictionRequest(BaseModel):
     throttle: Optional[float] = 0.5
@@ -70,125 +343,952 @@ class VideoPredictionResponse(BaseModel):
     predictions: List[dict]
     total_frames: int
     fps: float
+    scored_frames: int = 0  # frames actually run through the model (see sampling)
+    sampling: Optional[dict] = None
+    cached: bool = False  # served from the video result cache
+    stats: Optional[dict] = None  # per-stage frames/sec of the scoring pipeline
+
+class StreamRequest(BaseModel):
+    source: str  # camera index, rtsp/rtmp/http(s) URL or video file inside STEERING_STREAM_DIR
+    stream_id: Optional[str] = None
+    max_fps: Optional[float] = None
+    throttle: float = 0.5
+    speed: float = 20.0
+    loop: bool = False  # restart a file source when it ends
+    gate_threshold: Optional[float] = None
+    gate_max_skip: int = DEFAULT_MAX_SKIP
+    gate_smoothing: float = 0.0
 
 class HealthResponse(BaseModel):
-    status: str
+    status: str  # starting, healthy or unhealthy
     model_loaded: bool
     device: str
     cuda_available: bool
+    startup_seconds: dict = {}
+
+class LoadModelRequest(BaseModel):
+    path: Optional[str] = None  # new checkpoint, relative to the model directory; reloads the current one if omitted
 
 @app.get("/api/health", response_model=HealthResponse)
 async def health_check():
-    """Health check endpoint"""
-    if model_service is None:
+    """Readiness check: 200 once the default model is loaded and warmed up, 503 before that"""
+    if model_registry is None:
         raise HTTPException(status_code=503, detail="Model service not initialized")
     
-    info = model_service.get_model_info()
-    return HealthResponse(
-        status="healthy" if info["model_loaded"] else "unhealthy",
-        model_loaded=info["model_loaded"],
-        device=info["device"],
-        cuda_available=info["cuda_available"]
+    # The registry only installs a service after its warmup, so resident means ready
+    service = model_registry.resident().get(model_registry.default_model)
+    model_loaded = service is not None and service.model is not None
+    if model_loaded:
+        status = "healthy"
+    else:
+        status = "starting" if model_registry.is_loading() else "unhealthy"
+    response = HealthResponse(
+        status=status,
+        model_loaded=model_loaded,
+        device=str(service.device) if service is not None else "unknown",
+        cuda_available=torch.cuda.is_available(),
+        startup_seconds={step: round(seconds, 3) for step, seconds in startup_timings.items()}
     )
+    return _json_response(response, 200 if model_loaded else 503)
+
+def _log_load_result(future):
+    if future.exception() is not None:
+        logger.error(str(future.exception()))
+    else:
+        service = future.result()
+        logger.info(f"Model {service.name}:{service.version} is now serving from {service.model_path}")
+
+@app.get("/api/models")
+async def list_models():
+    """Registered models with their residency, version and load state"""
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Model service not initialized")
+    return model_registry.get_info()
+
+@app.post("/api/models/{name}/load", status_code=202)
+async def reload_model(name: str, request: Optional[LoadModelRequest] = None):
+    """Load or reload a model in the background and swap it in once it is warmed up
+
+    Requests keep being served by the current version until the swap. Pass
+    ``path`` to register a new name or point an existing one at a different
+    checkpoint inside the model directory.
+    """
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Model service not initialized")
+    path = None
+    if request is not None and request.path:
+        path = os.path.abspath(os.path.join(MODEL_DIR, request.path))
+        if os.path.commonpath([path, MODEL_DIR]) != MODEL_DIR:
+            raise HTTPException(status_code=400, detail="Checkpoint path must be inside the model directory")
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=400, detail=f"No checkpoint at {request.path}")
+    model_registry.load(name, path).add_done_callback(_log_load_result)
+    return {"name": name, "status": "loading"}
 
 @app.post("/api/predict", response_model=PredictionResponse)
 async def predict_steering(request: PredictionRequest):
     """Predict steering angle from base64 encoded image"""
-    if model_service is None or model_service.model is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
-    
+    async with inference_pool.admit(), _leased_model(request.model) as service:
+        try:
+            # Decode on a pool worker, then let the batch scheduler coalesce concurrent requests
+            future = await inference_pool.run(
+                service.submit_base64, request.image, request.throttle, request.speed
+            )
+            result = await asyncio.wrap_future(future)
+            return _json_response(PredictionResponse(**result))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Unexpected error in prediction: {e}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+def _sweep_base64(service: ModelService, image_base64: str, throttles: List[float], speeds: List[float]) -> dict:
     try:
-        result = model_service.predict_from_base64(
-            image_base64=request.image,
-            throttle=request.throttle,
-            speed=request.speed
-        )
-        return PredictionResponse(**result)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+        image_np = service.decode_base64(image_base64)
     except Exception as e:
-        logger.error(f"Unexpected error in prediction: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
+        raise ValueError(f"Error processing image: {e}")
+    return service.sweep(image_np, throttles, speeds, bgr=False)
+
+@app.post("/api/predict-sweep", response_model=SweepResponse)
+async def predict_sweep(request: SweepRequest):
+    """Steering curve over a throttle x speed grid for one image
+
+    The backbone runs once per distinct image (its embedding is cached) and
+    only the small head is evaluated for every grid point, in one batch.
+    """
+    if not request.throttles or not request.speeds:
+        raise HTTPException(status_code=400, detail="throttles and speeds must not be empty")
+    if len(request.throttles) * len(request.speeds) > MAX_SWEEP_POINTS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SWEEP_POINTS} grid points per request")
+    
+    async with inference_pool.admit(), _leased_model(request.model) as service:
+        try:
+            result = await inference_pool.run(_sweep_base64, service, request.image, request.throttles, request.speeds)
+            return SweepResponse(**result)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Unexpected error in sweep: {e}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+def _submit_encoded(service: ModelService, payloads: List[bytes], throttle: float, speed: float):
+    """Decode JPEG/PNG payloads into BGR arrays and queue them as one batch"""
+    frames = [service.decode_image_bytes(data) for data in payloads]
+    return service.submit_frames(frames, throttle, speed, bgr=True)
+
+def _submit_raw(service: ModelService, body: bytearray, width: int, height: int, count: Optional[int],
+                pixel_format: str, throttle: float, speed: float):
+    """Queue packed raw frames straight from the request body"""
+    if pixel_format not in ("rgb", "bgr"):
+        raise ValueError("X-Pixel-Format must be 'rgb' or 'bgr'")
+    frames = service.decode_raw_frames(body, width, height, count)
+    if len(frames) > MAX_FRAMES_PER_REQUEST:
+        raise ValueError(f"At most {MAX_FRAMES_PER_REQUEST} frames per request")
+    return service.submit_frames(list(frames), throttle, speed, bgr=pixel_format == "bgr")
+
+async def _read_body(request: Request) -> bytearray:
+    """The request body in a writable buffer, so raw frames can be viewed in place"""
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+    return body
+
+def _int_header(request: Request, name: str, required: bool = True) -> Optional[int]:
+    value = request.headers.get(name)
+    if value is None:
+        if required:
+            raise ValueError(f"Missing {name} header")
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+@app.post("/api/predict/binary", response_model=BatchPredictionResponse)
+async def predict_steering_binary(request: Request, throttle: float = 0.5, speed: float = 20.0,
+                                  model: Optional[str] = None):
+    """Predict steering angles from raw image bytes, one prediction per frame
+
+    Accepts any of these request bodies (throttle, speed and model are query parameters):
+
+    - ``image/jpeg``, ``image/png``, ...: a single encoded image
+    - ``multipart/form-data``: one encoded image per file part
+    - ``application/octet-stream``: packed uint8 HxWx3 frames described by the
+      ``X-Frame-Width``, ``X-Frame-Height``, optional ``X-Frame-Count`` and
+      ``X-Pixel-Format`` (``rgb`` by default, or ``bgr``) headers
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if not (content_type.startswith("image/") or content_type in ("multipart/form-data", "application/octet-stream")):
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type or 'none'}")
+    
+    async with inference_pool.admit(), _leased_model(model) as service:
+        try:
+            if content_type == "application/octet-stream":
+                body = await _read_body(request)
+                futures = await inference_pool.run(
+                    _submit_raw, service, body,
+                    _int_header(request, "X-Frame-Width"), _int_header(request, "X-Frame-Height"),
+                    _int_header(request, "X-Frame-Count", required=False),
+                    request.headers.get("X-Pixel-Format", "rgb").lower(),
+                    throttle, speed
+                )
+            else:
+                if content_type == "multipart/form-data":
+                    form = await request.form()
+                    payloads = [await item.read() for _, item in form.multi_items() if not isinstance(item, str)]
+                else:
+                    payloads = [await request.body()]
+                if not payloads:
+                    raise ValueError("No images in request")
+                if len(payloads) > MAX_FRAMES_PER_REQUEST:
+                    raise ValueError(f"At most {MAX_FRAMES_PER_REQUEST} frames per request")
+                futures = await inference_pool.run(_submit_encoded, service, payloads, throttle, speed)
+            
+            # Each frame goes through the batch scheduler so it can share a forward pass with other requests
+            results = await asyncio.gather(*(asyncio.wrap_future(future) for future in futures))
+            return _json_response(BatchPredictionResponse(predictions=[PredictionResponse(**result) for result in results]))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Unexpected error in binary prediction: {e}")
+            raise HTTPException(status_code=500, detail="Internal server error")
+
+def _spool_upload(file: UploadFile, directory: str = None):
+    """Copy an upload to a unique temporary file (in ``directory`` if given) in fixed-size chunks
+
+    Returns the file path and the SHA-256 digest of its content, computed on the way.
+    """
+    suffix = os.path.splitext(file.filename or "")[1]
+    fd, temp_path = tempfile.mkstemp(prefix="steering-", suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+    except Exception:
+        _remove_file(temp_path)
+        raise
+    return temp_path, digest.hexdigest()
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def _open_video(path: str):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        cap.release()
+        raise ValueError("Could not open video file")
+    return cap
+
+def _video_pipeline(service: ModelService, cap, throttle: float, speed: float, sampling: dict,
+                    resume_after: Optional[int] = None, gate: Optional[dict] = None) -> VideoPipeline:
+    try:
+        sampler = FrameSampler.from_times(cap.get(cv2.CAP_PROP_FPS), **sampling)
+        frame_gate = FrameGate(**gate) if gate else None
+    except ValueError:
+        cap.release()
+        raise
+    if resume_after is not None:
+        sampler = sampler.resume_after(resume_after)
+    return VideoPipeline(
+        service.model, service.device, cap,
+        service.preprocessor,
+        batch_size=VIDEO_BATCH_SIZE, throttle=throttle, speed=speed, sampler=sampler, gate=frame_gate
+    )
+
+def _prediction_record(frame: int, timestamp: float, steering_angle: Optional[float], error: Optional[str],
+                       throttle: float, speed: float) -> dict:
+    if error is not None:
+        return {"frame": frame, "timestamp": timestamp, "error": error}
+    return {
+        "frame": frame,
+        "timestamp": timestamp,
+        "steering_angle": steering_angle,
+        "steering_angle_degrees": steering_angle * DEGREES_PER_UNIT,
+        "throttle": throttle,
+        "speed": speed
+    }
+
+def _iter_video_predictions(pipeline: VideoPipeline, throttle: float, speed: float):
+    """Yield a prediction dict per frame as the pipeline scores them"""
+    for result in pipeline:
+        if result.error is not None:
+            logger.warning(f"Error processing frame {result.index}: {result.error}")
+        yield _prediction_record(result.index, result.timestamp, result.steering_angle, result.error, throttle, speed)
+    _record_video_stats(pipeline)
+
+def _record_video_stats(pipeline: VideoPipeline):
+    stats = pipeline.stats
+    FRAMES.inc(stats.inference.frames, source="video")
+    for stage in (stats.decode, stats.preprocess, stats.inference):
+        STAGE_SECONDS.observe(stage.busy_seconds, stage=f"video_{stage.name}")
+
+def _score_video(service: ModelService, temp_path: str, throttle: float, speed: float, sampling: dict,
+                 gate: Optional[dict] = None):
+    """Blocking video scoring; runs on an inference pool worker"""
+    pipeline = _video_pipeline(service, _open_video(temp_path), throttle, speed, sampling, gate=gate)
+    predictions = VideoPredictions(throttle, speed)
+    for result in pipeline:
+        if result.error is not None:
+            logger.warning(f"Error processing frame {result.index}: {result.error}")
+        predictions.add(result.index, result.timestamp, result.steering_angle, result.error)
+    _record_video_stats(pipeline)
+    return predictions, pipeline
+
+def _video_response(result: dict, format: str, cached: bool = False) -> Response:
+    """Render a scored video in the requested format, timed as the ``serialize`` stage
+
+    ``records`` is the VideoPredictionResponse list of per-frame dicts;
+    ``columnar`` sends throttle/speed once and one JSON array per column;
+    ``npz`` is a NumPy archive of the same columns with the rest as JSON in ``meta``.
+    """
+    predictions = result["predictions"]
+    if format == "records":
+        return _json_response(VideoPredictionResponse(**dict(result, predictions=predictions.records()), cached=cached))
+    meta = {name: value for name, value in result.items() if name != "predictions"}
+    meta["cached"] = cached
+    with STAGE_SECONDS.time(stage="serialize"):
+        if format == "columnar":
+            return Response(predictions.to_columnar_json(meta), media_type="application/json")
+        return Response(predictions.to_npz(meta), media_type="application/octet-stream",
+                        headers={"Content-Disposition": 'attachment; filename="predictions.npz"'})
+
+def _check_video_format(format: str):
+    if format not in VIDEO_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(VIDEO_FORMATS)}")
+
+def _sampling_params(stride: int, target_fps: Optional[float], start_time: Optional[float], end_time: Optional[float]):
+    return {"stride": stride, "target_fps": target_fps, "start_time": start_time, "end_time": end_time}
+
+def _gate_params(threshold: Optional[float], max_skip: int, smoothing: float) -> Optional[dict]:
+    """FrameGate settings of a request, or None when gating is off; raises ValueError if they are invalid"""
+    FrameGate(DEFAULT_THRESHOLD if threshold is None else threshold, max_skip, smoothing)
+    if threshold is None:
+        return None
+    return {"threshold": threshold, "max_skip": max_skip, "smoothing": smoothing}
+
+def _next_chunk(iterator, size: int):
+    return list(itertools.islice(iterator, size))
 
 @app.post("/api/predict-video", response_model=VideoPredictionResponse)
 async def predict_video(
     file: UploadFile = File(...),
     throttle: float = 0.5,
-    speed: float = 20.0
+    speed: float = 20.0,
+    stride: int = 1,
+    target_fps: Optional[float] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    model: Optional[str] = None,
+    format: str = "records",
+    gate_threshold: Optional[float] = None,
+    gate_max_skip: int = DEFAULT_MAX_SKIP,
+    gate_smoothing: float = 0.0
 ):
-    """Process video file and return predictions for each frame"""
-    if model_service is None or model_service.model is None:
-        raise HTTPException(status_code=503, detail="Model not loaded")
+    """Process video file and return predictions for the sampled frames
+
+    Frames are scored every ``stride`` frames (or at about ``target_fps``)
+    within the optional ``[start_time, end_time)`` window in seconds. Skipped
+    frames are grabbed or seeked over without being decoded for inference.
+    ``format`` is ``records`` (one object per frame), ``columnar`` (JSON
+    arrays) or ``npz`` (binary NumPy archive); see ``_video_response``.
+
+    With ``gate_threshold`` set, frames whose downsampled difference from
+    the last scored frame stays below it reuse that frame's prediction, for
+    at most ``gate_max_skip`` frames in a row; ``gate_smoothing`` (0-1)
+    blends each new prediction with the previous one. ``stats.gating``
+    reports the share of frames that skipped the model.
+    """
+    _check_video_format(format)
+    async with inference_pool.admit(), _leased_model(model) as service:
+        temp_path = None
+        try:
+            gate = _gate_params(gate_threshold, gate_max_skip, gate_smoothing)
+            temp_path, digest = await inference_pool.run(_spool_upload, file)
+            sampling = _sampling_params(stride, target_fps, start_time, end_time)
+            cache_key = repr((digest, throttle, speed, sorted(sampling.items()), sorted((gate or {}).items()),
+                              service.name, service.version))
+            cached = video_cache.get(cache_key)
+            if cached is not None:
+                return _video_response(cached, format, cached=True)
+            
+            predictions, pipeline = await inference_pool.run(_score_video, service, temp_path, throttle, speed,
+                                                             sampling, gate)
+            stats = pipeline.stats.as_dict()
+            logger.info(f"Scored {len(predictions)} frames: {stats}")
+            
+            response = {
+                "predictions": predictions,
+                "total_frames": pipeline.total_frames,
+                "fps": pipeline.fps,
+                "scored_frames": len(predictions),
+                "sampling": pipeline.sampler.as_dict(),
+                "stats": stats
+            }
+            video_cache.put(cache_key, response)
+            return _video_response(response, format)
+        
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"Error processing video: {e}")
+            raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+        finally:
+            if temp_path is not None:
+                _remove_file(temp_path)
+
+@app.post("/api/predict-video/stream")
+async def predict_video_stream(
+    file: UploadFile = File(...),
+    throttle: float = 0.5,
+    speed: float = 20.0,
+    stride: int = 1,
+    target_fps: Optional[float] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    format: str = "ndjson",
+    model: Optional[str] = None,
+    gate_threshold: Optional[float] = None,
+    gate_max_skip: int = DEFAULT_MAX_SKIP,
+    gate_smoothing: float = 0.0
+):
+    """Process a video file and stream predictions back while decoding
+
+    Emits one JSON object per line (``format=ndjson``) or per Server-Sent
+    Event (``format=sse``): a ``meta`` record with the video properties,
+    one ``prediction`` record per scored frame and a final ``summary``
+    record. Sampling and gating parameters are the same as for ``/api/predict-video``.
+    Neither the upload nor the result set is held in memory.
+    """
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Model service not initialized")
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'sse'")
     
+    # The slot and the model lease are held until the stream finishes, so streams count against the pool limit
+    inference_pool.acquire()
+    service = None
+    temp_path = None
     try:
-        # Read video file
-        video_content = await file.read()
-        
-        # Create temporary file for OpenCV
-        temp_path = f"/tmp/{file.filename}"
-        with open(temp_path, "wb") as f:
-            f.write(video_content)
-        
-        # Open video with OpenCV
-        cap = cv2.VideoCapture(temp_path)
-        if not cap.isOpened():
-            raise HTTPException(status_code=400, detail="Could not open video file")
-        
-        # Get video properties
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        predictions = []
+        gate = _gate_params(gate_threshold, gate_max_skip, gate_smoothing)
+        service = await _acquire_model(model)
+        temp_path, _ = await inference_pool.run(_spool_upload, file)
+        cap = await inference_pool.run(_open_video, temp_path)
+        pipeline = _video_pipeline(service, cap, throttle, speed,
+                                   _sampling_params(stride, target_fps, start_time, end_time), gate=gate)
+    except Exception as e:
+        inference_pool.release()
+        if service is not None:
+            model_registry.release(service)
+        if isinstance(e, (UnknownModel, ModelUnavailable)):
+            raise
+        if temp_path is not None:
+            _remove_file(temp_path)
+        if isinstance(e, ValueError):
+            raise HTTPException(status_code=400, detail=str(e))
+        logger.error(f"Error processing video: {e}")
+        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+
+    frames = _iter_video_predictions(pipeline, throttle, speed)
+    running = None  # the chunk being scored on a pool worker
+    released = False
+
+    def release():
+        """Free the pool slot, model lease and upload once, after any chunk still running on a worker"""
+        nonlocal released
+        if released:
+            return
+        released = True
+        # Stopping the pipeline makes a running chunk return early
+        pipeline.close()
+
+        def cleanup(task=None):
+            if task is not None and not task.cancelled():
+                task.exception()  # nobody awaits it after a disconnect; retrieve any error here
+            frames.close()
+            inference_pool.release()
+            model_registry.release(service)
+            _remove_file(temp_path)
+
+        if running is not None and not running.done():
+            running.add_done_callback(cleanup)
+        else:
+            cleanup()
+
+    def encode(record: dict) -> str:
+        if format == "sse":
+            return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+        return json.dumps(record) + "\n"
+
+    async def stream():
+        nonlocal running
         frame_count = 0
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
+        try:
+            yield encode({
+                "type": "meta",
+                "fps": pipeline.fps,
+                "total_frames": pipeline.total_frames,
+                "sampling": pipeline.sampler.as_dict()
+            })
+            while True:
+                # Shielded: a client disconnect must not abandon a chunk that is still running on a pool worker
+                running = asyncio.ensure_future(inference_pool.run(_next_chunk, frames, STREAM_CHUNK_FRAMES))
+                chunk = await asyncio.shield(running)
+                if not chunk:
+                    break
+                frame_count += len(chunk)
+                yield "".join(encode({"type": "prediction", **p}) for p in chunk)
+            yield encode({"type": "summary", "scored_frames": frame_count, "stats": pipeline.stats.as_dict()})
+        finally:
+            release()
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    # Also released by the response, in case the client leaves before stream() ever starts
+    return _ClosingStreamingResponse(stream(), release, media_type=media_type)
+
+def _run_video_job(job: dict, resume_after: Optional[int], checkpoint, should_stop) -> dict:
+    """VideoJobQueue worker: score a stored upload from its last checkpoint; runs on a job thread"""
+    params = job["params"]
+    with model_registry.lease(params["model"]) as service:
+        pipeline = _video_pipeline(service, _open_video(job["video_path"]), params["throttle"], params["speed"],
+                                   params["sampling"], resume_after, params.get("gate"))
+        if job["total_frames"] is None:
+            video_jobs.store.update(job["id"], fps=pipeline.fps, total_frames=pipeline.total_frames,
+                                    start_frame=pipeline.sampler.start_frame, end_frame=pipeline.sampler.end_frame)
+        try:
+            for result in pipeline:
+                if should_stop():
+                    raise JobCancelled()
+                checkpoint([(result.index, result.timestamp, result.steering_angle, result.error)])
+        finally:
+            pipeline.close()
+    _record_video_stats(pipeline)
+    return pipeline.stats.as_dict()
+
+def _job_status(job: dict) -> dict:
+    """Public view of a job row with its progress through the sampled frame range"""
+    progress = {"scored_frames": job["scored_frames"], "last_frame": job["last_frame"],
+                "total_frames": job["total_frames"], "fraction": 0.0}
+    if job["status"] == COMPLETED:
+        progress["fraction"] = 1.0
+    elif job["start_frame"] is not None and job["last_frame"] is not None:
+        end_frame = job["end_frame"] if job["end_frame"] is not None else job["total_frames"]
+        if end_frame and end_frame > job["start_frame"]:
+            done = job["last_frame"] + 1 - job["start_frame"]
+            progress["fraction"] = round(min(1.0, done / (end_frame - job["start_frame"])), 4)
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "params": job["params"],
+        "progress": progress,
+        "error": job["error"],
+        "stats": job["stats"]
+    }
+
+def _get_job(job_id: str) -> dict:
+    if video_jobs is None:
+        raise HTTPException(status_code=503, detail="Job queue not initialized")
+    job = video_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'")
+    return job
+
+def _job_predictions(job_id: str, throttle: float, speed: float) -> VideoPredictions:
+    predictions = VideoPredictions(throttle, speed)
+    for row in video_jobs.store.predictions(job_id):
+        predictions.add(*row)
+    return predictions
+
+@app.post("/api/jobs/video", status_code=202)
+async def submit_video_job(
+    file: UploadFile = File(...),
+    throttle: float = 0.5,
+    speed: float = 20.0,
+    stride: int = 1,
+    target_fps: Optional[float] = None,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    model: Optional[str] = None,
+    gate_threshold: Optional[float] = None,
+    gate_max_skip: int = DEFAULT_MAX_SKIP,
+    gate_smoothing: float = 0.0
+):
+    """Queue a video for background scoring and return its job id right away
+
+    Takes the same parameters as ``/api/predict-video``. Poll
+    ``/api/jobs/{job_id}`` or follow ``/api/jobs/{job_id}/events`` for
+    progress, then fetch ``/api/jobs/{job_id}/result``. Results are
+    checkpointed as the job runs, so a job interrupted by a restart resumes
+    after its last checkpointed frame.
+    """
+    if video_jobs is None or model_registry is None:
+        raise HTTPException(status_code=503, detail="Job queue not initialized")
+    if stride < 1:
+        raise HTTPException(status_code=400, detail="stride must be at least 1")
+    try:
+        gate = _gate_params(gate_threshold, gate_max_skip, gate_smoothing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Rejects unknown models up front and starts loading the model while the upload is stored
+    model_registry.ensure_loaded(model)
+    job_id, directory = video_jobs.new_job_dir()
+    try:
+        video_path, _ = await inference_pool.run(_spool_upload, file, directory)
+    except Exception:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+    params = {"throttle": throttle, "speed": speed, "model": model,
+              "sampling": _sampling_params(stride, target_fps, start_time, end_time), "gate": gate}
+    return _job_status(video_jobs.submit(job_id, video_path, params))
+
+@app.get("/api/jobs")
+async def list_jobs(limit: int = 100):
+    """Most recent video jobs first"""
+    if video_jobs is None:
+        raise HTTPException(status_code=503, detail="Job queue not initialized")
+    return {"jobs": [_job_status(job) for job in video_jobs.store.list(limit)]}
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    return _job_status(_get_job(job_id))
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-Sent Events with the job status whenever it changes, ending once the job finishes"""
+    job = _get_job(job_id)
+
+    async def stream():
+        last_update = None
+        current = job
+        while current is not None:
+            if current["updated_at"] != last_update:
+                last_update = current["updated_at"]
+                yield f"event: {current['status']}\ndata: {json.dumps(_job_status(current))}\n\n"
+            if current["status"] in FINISHED_STATES:
                 break
-            
-            # Process frame
+            await asyncio.sleep(JOB_EVENT_INTERVAL)
+            current = video_jobs.store.get(job_id)
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+@app.get("/api/jobs/{job_id}/result", response_model=VideoPredictionResponse)
+async def get_job_result(job_id: str, partial: bool = False, format: str = "records"):
+    """Predictions of a completed job; ``partial=true`` returns what is checkpointed so far
+
+    ``format`` is the same as for ``/api/predict-video``.
+    """
+    _check_video_format(format)
+    job = _get_job(job_id)
+    if job["status"] != COMPLETED and not partial:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; pass partial=true for checkpointed frames")
+    params = job["params"]
+    predictions = await inference_pool.run(_job_predictions, job_id, params["throttle"], params["speed"])
+    return _video_response({
+        "predictions": predictions,
+        "total_frames": job["total_frames"] or 0,
+        "fps": job["fps"] or 0.0,
+        "scored_frames": len(predictions),
+        "sampling": {"stride": params["sampling"]["stride"], "start_frame": job["start_frame"],
+                     "end_frame": job["end_frame"]},
+        "stats": job["stats"]
+    }, format)
+
+
+@app.delete("/api/jobs/{job_id}")
+async def delete_job(job_id: str):
+    """Cancel a queued or running job, or delete a finished one together with its results"""
+    job = _get_job(job_id)
+    if job["status"] not in FINISHED_STATES:
+        status = video_jobs.cancel(job_id)
+        return {"job_id": job_id, "status": "cancelling" if status == RUNNING else status}
+    video_jobs.delete(job_id)
+    return {"job_id": job_id, "status": "deleted"}
+
+def _predict_streams(images: torch.Tensor, features: List[tuple]) -> List[float]:
+    """StreamManager predict function: one batched forward of the default model, leased per batch for hot swaps"""
+    with model_registry.lease() as service:
+        return service.predict_batch(images, features)
+
+def _live_streams() -> StreamManager:
+    """The stream manager, started on first use"""
+    global stream_manager
+    if MAX_LIVE_STREAMS <= 0:
+        raise HTTPException(status_code=503, detail="Live streams are disabled; set STEERING_MAX_STREAMS to enable them")
+    if model_registry is None:
+        raise HTTPException(status_code=503, detail="Model service not initialized")
+    if stream_manager is None:
+        stream_manager = StreamManager(_predict_streams, STREAM_BATCH_SIZE, MAX_LIVE_STREAMS)
+    return stream_manager
+
+def _stream_source(source: str):
+    """Camera index, URL or checked file path that FrameCapture can open"""
+    if source.isdigit():
+        return int(source)
+    scheme = source.split("://", 1)[0].lower() if "://" in source else None
+    if scheme is not None:
+        if scheme not in STREAM_URL_SCHEMES:
+            raise HTTPException(status_code=400, detail=f"Stream URLs must use one of {', '.join(STREAM_URL_SCHEMES)}")
+        return source
+    path = os.path.abspath(os.path.join(STREAM_DIR, source))
+    if os.path.commonpath([path, STREAM_DIR]) != STREAM_DIR:
+        raise HTTPException(status_code=400, detail="Stream files must be inside the stream directory")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=400, detail=f"No video at {source}")
+    return path
+
+@app.post("/api/streams", status_code=201)
+async def add_stream(request: StreamRequest):
+    """Start scoring a live source; its results are published on ``/api/streams/events``
+
+    Every stream is read on its own thread and only its newest frame is
+    kept, so a slow model drops frames instead of falling behind. The
+    newest frames of all streams are scored together in batched forward
+    passes of the default model, visiting the streams round-robin so that
+    each gets a fair share; ``max_fps`` caps how often one stream is scored.
+    """
+    manager = _live_streams()
+    source = _stream_source(request.source)
+    if request.max_fps is not None and request.max_fps <= 0:
+        raise HTTPException(status_code=400, detail="max_fps must be positive")
+    try:
+        gate = _gate_params(request.gate_threshold, request.gate_max_skip, request.gate_smoothing)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if request.stream_id is not None and request.stream_id in manager.stream_ids():
+        raise HTTPException(status_code=409, detail=f"Stream '{request.stream_id}' already exists")
+    if len(manager.stream_ids()) >= MAX_LIVE_STREAMS:
+        raise HTTPException(status_code=503, detail=f"At most {MAX_LIVE_STREAMS} streams can run at once",
+                            headers={"Retry-After": "1"})
+    # Starts loading the default model if a hot swap or eviction left it unloaded
+    model_registry.ensure_loaded()
+    try:
+        stream_id = manager.add_stream(source, request.stream_id, request.max_fps, request.throttle, request.speed,
+                                       loop=request.loop, gate=FrameGate(**gate) if gate else None)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"stream_id": stream_id, **manager.stats()["streams"].get(stream_id, {})}
+
+@app.get("/api/streams")
+async def list_streams():
+    """Per-stream rates, drops and latency plus the aggregate frames/sec and mean batch size"""
+    return _live_streams().stats()
+
+@app.delete("/api/streams/{stream_id}")
+async def remove_stream(stream_id: str):
+    manager = _live_streams()
+    if not await asyncio.get_running_loop().run_in_executor(None, manager.remove_stream, stream_id):
+        raise HTTPException(status_code=404, detail=f"Unknown stream '{stream_id}'")
+    return {"stream_id": stream_id, "status": "removed"}
+
+@app.get("/api/streams/events")
+async def stream_events(streams: Optional[str] = None):
+    """Server-Sent Events with every result of the given comma-separated streams (default: all)
+
+    A client that cannot keep up loses its oldest results, never slowing
+    down the streams or other subscribers.
+    """
+    manager = _live_streams()
+    subscription = manager.subscribe(streams.split(",") if streams else None)
+
+    async def events():
+        # Closed by the manager on shutdown
+        while not subscription.closed:
+            for result in await subscription.drain_async(STREAM_EVENT_WAIT):
+                yield f"event: prediction\ndata: {json.dumps(result.as_dict())}\n\n"
+
+    # Unsubscribed when the response ends, even if the client left before the first event
+    return _ClosingStreamingResponse(events(), subscription.close, media_type="text/event-stream")
+
+def _submit_encoded_frame(service: ModelService, payload: bytes, throttle: float, speed: float,
+                          gate: Optional[FrameGate] = None):
+    """Decode and submit a frame, or return None if ``gate`` says it can reuse the last prediction"""
+    image = service.decode_image_bytes(payload)
+    if gate is not None and not gate.should_score(image):
+        return None
+    return service.submit_numpy(image, throttle, speed)
+
+async def _score_encoded_frame(service: ModelService, payload: bytes, throttle: float, speed: float,
+                               gate: Optional[FrameGate]) -> Optional[dict]:
+    """Decode on a pool worker and score through the batch scheduler; None if ``gate`` skipped the frame"""
+    future = await inference_pool.run(_submit_encoded_frame, service, payload, throttle, speed, gate)
+    return None if future is None else await asyncio.wrap_future(future)
+
+def _release_after(work: Optional[asyncio.Future], service: Optional[ModelService]):
+    """Give back a frame's pool slot and model lease, once ``work`` is done if it is still running"""
+    def release(task=None):
+        if task is not None and not task.cancelled():
+            task.exception()  # nobody awaits it after a disconnect; retrieve any error here
+        if service is not None:
+            model_registry.release(service)
+        inference_pool.release()
+
+    if work is not None and not work.done():
+        work.add_done_callback(release)
+    else:
+        release()
+
+def _session_gate(session: dict) -> Optional[FrameGate]:
+    params = _gate_params(session["gate_threshold"], session["gate_max_skip"], session["gate_smoothing"])
+    return FrameGate(**params) if params else None
+
+@app.websocket("/ws/predict")
+async def predict_stream_ws(websocket: WebSocket, throttle: float = 0.5, speed: float = 20.0,
+                            model: Optional[str] = None, gate_threshold: Optional[float] = None,
+                            gate_max_skip: int = DEFAULT_MAX_SKIP, gate_smoothing: float = 0.0):
+    """Live inference over a WebSocket
+
+    Binary messages carry one frame each: a 4-byte big-endian sequence number
+    followed by JPEG/PNG bytes. Text messages are JSON session settings
+    (``{"throttle": ..., "speed": ..., "model": ..., "gate_threshold": ...}``)
+    that apply to all later frames.
+    Every scored frame is answered with a ``prediction`` message tagged with
+    its sequence number. Frames that arrive while inference is busy replace
+    the pending one, so the server always scores the newest frame and
+    reports how many stale frames it dropped. With ``gate_threshold`` set
+    (see ``/api/predict-video``), frames that barely changed are answered
+    with the previous prediction and ``"gated": true`` without running the model.
+    """
+    await websocket.accept()
+    if model_registry is None:
+        await websocket.close(code=1013, reason="Model not loaded")
+        return
+    try:
+        # Load the requested model up front so the first frame does not pay for it
+        model_registry.release(await _acquire_model(model))
+    except (UnknownModel, ModelUnavailable) as e:
+        await websocket.close(code=1013, reason=str(e))
+        return
+    
+    session = {"throttle": throttle, "speed": speed, "model": model, "gate_threshold": gate_threshold,
+               "gate_max_skip": gate_max_skip, "gate_smoothing": gate_smoothing}
+    try:
+        gate = _session_gate(session)
+    except ValueError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
+    pending = None  # newest (seq, payload) not yet scored
+    frame_ready = asyncio.Event()
+    counters = {"received": 0, "scored": 0, "dropped": 0, "gated": 0}
+
+    async def infer():
+        nonlocal pending
+        last_result = None  # reused for gated frames
+        while True:
+            await frame_ready.wait()
+            frame_ready.clear()
+            seq, payload = pending
+            pending = None
+            try:
+                inference_pool.acquire()
+            except PoolSaturated:
+                counters["dropped"] += 1
+                continue
+            service = None
+            work = None
             try:
-                result = model_service.predict_from_numpy(frame, throttle, speed)
-                predictions.append({
-                    "frame": frame_count,
-                    "timestamp": frame_count / fps,
-                    "steering_angle": result["steering_angle"],
-                    "steering_angle_degrees": result["steering_angle_degrees"],
-                    "throttle": throttle,
-                    "speed": speed
+                start = asyncio.get_running_loop().time()
+                service = await _acquire_model(session["model"])
+                frame_gate = gate
+                # Shielded: on disconnect the frame may still be decoding on a pool worker or waiting in the
+                # batch scheduler, and the slot and lease must stay held until it is done
+                work = asyncio.ensure_future(_score_encoded_frame(
+                    service, payload, session["throttle"], session["speed"], frame_gate
+                ))
+                result = await asyncio.shield(work)
+                gated = result is None
+                if gated:
+                    counters["gated"] += 1
+                    angle = frame_gate.output(None)
+                    result = dict(last_result, steering_angle=angle, steering_angle_degrees=angle * DEGREES_PER_UNIT)
+                else:
+                    counters["scored"] += 1
+                    if frame_gate is not None:
+                        angle = frame_gate.output(result["steering_angle"])
+                        result = dict(result, steering_angle=angle, steering_angle_degrees=angle * DEGREES_PER_UNIT)
+                    last_result = result
+                await websocket.send_json({
+                    "type": "prediction",
+                    "seq": seq,
+                    **result,
+                    "gated": gated,
+                    "latency_ms": (asyncio.get_running_loop().time() - start) * 1000.0,
+                    "dropped": counters["dropped"]
                 })
+            except (ValueError, UnknownModel, ModelUnavailable) as e:
+                if gate is not None:
+                    gate.reset()  # never reuse a prediction for a frame that failed to score
+                await websocket.send_json({"type": "error", "seq": seq, "detail": str(e)})
             except Exception as e:
-                logger.warning(f"Error processing frame {frame_count}: {e}")
-                predictions.append({
-                    "frame": frame_count,
-                    "timestamp": frame_count / fps,
-                    "error": str(e)
-                })
-            
-            frame_count += 1
-            
-            # Limit processing to prevent timeouts (process every 10th frame for long videos)
-            if frame_count % 10 != 0 and frame_count > 100:
-                continue
-        
-        cap.release()
-        
-        # Clean up temp file
-        import os
-        try:
-            os.remove(temp_path)
-        except:
-            pass
-        
-        return VideoPredictionResponse(
-            predictions=predictions,
-            total_frames=frame_count,
-            fps=fps
-        )
-        
-    except Exception as e:
-        logger.error(f"Error processing video: {e}")
-        raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
+                logger.error(f"Error in live inference session: {e}")
+                await websocket.close(code=1011)
+                return
+            finally:
+                _release_after(work, service)
+
+    worker = asyncio.create_task(infer())
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is not None:
+                data = message["bytes"]
+                if len(data) <= 4:
+                    await websocket.send_json({"type": "error", "detail": "Frame message must be a 4-byte sequence number followed by image bytes"})
+                    continue
+                counters["received"] += 1
+                if pending is not None:
+                    counters["dropped"] += 1  # superseded before it was scored
+                pending = (int.from_bytes(data[:4], "big"), data[4:])
+                frame_ready.set()
+            elif message.get("text") is not None:
+                try:
+                    settings = json.loads(message["text"])
+                    updated = dict(session)
+                    for key in ("throttle", "speed", "gate_smoothing"):
+                        if key in settings:
+                            updated[key] = float(settings[key])
+                    if "gate_max_skip" in settings:
+                        updated["gate_max_skip"] = int(settings["gate_max_skip"])
+                    if "gate_threshold" in settings:
+                        updated["gate_threshold"] = float(settings["gate_threshold"]) if settings["gate_threshold"] is not None else None
+                    if "model" in settings:
+                        updated["model"] = str(settings["model"]) if settings["model"] else None
+                    # Predictions depend on every setting, so any change starts a fresh gate
+                    gate = _session_gate(updated)
+                    session = updated
+                except (ValueError, TypeError, AttributeError):
+                    await websocket.send_json({"type": "error", "detail": "Settings must be a JSON object with numeric throttle/speed/gate settings and an optional model name"})
+                    continue
+                await websocket.send_json({"type": "session", **session, **counters})
+    finally:
+        worker.cancel()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text-format metrics: stage latencies, request counters, queue depth, batch sizes, load time"""
+    return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/api/cache")
+async def cache_stats():
+    """Hit-rate metrics for each resident model's frame prediction and embedding caches and the video result cache"""
+    resident = model_registry.resident() if model_registry is not None else {}
+    return {
+        "models": {
+            name: {"frames": service.cache.stats(), "embeddings": service.embedding_cache.stats()}
+            for name, service in resident.items()
+        },
+        "videos": video_cache.stats()
+    }
 
 @app.get("/")
 async def root():
@@ -201,5 +1301,20 @@ async def root():
     }
 
 if __name__ == "__main__":
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+    parser = argparse.ArgumentParser(description="Steering Prediction API")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("STEERING_WORKERS", "1")),
+                        help="Worker processes forked after the default model is loaded (Unix only)")
+    parser.add_argument("--no-pin", action="store_true", help="Do not pin each worker to its own CPUs")
+    args = parser.parse_args()
+    if args.workers > 1:
+        if not hasattr(os, "fork"):
+            raise SystemExit("--workers needs os.fork(); run a single worker on this platform")
+        from prefork import serve
+        serve(app, args.host, args.port, args.workers, preload=preload_model, pin_cpus=not args.no_pin)
+    else:
+        uvicorn.run(app, host=args.host, port=args.port)
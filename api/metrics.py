@@ -0,0 +1,206 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, finer at the low end where preprocessing and decode live
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+# Set STEERING_METRICS=0 to turn every observation into a no-op
+ENABLED = os.environ.get("STEERING_METRICS", "1") != "0"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for thread-safe metrics rendered in the Prometheus text exposition format"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}  # label values tuple -> value
+        self._lock = threading.Lock()
+
+    def _key(self, labels) -> tuple:
+        return tuple(labels[name] for name in self.labelnames) if self.labelnames else ()
+
+    def samples(self):
+        """Yield (suffix, label values, extra labels, value) for every series"""
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield "", key, (), value
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, key, extra, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Gauge set explicitly or, with ``set_function``, read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        super(Gauge, self).__init__(name, documentation, labelnames)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function):
+        """``function()`` returns a value, or a dict of label values tuple -> value for labelled gauges"""
+        self._function = function
+
+    def samples(self):
+        if self._function is None:
+            yield from super(Gauge, self).samples()
+            return
+        try:
+            value = self._function()
+        except Exception:
+            return
+        if isinstance(value, dict):
+            for key, item in value.items():
+                yield "", key, (), item
+        elif value is not None:
+            yield "", (), (), value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super(Histogram, self).__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        if not ENABLED:
+            return
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(series[0]), series[1], series[2])) for key, series in self._values.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield "_bucket", key, (("le", _format_value(float(bound))),), cumulative
+            yield "_sum", key, (), total
+            yield "_count", key, (), count
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "steering_stage_seconds", "Time spent in each inference stage", ("stage",)))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "steering_request_seconds", "HTTP request latency from receipt to the last response byte", ("method", "route")))
+REQUESTS = REGISTRY.register(Counter(
+    "steering_requests_total", "HTTP requests handled", ("method", "route", "status")))
+FRAMES = REGISTRY.register(Counter(
+    "steering_frames_total", "Frames scored by the model", ("source",)))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    "steering_batch_size", "Frames per forward pass", ("source",), buckets=BATCH_SIZE_BUCKETS))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "steering_queue_depth", "Requests waiting or running", ("queue", "model")))
+MODEL_LOAD_SECONDS = REGISTRY.register(Gauge(
+    "steering_model_load_seconds", "Time taken by the last model load, including runtime optimization", ("model",)))
+CACHE_EVENTS = REGISTRY.register(Gauge(
+    "steering_cache_events", "Cache hits, misses, evictions and expirations since the cache was created",
+    ("cache", "model", "event")))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and status per route template
+
+    Implemented at the ASGI level rather than with ``@app.middleware`` so
+    streaming responses are timed to their last byte and no extra task is
+    spawned per request.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unmatched paths share one label
+            path = getattr(route, "path", "unmatched")
+            method = scope.get("method", "")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, method=method, route=path)
+            REQUESTS.inc(method=method, route=path, status=status)
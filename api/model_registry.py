@@ -0,0 +1,214 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+
+class UnknownModel(KeyError):
+    """Raised for a model name that is not in the registry's catalog"""
+    def __str__(self):
+        return f"Unknown model '{self.args[0]}'"
+
+
+class ModelUnavailable(RuntimeError):
+    """Raised when a model could not be loaded"""
+    pass
+
+
+class ModelRegistry:
+    """Named SteeringModel checkpoints served by one ModelService each
+
+    ``loader(name, path)`` builds a ready-to-serve ModelService (weights
+    loaded, warmed up, batching started); loads run on background threads.
+    A finished load replaces the resident service for its name in one step,
+    so requests that already hold the old service finish on it while new
+    requests get the new one. At most ``max_resident`` services stay in
+    memory; beyond that the least recently used one is evicted, except the
+    default model. Replaced and evicted services are stopped once their last
+    lease is released. After a failed load, on-demand loads of that name fail
+    fast for ``retry_seconds`` instead of retrying on every request.
+    """
+    def __init__(self, loader, default_model: str = "default", max_resident: int = 2,
+                 retry_seconds: float = 10.0):
+        self.loader = loader
+        self.default_model = default_model
+        self.max_resident = max(1, max_resident)
+        self.retry_seconds = retry_seconds
+        self.catalog = {}  # name -> checkpoint path
+        self._resident = OrderedDict()  # name -> ModelService, least recently used first
+        self._loading = {}  # name -> Future resolving to the newly installed ModelService
+        self._errors = {}  # name -> (monotonic time, message) of the last failed load
+        self._loaded_at = {}  # name -> wall-clock time of the last install
+        self._versions = {}  # name -> number of installs so far
+        self._leases = {}  # ModelService -> requests currently using it
+        self._retired = set()  # replaced/evicted services still leased
+        self._lock = threading.Lock()
+
+    def register(self, name: str, path: str):
+        with self._lock:
+            self.catalog[name] = path
+
+    def load(self, name: str, path: str = None) -> Future:
+        """Load (or reload) ``name`` in the background, optionally from a new checkpoint
+
+        Returns a Future resolving to the installed ModelService. If a load of
+        the same name is already running its Future is returned instead.
+        """
+        with self._lock:
+            if path is not None:
+                self.catalog[name] = path
+            if name not in self.catalog:
+                raise UnknownModel(name)
+            return self._start_load(name)
+
+    def ensure_loaded(self, name: str = None) -> Future:
+        """Future that resolves once ``name`` is resident, starting a load only if needed"""
+        name = name or self.default_model
+        with self._lock:
+            if name not in self.catalog:
+                raise UnknownModel(name)
+            future = Future()
+            if name in self._resident:
+                future.set_result(self._resident[name])
+                return future
+            failed_at, error = self._errors.get(name, (None, None))
+            if name not in self._loading and failed_at is not None and time.monotonic() - failed_at < self.retry_seconds:
+                future.set_exception(ModelUnavailable(f"Could not load model '{name}': {error}"))
+                return future
+            return self._start_load(name)
+
+    def _start_load(self, name: str) -> Future:
+        future = self._loading.get(name)
+        if future is None:
+            future = self._loading[name] = Future()
+            thread = threading.Thread(target=self._load, args=(name, self.catalog[name], future),
+                                      name=f"model-load-{name}", daemon=True)
+            thread.start()
+        return future
+
+    def _load(self, name: str, path: str, future: Future):
+        try:
+            service = self.loader(name, path)
+        except Exception as e:
+            with self._lock:
+                self._errors[name] = (time.monotonic(), str(e))
+                del self._loading[name]
+            future.set_exception(ModelUnavailable(f"Could not load model '{name}': {e}"))
+            return
+        with self._lock:
+            del self._loading[name]
+        self.install(name, service)
+        future.set_result(service)
+
+    def install(self, name: str, service):
+        """Make a ready ModelService the one serving ``name``, retiring the previous one"""
+        stop = []
+        with self._lock:
+            self.catalog.setdefault(name, service.model_path)
+            self._versions[name] = self._versions.get(name, 0) + 1
+            service.name, service.version = name, self._versions[name]
+            previous = self._resident.pop(name, None)
+            self._resident[name] = service
+            self._leases.setdefault(service, 0)
+            self._loaded_at[name] = time.time()
+            self._errors.pop(name, None)
+            if previous is not None:
+                stop.extend(self._retire(previous))
+            while len(self._resident) > self.max_resident:
+                victim = next((other for other in self._resident if other not in (name, self.default_model)), None)
+                if victim is None:
+                    break
+                stop.extend(self._retire(self._resident.pop(victim)))
+        for retired in stop:
+            retired.stop_batching()
+
+    def _retire(self, service):
+        """Stop ``service`` now if nobody holds it, else when its last lease is released"""
+        if self._leases.get(service, 0) > 0:
+            self._retired.add(service)
+            return []
+        self._leases.pop(service, None)
+        return [service]
+
+    def acquire(self, name: str = None):
+        """Lease the resident service for ``name``; returns None if it is not resident"""
+        name = name or self.default_model
+        with self._lock:
+            if name not in self.catalog:
+                raise UnknownModel(name)
+            service = self._resident.get(name)
+            if service is None:
+                return None
+            self._resident.move_to_end(name)
+            self._leases[service] += 1
+            return service
+
+    def release(self, service):
+        with self._lock:
+            if service not in self._leases:
+                return  # registry was shut down meanwhile
+            self._leases[service] -= 1
+            if self._leases[service] > 0 or service not in self._retired:
+                return
+            self._retired.discard(service)
+            del self._leases[service]
+        service.stop_batching()
+
+    @contextmanager
+    def lease(self, name: str = None, timeout: float = None):
+        """Blocking counterpart of acquire/release for worker threads: waits for the model to load"""
+        service = self.acquire(name)
+        while service is None:
+            self.ensure_loaded(name).result(timeout)
+            service = self.acquire(name)
+        try:
+            yield service
+        finally:
+            self.release(service)
+
+    def resident(self) -> dict:
+        """Snapshot of the resident services by name"""
+        with self._lock:
+            return dict(self._resident)
+
+    def is_ready(self, name: str = None) -> bool:
+        with self._lock:
+            return (name or self.default_model) in self._resident
+
+    def is_loading(self, name: str = None) -> bool:
+        with self._lock:
+            return (name or self.default_model) in self._loading
+
+    def shutdown(self):
+        with self._lock:
+            services = list(self._resident.values()) + list(self._retired)
+            self._resident.clear()
+            self._retired.clear()
+            self._leases.clear()
+        for service in services:
+            service.stop_batching()
+
+    def get_info(self):
+        with self._lock:
+            models = []
+            for name, path in self.catalog.items():
+                service = self._resident.get(name)
+                models.append({
+                    "name": name,
+                    "path": path,
+                    "default": name == self.default_model,
+                    "resident": service is not None,
+                    "loading": name in self._loading,
+                    "version": self._versions.get(name, 0),
+                    "loaded_at": self._loaded_at.get(name),
+                    "leases": self._leases.get(service, 0) if service is not None else 0,
+                    "error": self._errors.get(name, (None, None))[1],
+                    "runtime": service.runtime if service is not None else None
+                })
+            return {
+                "default_model": self.default_model,
+                "max_resident": self.max_resident,
+                "retired_in_use": len(self._retired),
+                "models": models
+            }
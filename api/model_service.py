@@ -1,80 +1,415 @@
+import cv2
 import torch
 import torch.nn as nn
-import torchvision.models as models
-import torchvision.transforms as transforms
 from PIL import Image
 import io
 import base64
 import numpy as np
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from functools import partial
+from typing import List, Tuple, Union
+
+from metrics import BATCH_SIZE, FRAMES, MODEL_LOAD_SECONDS, STAGE_SECONDS
+from prediction_cache import PredictionCache, frame_key
+
+from src.model.runtime import calibration_frames, measure_drift, optimize_model
+from src.model.steering_model import load_weights
+from src.pipeline.preprocessing import BatchPreprocessor
 
 class SteeringModel(nn.Module):
     """Model architecture matching the Jupyter notebook"""
     def __init__(self):
         super(SteeringModel, self).__init__()
+        # Deferred so importing this module does not pay for torchvision (and torch._dynamo)
+        import torchvision.models as models
         self.resnet = models.resnet18(pretrained=False)
         num_ftrs = self.resnet.fc.in_features
         self.resnet.fc = nn.Identity()  # Remove the final layer
         self.fc1 = nn.Linear(num_ftrs + 2, 128)  # +2 for throttle and speed
         self.fc2 = nn.Linear(128, 1)  # Output steering angle
 
-    def forward(self, x, extra_features):
-        x = self.resnet(x)
-        x = torch.cat((x, extra_features), dim=1)  # Concatenate image and numerical features
+    def embed(self, x):
+        """Backbone embedding (N, 512); throttle and speed only enter after this"""
+        return self.resnet(x)
+
+    def head(self, features, extra_features):
+        x = torch.cat((features, extra_features), dim=1)  # Concatenate image and numerical features
         x = torch.relu(self.fc1(x))
         x = self.fc2(x)
         return x
 
+    def forward(self, x, extra_features):
+        return self.head(self.embed(x), extra_features)
+
+class BatchScheduler:
+    """Collects concurrent prediction requests into batched forward passes
+
+    Callers submit a preprocessed (3, H, W) image tensor together with its
+    (throttle, speed) pair and get a Future back. A single background thread
+    takes the first queued request, keeps collecting until either
+    ``max_batch_size`` requests are gathered or ``max_wait_ms`` has passed,
+    runs one forward pass for the whole batch and resolves every Future.
+    """
+    def __init__(self, predict_fn, max_batch_size: int = 16, max_wait_ms: float = 5.0, num_threads: int = None):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.num_threads = num_threads
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        # Fail anything that was submitted after the stop sentinel
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(RuntimeError("Batch scheduler stopped"))
+
+    def submit(self, image_tensor: torch.Tensor, throttle: float, speed: float) -> Future:
+        future = Future()
+        self._queue.put((image_tensor, (float(throttle), float(speed)), future, time.perf_counter()))
+        return future
+
+    @property
+    def depth(self) -> int:
+        """Requests queued and not yet picked up by a batch"""
+        return self._queue.qsize()
+
+    def _collect(self):
+        """Block for the first request, then gather more until the batch is full or the wait expires"""
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Finish this batch, then shut down on the next collect
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        while True:
+            batch = self._collect()
+            if batch is None:
+                break
+            live = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not live:
+                continue
+            started = time.perf_counter()
+            for item in live:
+                STAGE_SECONDS.observe(started - item[3], stage="queue_wait")
+            try:
+                images = torch.stack([item[0] for item in live])
+                results = self.predict_fn(images, [item[1] for item in live])
+            except Exception as e:
+                for item in live:
+                    item[2].set_exception(e)
+                continue
+            for item, result in zip(live, results):
+                item[2].set_result(result)
+
 class ModelService:
-    def __init__(self, model_path: str = "data/steering_model_v2.pth"):
+    def __init__(self, model_path: str = "data/steering_model_v2.pth",
+                 max_batch_size: int = 16, max_wait_ms: float = 5.0,
+                 cache_size: int = 1024, cache_ttl: float = 300.0,
+                 runtime: str = "eager", calibration_video: str = None, name: str = "default"):
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model_path = model_path
         self.model = None
-        self.transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),  # ResNet input size
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        # Registry name and install count; reported with every prediction
+        self.name = name
+        self.version = 0
+        # See src.model.runtime.RUNTIMES; non-eager runtimes are checked against fp32 at load time
+        self.runtime = runtime
+        self.calibration_video = calibration_video
+        self.runtime_info = {"runtime": runtime}
+        # Seconds per cold-start step of the last load: read_checkpoint, build_model, optimize, warmup
+        self.load_timings = {}
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.scheduler = None
+        self.preprocessor = BatchPreprocessor((224, 224))  # ResNet input size
+        # Results for repeated frames, keyed by frame content + throttle/speed
+        self.cache = PredictionCache(cache_size, cache_ttl)
+        # Backbone embeddings keyed by frame content alone, reused across throttle/speed sweeps
+        self.embedding_cache = PredictionCache(cache_size, cache_ttl)
         
     def load_model(self):
         """Load the trained model"""
+        start = time.perf_counter()
         try:
-            self.model = SteeringModel().to(self.device)
-            self.model.load_state_dict(torch.load(self.model_path, map_location=self.device))
-            self.model.eval()
+            timings = {}
+            model = load_weights(SteeringModel, self.model_path, self.device, timings)
+            optimize_start = time.perf_counter()
+            self.model = self.optimize(model)
+            timings["optimize"] = time.perf_counter() - optimize_start
+            self.load_timings = timings
+            self.cache.clear()
+            self.embedding_cache.clear()
+            MODEL_LOAD_SECONDS.set(time.perf_counter() - start, model=self.name)
             print(f"Model loaded successfully on {self.device}")
             return True
         except Exception as e:
             print(f"Error loading model: {e}")
             return False
+
+    def optimize(self, model: SteeringModel) -> SteeringModel:
+        """Convert the fp32 model to the configured runtime and record its drift from fp32"""
+        if self.runtime == "eager":
+            return model
+        calibration = None
+        if self.calibration_video:
+            calibration = self.preprocess_frames(calibration_frames(self.calibration_video), bgr=True)
+        start = time.perf_counter()
+        optimized = optimize_model(model, self.runtime, calibration)
+        self.runtime_info = {"runtime": self.runtime, "optimize_seconds": round(time.perf_counter() - start, 3)}
+        if calibration is not None:
+            self.runtime_info["drift"] = measure_drift(model, optimized, calibration)
+        print(f"Model optimized for the {self.runtime} runtime: {self.runtime_info}")
+        return optimized
+
+    def share_memory(self) -> bool:
+        """Move the weights to shared memory so forked worker processes read a single copy
+
+        Returns False if the runtime keeps weights torch cannot share (e.g.
+        packed int8 params); forked workers still share those pages
+        copy-on-write as long as nothing writes to them.
+        """
+        try:
+            self.model.share_memory()
+            return True
+        except (RuntimeError, NotImplementedError) as e:
+            print(f"Model weights stay process-private: {e}")
+            return False
+
+    def start_batching(self, num_threads: int = None):
+        """Start the micro-batching scheduler used by submit/submit_base64/submit_numpy"""
+        if self.scheduler is None:
+            self.scheduler = BatchScheduler(self._predict_batch_results, self.max_batch_size,
+                                            self.max_wait_ms, num_threads)
+            self.scheduler.start()
+
+    def warmup(self, batch_sizes=(1,), iterations: int = 1):
+        """Run dummy forward passes so the first real requests skip one-time allocator and kernel setup"""
+        start = time.perf_counter()
+        for batch_size in batch_sizes:
+            images = self.preprocessor.empty(batch_size).zero_().to(self.device)
+            extra_features = torch.zeros((batch_size, 2), dtype=torch.float32, device=self.device)
+            with torch.inference_mode():
+                for _ in range(iterations):
+                    self.model(images, extra_features)
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        self.load_timings["warmup"] = time.perf_counter() - start
+
+    @property
+    def queue_depth(self) -> int:
+        return self.scheduler.depth if self.scheduler is not None else 0
+
+    def stop_batching(self):
+        if self.scheduler is not None:
+            self.scheduler.stop()
+            self.scheduler = None
+
+    def decode_base64(self, image_base64: str) -> np.ndarray:
+        """Decode a base64 encoded image into an RGB numpy array"""
+        with STAGE_SECONDS.time(stage="decode"):
+            image_data = base64.b64decode(image_base64)
+            image = Image.open(io.BytesIO(image_data))
+            return np.array(image)
+
+    def decode_image_bytes(self, data: bytes) -> np.ndarray:
+        """Decode JPEG/PNG bytes straight into a BGR numpy array"""
+        with STAGE_SECONDS.time(stage="decode"):
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Could not decode image")
+        return image
+
+    def decode_raw_frames(self, data: Union[bytes, bytearray], width: int, height: int, count: int = None) -> np.ndarray:
+        """View packed HxWx3 uint8 frames as a writable (N, H, W, 3) array
+
+        A ``bytearray`` is used in place; read-only ``bytes`` are copied once,
+        since torch.from_numpy cannot safely share a read-only buffer.
+        """
+        frame_size = width * height * 3
+        if width <= 0 or height <= 0:
+            raise ValueError("Frame width and height must be positive")
+        if count is None:
+            if len(data) == 0 or len(data) % frame_size != 0:
+                raise ValueError(f"Body length {len(data)} is not a multiple of the {width}x{height}x3 frame size")
+            count = len(data) // frame_size
+        if count <= 0 or len(data) != count * frame_size:
+            raise ValueError(f"Expected {count} frame(s) of {width}x{height}x3 bytes, got {len(data)} bytes")
+        if not isinstance(data, bytearray):
+            data = bytearray(data)
+        return np.frombuffer(data, dtype=np.uint8).reshape(count, height, width, 3)
+
+    def _format_result(self, prediction: float, throttle: float, speed: float) -> dict:
+        return {
+            "steering_angle": prediction,
+            "steering_angle_degrees": prediction * 30,  # Convert to degrees for display
+            "throttle": throttle,
+            "speed": speed,
+            "device": str(self.device),
+            "model": f"{self.name}:{self.version}"
+        }
+
+    def predict_batch(self, images: torch.Tensor, features: List[Tuple[float, float]]) -> List[float]:
+        """Run one forward pass over a (N, 3, H, W) batch and return N steering angles"""
+        extra_features = torch.tensor(features, dtype=torch.float32).to(self.device)
+        with STAGE_SECONDS.time(stage="forward"):
+            with torch.inference_mode():
+                predictions = self.model(images.to(self.device), extra_features)
+            # One device sync for the whole batch instead of one .item() per frame
+            angles = predictions.squeeze(1).tolist()
+        FRAMES.inc(len(angles), source="image")
+        BATCH_SIZE.observe(len(angles), source="image")
+        return angles
+
+    def embed_frame(self, frame: np.ndarray, bgr: bool = True) -> Tuple[torch.Tensor, bool]:
+        """Return the (512,) backbone embedding of a frame and whether it came from the cache"""
+        key = frame_key(frame, bgr)
+        embedding = self.embedding_cache.get(key)
+        if embedding is not None:
+            return embedding, True
+        image = self.preprocess_frames([frame], bgr=bgr)
+        with STAGE_SECONDS.time(stage="embed"), torch.inference_mode():
+            embedding = self.model.embed(image.to(self.device))[0]
+        FRAMES.inc(source="sweep")
+        self.embedding_cache.put(key, embedding)
+        return embedding, False
+
+    def sweep(self, frame: np.ndarray, throttles: List[float], speeds: List[float], bgr: bool = True) -> dict:
+        """Steering angles over a throttle x speed grid from a single backbone pass
+
+        The ResNet embedding is computed once (or taken from the cache) and
+        only the fc1/fc2 head runs, batched over every grid point.
+        """
+        embedding, cached = self.embed_frame(frame, bgr=bgr)
+        grid = torch.cartesian_prod(
+            torch.tensor(throttles, dtype=torch.float32),
+            torch.tensor(speeds, dtype=torch.float32)
+        ).reshape(-1, 2).to(self.device)
+        with STAGE_SECONDS.time(stage="head"), torch.inference_mode():
+            angles = self.model.head(embedding.unsqueeze(0).expand(len(grid), -1), grid)
+        angles = angles.reshape(len(throttles), len(speeds))
+        return {
+            "throttles": list(throttles),
+            "speeds": list(speeds),
+            "steering_angles": angles.tolist(),
+            "steering_angles_degrees": (angles * 30).tolist(),
+            "embedding_cached": cached,
+            "device": str(self.device)
+        }
+
+    def _predict_batch_results(self, images: torch.Tensor, features: List[Tuple[float, float]]) -> List[dict]:
+        angles = self.predict_batch(images, features)
+        return [self._format_result(angle, throttle, speed) for angle, (throttle, speed) in zip(angles, features)]
+
+    def preprocess_frames(self, frames: List[np.ndarray], bgr: bool = True) -> torch.Tensor:
+        """Transform a list of HxWx3 images into one (N, 3, 224, 224) tensor"""
+        try:
+            with STAGE_SECONDS.time(stage="preprocess"):
+                return self.preprocessor(frames, bgr=bgr)
+        except Exception as e:
+            raise ValueError(f"Error processing images: {e}")
+
+    def preprocess_numpy(self, image_np: np.ndarray) -> torch.Tensor:
+        """Transform a BGR numpy image into a (3, 224, 224) tensor"""
+        try:
+            with STAGE_SECONDS.time(stage="preprocess"):
+                return self.preprocessor([image_np], bgr=True)[0]
+        except Exception as e:
+            raise ValueError(f"Error processing numpy image: {e}")
+
+    def submit(self, image_tensor: torch.Tensor, throttle: float = 0.5, speed: float = 20.0) -> Future:
+        """Queue a preprocessed image for batched prediction; the Future resolves to the result dict"""
+        if self.scheduler is None:
+            self.start_batching()
+        return self.scheduler.submit(image_tensor, throttle, speed)
+
+    def _store(self, key: str, future: Future):
+        if not future.cancelled() and future.exception() is None:
+            self.cache.put(key, dict(future.result()))
+
+    def submit_frames(self, frames: List[np.ndarray], throttle: float = 0.5, speed: float = 20.0,
+                      bgr: bool = True) -> List[Future]:
+        """Queue decoded frames for batched prediction, answering repeated frames from the cache
+
+        Frames that miss the cache are preprocessed together and their results
+        are stored once the batch scheduler resolves them.
+        """
+        futures = [None] * len(frames)
+        misses = []
+        for i, frame in enumerate(frames):
+            key = frame_key(frame, bgr, throttle, speed)
+            cached = self.cache.get(key)
+            if cached is not None:
+                futures[i] = Future()
+                futures[i].set_result(dict(cached))
+            else:
+                misses.append((i, key))
+        if misses:
+            images = self.preprocess_frames([frames[i] for i, _ in misses], bgr=bgr)
+            for (i, key), image in zip(misses, images):
+                futures[i] = self.submit(image, throttle, speed)
+                futures[i].add_done_callback(partial(self._store, key))
+        return futures
+
+    def submit_base64(self, image_base64: str, throttle: float = 0.5, speed: float = 20.0) -> Future:
+        """Queue a base64 encoded image for batched prediction"""
+        try:
+            image_np = self.decode_base64(image_base64)
+        except Exception as e:
+            raise ValueError(f"Error processing image: {e}")
+        return self.submit_frames([image_np], throttle, speed, bgr=False)[0]
+
+    def submit_numpy(self, image_np: np.ndarray, throttle: float = 0.5, speed: float = 20.0) -> Future:
+        """Queue a BGR numpy image for batched prediction"""
+        return self.submit_frames([image_np], throttle, speed, bgr=True)[0]
     
     def predict_from_base64(self, image_base64: str, throttle: float = 0.5, speed: float = 20.0):
         """Predict steering angle from base64 encoded image"""
         try:
             # Decode base64 image
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-            
-            # Convert PIL to numpy array (RGB)
-            image_np = np.array(image)
+            image_np = self.decode_base64(image_base64)
             
-            # Apply transform
-            image_tensor = self.transform(image_np).unsqueeze(0).to(self.device)
-            
-            # Create extra features tensor
-            extra_features = torch.tensor([[throttle, speed]], dtype=torch.float32).to(self.device)
+            # Resize and normalize
+            with STAGE_SECONDS.time(stage="preprocess"):
+                image_tensor = self.preprocessor([image_np], bgr=False)
             
             # Make prediction
-            with torch.no_grad():
-                prediction = self.model(image_tensor, extra_features).item()
+            prediction = self.predict_batch(image_tensor, [(throttle, speed)])[0]
             
-            return {
-                "steering_angle": prediction,
-                "steering_angle_degrees": prediction * 30,  # Convert to degrees for display
-                "throttle": throttle,
-                "speed": speed,
-                "device": str(self.device)
-            }
+            return self._format_result(prediction, throttle, speed)
             
         except Exception as e:
             raise ValueError(f"Error processing image: {e}")
@@ -82,26 +417,14 @@ class ModelService:
     def predict_from_numpy(self, image_np: np.ndarray, throttle: float = 0.5, speed: float = 20.0):
         """Predict steering angle from numpy array (BGR format from OpenCV)"""
         try:
-            # Convert BGR to RGB
-            image_rgb = np.array(image_np)[:, :, ::-1]  # BGR to RGB
-            
-            # Apply transform
-            image_tensor = self.transform(image_rgb).unsqueeze(0).to(self.device)
-            
-            # Create extra features tensor
-            extra_features = torch.tensor([[throttle, speed]], dtype=torch.float32).to(self.device)
+            # Resize and normalize; the BGR to RGB swap happens inside the batched normalization
+            with STAGE_SECONDS.time(stage="preprocess"):
+                image_tensor = self.preprocessor([image_np], bgr=True)
             
             # Make prediction
-            with torch.no_grad():
-                prediction = self.model(image_tensor, extra_features).item()
+            prediction = self.predict_batch(image_tensor, [(throttle, speed)])[0]
             
-            return {
-                "steering_angle": prediction,
-                "steering_angle_degrees": prediction * 30,
-                "throttle": throttle,
-                "speed": speed,
-                "device": str(self.device)
-            }
+            return self._format_result(prediction, throttle, speed)
             
         except Exception as e:
             raise ValueError(f"Error processing numpy image: {e}")
@@ -112,5 +435,13 @@ class ModelService:
             "device": str(self.device),
             "cuda_available": torch.cuda.is_available(),
             "model_loaded": self.model is not None,
-            "model_path": self.model_path
+            "model_path": self.model_path,
+            "name": self.name,
+            "version": self.version,
+            "runtime": self.runtime_info,
+            "load_seconds": {step: round(seconds, 3) for step, seconds in self.load_timings.items()},
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "cache": self.cache.stats(),
+            "embedding_cache": self.embedding_cache.stats()
         }
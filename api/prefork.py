@@ -0,0 +1,124 @@
+import logging
+import os
+import signal
+import socket
+import time
+
+import cv2
+import torch
+import uvicorn
+
+from inference_pool import available_cpus
+
+logger = logging.getLogger(__name__)
+
+# Minimum delay before replacing a worker that exited, so a crash loop does not spin
+RESPAWN_DELAY = 1.0
+
+
+def cpu_partitions(workers: int, cpus=None) -> list:
+    """Split the CPUs this process may use into ``workers`` contiguous, disjoint sets
+
+    With more workers than CPUs every worker gets one CPU, shared round-robin.
+    """
+    cpus = sorted(cpus if cpus is not None else (os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity")
+                                                  else range(os.cpu_count() or 1)))
+    if workers >= len(cpus):
+        return [[cpus[i % len(cpus)]] for i in range(workers)]
+    share, extra = divmod(len(cpus), workers)
+    partitions, start = [], 0
+    for i in range(workers):
+        end = start + share + (1 if i < extra else 0)
+        partitions.append(cpus[start:end])
+        start = end
+    return partitions
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _run_worker(app, sock: socket.socket, cpus, log_level: str):
+    """Body of a forked worker: claim its CPU share, then serve on the inherited socket"""
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    if cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    # InferencePool sizes itself from the affinity mask; the main thread and OpenCV follow it here
+    threads = available_cpus()
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+    server = uvicorn.Server(uvicorn.Config(app, log_level=log_level))
+    server.run(sockets=[sock])
+
+
+def serve(app, host: str = "0.0.0.0", port: int = 8000, workers: int = 2, preload=None,
+          pin_cpus: bool = True, log_level: str = "info"):
+    """Serve ``app`` from ``workers`` processes forked after the model is loaded
+
+    ``preload()`` runs once in this process before forking (see
+    ``main.preload_model``), so the workers start from the loaded, shared
+    weights instead of each reading the checkpoint into private memory. The
+    listening socket is bound here and inherited, and the kernel spreads
+    connections across the workers. Each worker is pinned to its own slice
+    of the CPUs (``pin_cpus``) and sizes its torch, OpenCV and inference
+    pool threads to that slice, so workers do not compete for cores. Workers
+    that exit are replaced until this process receives SIGINT/SIGTERM.
+    """
+    # One intra-op thread until the fork: an OpenMP pool started here would not survive into the workers
+    torch.set_num_threads(1)
+    start = time.perf_counter()
+    if preload is not None:
+        preload()
+    logger.info(f"Preloaded in {time.perf_counter() - start:.3f}s; forking {workers} workers")
+    sock = _bind(host, port)
+    partitions = cpu_partitions(workers) if pin_cpus else [None] * workers
+    children = {}  # pid -> worker index
+    stopping = False
+
+    def spawn(index):
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                _run_worker(app, sock, partitions[index], log_level)
+                status = 0
+            finally:
+                os._exit(status)
+        children[pid] = index
+        logger.info(f"Worker {index} started (pid {pid}, cpus {partitions[index]})")
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for index in range(workers):
+        spawn(index)
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except InterruptedError:
+                continue
+            index = children.pop(pid, None)
+            if index is None or stopping:
+                continue
+            logger.warning(f"Worker {index} (pid {pid}) exited with status {status}; restarting")
+            time.sleep(RESPAWN_DELAY)
+            if not stopping:
+                spawn(index)
+    finally:
+        sock.close()
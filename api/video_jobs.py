@@ -0,0 +1,351 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+# Job states; queued and running jobs are picked up again after a restart
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    video_path TEXT,
+    params TEXT NOT NULL,
+    fps REAL,
+    total_frames INTEGER,
+    start_frame INTEGER,
+    end_frame INTEGER,
+    last_frame INTEGER,
+    scored_frames INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    stats TEXT
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    job_id TEXT NOT NULL,
+    frame INTEGER NOT NULL,
+    timestamp REAL NOT NULL,
+    steering_angle REAL,
+    error TEXT,
+    PRIMARY KEY (job_id, frame)
+) WITHOUT ROWID;
+"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when it was cancelled or the queue is shutting down"""
+    pass
+
+
+def _process_alive(pid) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _process_start(pid) -> str:
+    """Start time of a process in clock ticks since boot (Linux only, else None)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # The command name may contain spaces; the fields after its closing parenthesis are fixed
+            return f.read().rsplit(")", 1)[1].split()[19]
+    except (OSError, IndexError):
+        return None
+
+
+_owner = (None, None)
+
+
+def _owner_token() -> str:
+    """``pid:start`` recorded as the owner of the jobs this process claims
+
+    A bare pid is not enough: a server restarted in a container is PID 1
+    again, and pids get recycled, so a dead owner's jobs would look alive.
+    """
+    global _owner
+    pid = os.getpid()
+    if _owner[0] != pid:  # computed per process: pre-forked workers must not inherit the parent's token
+        _owner = (pid, f"{pid}:{_process_start(pid) or uuid.uuid4().hex}")
+    return _owner[1]
+
+
+def _owner_alive(owner) -> bool:
+    """Whether the process that claimed a job is still running"""
+    if owner is None:
+        return False
+    owner = str(owner)
+    if owner == _owner_token():
+        return True
+    pid, _, start = owner.partition(":")
+    if not pid.isdigit():
+        return False
+    pid = int(pid)
+    if pid == os.getpid() or not _process_alive(pid):
+        return False
+    # Only Linux start times can be checked; elsewhere (or for old pid-only rows) a live pid counts
+    current = _process_start(pid)
+    return not (start and current) or start == current
+
+
+class JobStore:
+    """SQLite-backed job table plus the per-frame predictions checkpointed so far
+
+    One connection per process shared by its threads behind a lock; WAL
+    mode keeps readers (status polls) from waiting on a checkpoint write.
+    Several processes (pre-fork workers) can share one database: jobs are
+    claimed atomically and cancellation is a flag in the job row.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA busy_timeout=5000")
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+
+    def _job(self, row) -> dict:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["stats"] = json.loads(job["stats"]) if job["stats"] else None
+        return job
+
+    def create(self, job_id: str, video_path: str, params: dict) -> dict:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, created_at, updated_at, video_path, params) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, now, now, video_path, json.dumps(params)))
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict:
+        with self._lock:
+            return self._job(self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit: int = 100) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def unfinished(self) -> list:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+                                      (QUEUED, RUNNING)).fetchall()
+        return [self._job(row) for row in rows]
+
+    def claim(self, job_id: str) -> bool:
+        """Move a queued job to running for this process; False if another process got it first"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (RUNNING, _owner_token(), time.time(), job_id, QUEUED))
+        return cursor.rowcount == 1
+
+    def request_cancel(self, job_id: str) -> str:
+        """Flag a job for cancellation and return its status; a queued job is cancelled right away"""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = ?", (job_id, RUNNING))
+            self._conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                               (CANCELLED, time.time(), job_id, QUEUED))
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row["status"] if row is not None else None
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is None or bool(row["cancel_requested"])
+
+    def update(self, job_id: str, **fields):
+        if "stats" in fields and fields["stats"] is not None:
+            fields["stats"] = json.dumps(fields["stats"])
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+
+    def checkpoint(self, job_id: str, rows: list):
+        """Persist ``(frame, timestamp, steering_angle, error)`` rows and advance the resume point atomically"""
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO predictions (job_id, frame, timestamp, steering_angle, error) "
+                    "VALUES (?, ?, ?, ?, ?)", [(job_id, *row) for row in rows])
+                self._conn.execute(
+                    "UPDATE jobs SET last_frame = ?, updated_at = ?, "
+                    "scored_frames = (SELECT COUNT(*) FROM predictions WHERE job_id = ?) WHERE id = ?",
+                    (rows[-1][0], time.time(), job_id, job_id))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def predictions(self, job_id: str) -> list:
+        """Checkpointed ``(frame, timestamp, steering_angle, error)`` rows in frame order"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT frame, timestamp, steering_angle, error FROM predictions WHERE job_id = ? ORDER BY frame",
+                (job_id,)).fetchall()
+
+    def delete(self, job_id: str):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM predictions WHERE job_id = ?", (job_id,))
+            self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            self._conn.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class VideoJobQueue:
+    """Runs video scoring jobs on a bounded background executor with checkpoint/resume
+
+    ``process(job, resume_frame, checkpoint, should_stop)`` does the actual
+    scoring: it starts at ``resume_frame`` (None for a fresh job), hands
+    scored rows to ``checkpoint(rows)`` as it goes, calls ``should_stop()``
+    between frames and returns the run's stats. Every ``checkpoint_frames``
+    rows are committed to the store together with the resume point, so a job
+    interrupted by a crash or restart continues after its last committed
+    frame instead of starting over. Uploaded videos live in a per-job
+    directory under ``directory`` and are deleted once the job finishes.
+    """
+    def __init__(self, directory: str, process, max_concurrent: int = 1, checkpoint_frames: int = 64,
+                 threads_per_job: int = None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.process = process
+        self.max_concurrent = max(1, max_concurrent)
+        self.checkpoint_frames = max(1, checkpoint_frames)
+        self.threads_per_job = threads_per_job
+        self.store = JobStore(os.path.join(directory, "jobs.sqlite3"))
+        self._cancelled = set()
+        self._stopping = False
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="video-job",
+                                           initializer=self._init_worker)
+
+    def _init_worker(self):
+        if self.threads_per_job:
+            torch.set_num_threads(self.threads_per_job)
+
+    def new_job_dir(self) -> tuple:
+        """A fresh job id and the private directory its upload is stored in"""
+        job_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, job_id)
+        os.makedirs(path)
+        return job_id, path
+
+    def submit(self, job_id: str, video_path: str, params: dict) -> dict:
+        job = self.store.create(job_id, video_path, params)
+        self.executor.submit(self._run, job_id)
+        return job
+
+    def resume_unfinished(self) -> int:
+        """Queue jobs left queued, or running in a process that no longer exists, by a previous run"""
+        resumed = 0
+        for job in self.store.unfinished():
+            if job["status"] == RUNNING:
+                if _owner_alive(job["owner"]):
+                    continue
+                self.store.update(job["id"], status=QUEUED, owner=None)
+            self.executor.submit(self._run, job["id"])
+            resumed += 1
+        return resumed
+
+    def cancel(self, job_id: str) -> str:
+        """Cancel a queued or running job; a running job stops at its next checkpoint
+
+        Returns the job's status afterwards (None for an unknown job).
+        """
+        status = self.store.request_cancel(job_id)
+        if status == RUNNING:
+            with self._lock:
+                self._cancelled.add(job_id)
+        elif status == CANCELLED:
+            self._cleanup(job_id)
+        return status
+
+    def delete(self, job_id: str) -> bool:
+        """Drop a finished job with its results; False while it is still queued or running"""
+        job = self.store.get(job_id)
+        if job is None or job["status"] not in FINISHED_STATES:
+            return False
+        self.store.delete(job_id)
+        self._cleanup(job_id)
+        return True
+
+    def _cleanup(self, job_id: str):
+        shutil.rmtree(os.path.join(self.directory, job_id), ignore_errors=True)
+
+    def _should_stop(self, job_id: str) -> bool:
+        return self._stopping or job_id in self._cancelled
+
+    def _run(self, job_id: str):
+        if self._stopping or not self.store.claim(job_id):
+            return
+        job = self.store.get(job_id)
+        pending = []
+
+        def checkpoint(rows):
+            pending.extend(rows)
+            if len(pending) >= self.checkpoint_frames:
+                self.store.checkpoint(job_id, pending)
+                pending.clear()
+                # Cancellation may have been requested through another worker process
+                if self.store.cancel_requested(job_id):
+                    with self._lock:
+                        self._cancelled.add(job_id)
+
+        try:
+            stats = self.process(job, job["last_frame"], checkpoint, lambda: self._should_stop(job_id))
+            self.store.checkpoint(job_id, pending)
+            self.store.update(job_id, status=COMPLETED, stats=stats)
+            self._cleanup(job_id)
+        except JobCancelled:
+            self.store.checkpoint(job_id, pending)
+            if job_id in self._cancelled:
+                self.store.update(job_id, status=CANCELLED)
+                self._cleanup(job_id)
+            else:
+                # Shutting down: leave the job queued so the next process resumes it
+                self.store.update(job_id, status=QUEUED, owner=None)
+        except Exception as e:
+            self.store.checkpoint(job_id, pending)
+            self.store.update(job_id, status=FAILED, error=str(e))
+            self._cleanup(job_id)
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+    def shutdown(self):
+        """Stop running jobs at their next frame, checkpointing them for the next start"""
+        self._stopping = True
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.store.close()
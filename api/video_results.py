@@ -0,0 +1,101 @@
+import io
+import json
+from array import array
+
+import numpy as np
+
+# Formats accepted by the video endpoints' ``format`` parameter
+VIDEO_FORMATS = ("records", "columnar", "npz")
+# steering_angle_degrees = steering_angle * DEGREES_PER_UNIT
+DEGREES_PER_UNIT = 30
+
+
+def _json_array(values: np.ndarray) -> str:
+    if values.dtype == np.float32:
+        # 9 significant digits round-trip any float32, at about half the length of a float64 repr
+        return "[" + ",".join(["%.9g" % value for value in values.tolist()]) + "]"
+    return "[" + ",".join(map(repr, values.tolist())) + "]"
+
+
+class VideoPredictions:
+    """Per-frame predictions of one video, held as typed columns instead of one dict per frame
+
+    Scored frames go into ``frames`` (int32), ``timestamps`` and
+    ``steering_angles`` (float32 on the way out; timestamps are kept at full
+    precision for the records format); frames that failed are kept apart in the
+    sparse ``errors`` list. ``throttle`` and ``speed`` are the same for every
+    frame, so they are stored once.
+    """
+    def __init__(self, throttle: float, speed: float):
+        self.throttle = throttle
+        self.speed = speed
+        self._frames = array("i")
+        self._timestamps = array("d")
+        self._angles = array("f")
+        self.errors = []  # {"frame", "timestamp", "error"} for frames that could not be scored
+
+    def add(self, frame: int, timestamp: float, steering_angle, error=None):
+        if error is not None:
+            self.errors.append({"frame": frame, "timestamp": timestamp, "error": error})
+            return
+        self._frames.append(frame)
+        self._timestamps.append(timestamp)
+        self._angles.append(steering_angle)
+
+    def __len__(self):
+        return len(self._frames) + len(self.errors)
+
+    @property
+    def frames(self) -> np.ndarray:
+        return np.frombuffer(self._frames, dtype=np.int32)
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return np.frombuffer(self._timestamps, dtype=np.float64).astype(np.float32)
+
+    @property
+    def steering_angles(self) -> np.ndarray:
+        return np.frombuffer(self._angles, dtype=np.float32)
+
+    def records(self) -> list:
+        """The classic one-dict-per-frame list, errors merged in frame order"""
+        records = [
+            {
+                "frame": frame,
+                "timestamp": timestamp,
+                "steering_angle": angle,
+                "steering_angle_degrees": angle * DEGREES_PER_UNIT,
+                "throttle": self.throttle,
+                "speed": self.speed
+            }
+            for frame, timestamp, angle in zip(self._frames, self._timestamps, self._angles)
+        ]
+        if self.errors:
+            records.extend(dict(error) for error in self.errors)
+            records.sort(key=lambda record: record["frame"])
+        return records
+
+    def _meta(self, meta: dict) -> dict:
+        return {**meta, "throttle": self.throttle, "speed": self.speed,
+                "degrees_per_unit": DEGREES_PER_UNIT, "errors": self.errors}
+
+    def to_columnar_json(self, meta: dict) -> str:
+        """JSON object with ``meta``, the per-video constants and one array per column
+
+        Timestamps are written to the microsecond rather than as float32,
+        which keeps values like 0.04 short and exact.
+        """
+        head = json.dumps({"format": "columnar", **self._meta(meta)})
+        return (f'{head[:-1]},"frames":{_json_array(self.frames)},'
+                f'"timestamps":{_json_array(np.round(np.frombuffer(self._timestamps, dtype=np.float64), 6))},'
+                f'"steering_angles":{_json_array(self.steering_angles)}}}')
+
+    def to_npz(self, meta: dict) -> bytes:
+        """NumPy ``.npz`` archive: ``frames``, ``timestamps``, ``steering_angles`` and ``meta`` (a JSON string)
+
+        Readable without pickle: ``np.load(f, allow_pickle=False)``.
+        """
+        buffer = io.BytesIO()
+        np.savez(buffer, frames=self.frames, timestamps=self.timestamps, steering_angles=self.steering_angles,
+                 meta=np.array(json.dumps(self._meta(meta))))
+        return buffer.getvalue()
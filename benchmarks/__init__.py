@@ -0,0 +1,16 @@
+"""Inference benchmarks for the steering model
+
+Run the whole suite with ``python -m benchmarks`` (JSON report, optional
+baseline comparison) or the individual benchmarks as modules from the
+repository root, e.g. ``python -m benchmarks.batching``.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, "api")
+
+# The API modules import each other as top-level modules (``from model_service import ...``)
+for path in (ROOT, API_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
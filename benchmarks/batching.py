@@ -0,0 +1,81 @@
+"""Latency/throughput of the micro-batching scheduler versus batch-1 inference
+
+Usage: python -m benchmarks.batching [--clients 1 8 64] [--requests 256]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+import torch
+
+from benchmarks import API_DIR  # noqa: F401  (sets up sys.path)
+from model_service import ModelService, SteeringModel
+
+
+def make_service(max_batch_size, max_wait_ms):
+    # The clients resend one frame, so the frame cache would answer everything after the first request
+    service = ModelService(max_batch_size=max_batch_size, max_wait_ms=max_wait_ms, cache_size=0)
+    # Random weights are fine for timing; no checkpoint is needed
+    service.model = SteeringModel().to(service.device).eval()
+    return service
+
+
+def run_clients(service, clients, total_requests, frame):
+    """Each client thread submits requests back-to-back and waits for its own result"""
+    latencies = []
+    lock = threading.Lock()
+    per_client = max(1, total_requests // clients)
+
+    def client():
+        local = []
+        for _ in range(per_client):
+            start = time.perf_counter()
+            service.submit_numpy(frame, 0.5, 20.0).result()
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    latencies = np.array(latencies) * 1000.0
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "throughput_rps": len(latencies) / elapsed,
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--requests", type=int, default=256, help="Total requests per run")
+    parser.add_argument("--max-batch-size", type=int, default=16)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    torch.manual_seed(0)
+    frame = np.random.randint(0, 256, (540, 960, 3), dtype=np.uint8)
+    configs = [("batch-1", 1, 0.0), ("batched", args.max_batch_size, args.max_wait_ms)]
+
+    print(f"{'mode':<10}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, max_batch_size, max_wait_ms in configs:
+        service = make_service(max_batch_size, max_wait_ms)
+        service.start_batching()
+        run_clients(service, 1, 4, frame)  # warmup
+        for clients in args.clients:
+            stats = run_clients(service, clients, max(args.requests, clients), frame)
+            print(f"{name:<10}{clients:>8}{stats['throughput_rps']:>10.1f}"
+                  f"{stats['p50_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+        service.stop_batching()
+
+
+if __name__ == "__main__":
+    main()
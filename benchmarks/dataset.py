@@ -0,0 +1,116 @@
+"""Training-data throughput: per-sample JPEG decoding against the packed, memory-mapped dataset
+
+Usage: python -m benchmarks.dataset [--samples 2048] [--batch-size 32] [--workers 0] [--epochs 2]
+
+Writes a synthetic simulator log (``--samples`` 320x160 JPEGs and a
+driving_log.csv with Windows-style paths) to a temporary directory and
+measures samples/sec through a DataLoader for the notebook's
+DrivingDataset (os.path.exists, imread, cvtColor and the torchvision
+ToPILImage/Resize/ToTensor/Normalize chain per sample) and for
+PackedDrivingDataset with ``normalize_batch``, plus the one-off packing
+time and the largest pixel difference between the two pipelines.
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from benchmarks.measure import synthetic_frames
+from benchmarks.preprocessing import TOLERANCE, reference_transform
+from src.dataset.packed import PackedDrivingDataset, normalize_batch, pack_driving_log, read_driving_log
+
+
+class DrivingDataset(Dataset):
+    """The notebook's dataset (rows from the csv module instead of a pandas DataFrame)"""
+    def __init__(self, rows, transform):
+        self.rows = rows
+        self.transform = transform
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, idx):
+        row = self.rows[idx]
+        if os.path.exists(row.image_path):
+            img = cv2.imread(row.image_path)
+            if img is not None:
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                return (self.transform(img), torch.tensor([row.throttle, row.speed], dtype=torch.float32),
+                        torch.tensor(row.steering_angle, dtype=torch.float32))
+        raise FileNotFoundError(row.image_path)
+
+
+def write_log(directory, count):
+    """A driving_log.csv and IMG folder the way the simulator records them"""
+    img_dir = os.path.join(directory, "IMG")
+    os.makedirs(img_dir)
+    rng = np.random.default_rng(0)
+    # A few distinct frames are enough for decode cost; reuse them to keep setup quick
+    frames = synthetic_frames(16, height=160, width=320)
+    log_path = os.path.join(directory, "driving_log.csv")
+    with open(log_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        for i in range(count):
+            name = f"center_{i:06d}.jpg"
+            cv2.imwrite(os.path.join(img_dir, name), frames[i % len(frames)])
+            angle = 0.0 if rng.random() < 0.5 else float(rng.normal(0, 0.3))
+            writer.writerow([f"C:\\sim\\IMG\\{name}", f"C:\\sim\\IMG\\left_{i:06d}.jpg",
+                             f"C:\\sim\\IMG\\right_{i:06d}.jpg", angle, rng.uniform(0, 1), 0, rng.uniform(0, 30)])
+    return log_path
+
+
+def samples_per_second(loader, epochs):
+    samples = 0
+    start = time.perf_counter()
+    for _ in range(epochs):
+        for images, extra_features, angles in loader:
+            samples += len(angles)
+    return samples / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=2048)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=0, help="DataLoader worker processes")
+    parser.add_argument("--epochs", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = write_log(directory, args.samples)
+        loader_args = {"batch_size": args.batch_size, "shuffle": True, "num_workers": args.workers,
+                       "persistent_workers": args.workers > 0}
+
+        baseline = DrivingDataset(read_driving_log(log_path), reference_transform())
+        baseline_rate = samples_per_second(DataLoader(baseline, **loader_args), args.epochs)
+
+        start = time.perf_counter()
+        pack_driving_log(log_path, os.path.join(directory, "packed"))
+        pack_seconds = time.perf_counter() - start
+        packed = PackedDrivingDataset(os.path.join(directory, "packed"))
+        packed_rate = samples_per_second(DataLoader(packed, collate_fn=normalize_batch, **loader_args), args.epochs)
+
+        indices = list(range(0, len(packed), max(1, len(packed) // 32)))
+        expected = torch.stack([baseline[i][0] for i in indices])
+        actual = normalize_batch(packed.__getitems__(indices))[0]
+        max_diff = float((expected - actual).abs().max())
+
+    print(f"{args.samples} samples, batch {args.batch_size}, {args.workers} workers, {args.epochs} epochs")
+    print(f"{'dataset':<12}{'samples/s':>12}")
+    print(f"{'jpeg':<12}{baseline_rate:>12.1f}")
+    print(f"{'packed':<12}{packed_rate:>12.1f}")
+    print(f"speedup {packed_rate / baseline_rate:.1f}x, packing took {pack_seconds:.2f}s "
+          f"({args.samples / pack_seconds:.0f} samples/s, once)")
+    print(f"max abs difference {max_diff:.4f} (tolerance {TOLERANCE})")
+    if max_diff > TOLERANCE:
+        raise SystemExit("Packed samples differ from the per-sample transform")
+
+
+if __name__ == "__main__":
+    main()
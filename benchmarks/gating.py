@@ -0,0 +1,92 @@
+"""Skip ratio, speed and accuracy cost of frame-difference gating on a reference video
+
+Usage: python -m benchmarks.gating [--video assets/solidWhiteRight.mp4] [--thresholds 0.005,0.01,0.02]
+       [--max-skip 10] [--smoothing 0.0] [--hold 3] [--frames 120] [--model PATH]
+
+Scores the video through VideoPipeline without gating and with a FrameGate
+at each threshold, and reports the share of frames that reused a
+prediction, frames/sec and the error of the gated predictions against the
+ungated ones (mean, p95 and max, in degrees, plus the mean relative to the
+spread of the ungated predictions). The reference dashcam video moves
+continuously; ``--hold`` also writes a copy with every frame held for that
+many frames, through the encoder, to stand in for a stopped car or a
+higher-fps camera. Random weights are used unless ``--model`` is given.
+"""
+import argparse
+import os
+import tempfile
+
+import cv2
+import numpy as np
+
+from benchmarks import ROOT
+from benchmarks.measure import synthetic_video
+from benchmarks.suite import make_service
+from src.pipeline.gating import DEFAULT_MAX_SKIP, FrameGate
+from src.pipeline.video_pipeline import FrameSampler, VideoPipeline
+from video_results import DEGREES_PER_UNIT
+
+
+def read_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def score(service, path, frames, gate=None):
+    pipeline = VideoPipeline(service.model, service.device, cv2.VideoCapture(path), service.preprocessor,
+                             sampler=FrameSampler(end_frame=frames), gate=gate)
+    angles = np.array([result.steering_angle for result in pipeline], dtype=np.float64)
+    return angles, pipeline.stats
+
+
+def compare(name, service, path, frames, thresholds, max_skip, smoothing):
+    reference, stats = score(service, path, frames)
+    spread = float(reference.std()) * DEGREES_PER_UNIT
+    print(f"{name}: {len(reference)} frames, ungated {stats.as_dict()['fps']:.1f} fps, "
+          f"prediction spread (std) {spread:.3f} deg")
+    print(f"{'threshold':>10}{'skipped':>10}{'fps':>8}{'speedup':>9}{'mae_deg':>10}{'p95_deg':>10}"
+          f"{'max_deg':>10}{'mae/std':>9}")
+    for threshold in thresholds:
+        gate = FrameGate(threshold, max_skip, smoothing)
+        angles, gated_stats = score(service, path, frames, gate)
+        errors = np.abs(angles - reference) * DEGREES_PER_UNIT
+        fps = gated_stats.as_dict()["fps"]
+        print(f"{threshold:>10g}{gate.skip_ratio:>10.1%}{fps:>8.1f}{fps / stats.as_dict()['fps']:>8.2f}x"
+              f"{errors.mean():>10.4f}{np.percentile(errors, 95):>10.4f}{errors.max():>10.4f}"
+              f"{errors.mean() / spread if spread else 0.0:>9.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=os.path.join(ROOT, "assets", "solidWhiteRight.mp4"))
+    parser.add_argument("--thresholds", default="0.005,0.01,0.02")
+    parser.add_argument("--max-skip", type=int, default=DEFAULT_MAX_SKIP)
+    parser.add_argument("--smoothing", type=float, default=0.0)
+    parser.add_argument("--hold", type=int, default=3, help="Frames each frame is held in the static copy (1 skips it)")
+    parser.add_argument("--frames", type=int, default=120, help="Frames of the reference video to use")
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+    thresholds = [float(value) for value in args.thresholds.split(",")]
+
+    service = make_service(args.model)
+    compare("reference", service, args.video, args.frames, thresholds, args.max_skip, args.smoothing)
+    if args.hold > 1:
+        frames = read_frames(args.video, args.frames)
+        with tempfile.TemporaryDirectory() as directory:
+            fps = cv2.VideoCapture(args.video).get(cv2.CAP_PROP_FPS) or 25.0
+            held = synthetic_video(os.path.join(directory, "held.mp4"),
+                                   [frame for frame in frames for _ in range(args.hold)], fps * args.hold)
+            print()
+            compare(f"held x{args.hold}", service, held, len(frames) * args.hold, thresholds, args.max_skip,
+                    args.smoothing)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Overhead of the Prometheus instrumentation on the prediction path
+
+Usage: python -m benchmarks.instrumentation [--iterations 200] [--rounds 5]
+
+Measures the cost of a single metric update, then times
+``ModelService.predict_from_numpy`` and a full ``submit_numpy`` round trip
+through the batch scheduler with metrics enabled and disabled
+(``STEERING_METRICS=0``), alternating rounds so drift in machine load hits
+both sides equally.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.batching import make_service
+from benchmarks.measure import synthetic_frames
+import metrics
+
+
+def per_op_ns(fn, iterations=100000):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e9
+
+
+def count_updates(fn):
+    """Number of metric updates one call of ``fn`` makes"""
+    calls = [0]
+    originals = {cls: cls.__dict__[method] for cls, method in ((metrics.Histogram, "observe"), (metrics.Counter, "inc"))}
+
+    def counting(original):
+        def wrapper(self, *args, **kwargs):
+            calls[0] += 1
+            return original(self, *args, **kwargs)
+        return wrapper
+    for cls, original in originals.items():
+        setattr(cls, original.__name__, counting(original))
+    try:
+        fn()
+    finally:
+        for cls, original in originals.items():
+            setattr(cls, original.__name__, original)
+    return calls[0]
+
+
+def time_path(fn, iterations):
+    fn()
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=50, help="Predictions per round")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    histogram = metrics.Histogram("bench_seconds", "benchmark", ("stage",))
+    counter = metrics.Counter("bench_total", "benchmark", ("source",))
+
+    def timed():
+        with histogram.time(stage="x"):
+            pass
+    update_ns = per_op_ns(timed)
+    print(f"Histogram.observe: {per_op_ns(lambda: histogram.observe(0.003, stage='x')):.0f} ns")
+    print(f"Counter.inc:       {per_op_ns(lambda: counter.inc(source='x')):.0f} ns")
+    print(f"Histogram.time:    {update_ns:.0f} ns")
+
+    service = make_service(max_batch_size=16, max_wait_ms=0.0)
+    service.start_batching()
+    frame = synthetic_frames(1)[0]
+    # A distinct speed per call keeps the prediction cache out of the way
+    speeds = iter(np.arange(1e6))
+    paths = {
+        "predict_from_numpy": lambda: service.predict_from_numpy(frame),
+        "submit_numpy": lambda: service.submit_numpy(frame, 0.5, float(next(speeds))).result(),
+    }
+    print(f"{'path':<20}{'updates':>8}{'bound':>9}{'enabled ms':>12}{'disabled ms':>13}{'measured':>10}")
+    for name, fn in paths.items():
+        updates = count_updates(fn)
+        timings = {True: [], False: []}
+        for _ in range(args.rounds):
+            for enabled in (True, False):
+                metrics.ENABLED = enabled
+                timings[enabled].append(time_path(fn, args.iterations))
+        metrics.ENABLED = True
+        on, off = np.median(timings[True]), np.median(timings[False])
+        # Upper bound from per-update cost; the measured difference is mostly run-to-run noise
+        bound = updates * update_ns / 1e6 / off * 100
+        print(f"{name:<20}{updates:>8}{bound:>8.3f}%{on:>12.3f}{off:>13.3f}{(on - off) / off * 100:>9.2f}%")
+    service.stop_batching()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""End-to-end load test of the FastAPI app, in-process with synthetic frames and video
+
+Usage: python -m benchmarks.load [--concurrency 8] [--requests 64] [--video-requests 4] [--model PATH]
+
+Requests go through the full ASGI stack (routing, validation, the worker
+pool, micro-batching and JSON serialization) without a network socket.
+Every request uses a distinct throttle so the prediction caches never
+answer it.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import httpx
+import torch
+
+from benchmarks import API_DIR  # noqa: F401  (sets up sys.path)
+from benchmarks.measure import summarize, synthetic_frames, synthetic_video
+
+
+async def _drive(send, total, concurrency):
+    """Run ``send(i)`` for i in range(total) with ``concurrency`` requests in flight"""
+    latencies, statuses = [], {}
+    next_index = iter(range(total))
+
+    async def client():
+        for i in next_index:
+            start = time.perf_counter()
+            response = await send(i)
+            latencies.append(time.perf_counter() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    result = summarize(latencies, total, time.perf_counter() - start)
+    result["concurrency"] = concurrency
+    result["errors"] = total - statuses.get(200, 0)
+    result["status_codes"] = {str(code): count for code, count in sorted(statuses.items())}
+    return result
+
+
+async def _prepare_app(model_path, workdir, runtime=None):
+    # Keep video jobs in the benchmark's own directory: startup would otherwise open and resume the real job store
+    os.environ["STEERING_JOB_DIR"] = os.path.join(workdir, "jobs")
+    if runtime:
+        os.environ["STEERING_RUNTIME"] = runtime
+    import main
+
+    main.DEFAULT_MODEL_PATH = model_path
+    await main.startup_event()
+    try:
+        await asyncio.wrap_future(main.model_registry.ensure_loaded())
+    except Exception:
+        raise SystemExit(f"Could not load {model_path}")
+    return main
+
+
+def _random_checkpoint(directory):
+    """Seeded random weights are fine for timing; no trained checkpoint is needed"""
+    from model_service import SteeringModel
+
+    torch.manual_seed(0)
+    path = os.path.join(directory, "random.pth")
+    torch.save(SteeringModel().state_dict(), path)
+    return path
+
+
+async def run_load(concurrency=8, requests=64, video_requests=4, video_frames=50, model_path=None, runtime=None):
+    """Run every scenario and return ``{scenario: stats}``"""
+    workdir = tempfile.mkdtemp(prefix="steering-load-")
+    main = await _prepare_app(model_path or _random_checkpoint(workdir), workdir, runtime)
+    frames = synthetic_frames(32)
+    jpegs = [cv2.imencode(".jpg", frame)[1].tobytes() for frame in frames]
+    images = [base64.b64encode(jpeg).decode() for jpeg in jpegs]
+    results = {}
+    video_path = synthetic_video(os.path.join(workdir, "synthetic.mp4"), synthetic_frames(video_frames, seed=1))
+    with open(video_path, "rb") as f:
+        video = f.read()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=600) as client:
+            def throttle(i):
+                return round(i / (requests + 1), 6)
+
+            async def predict_json(i):
+                return await client.post("/api/predict", json={
+                    "image": images[i % len(images)], "throttle": throttle(i), "speed": 20.0
+                })
+
+            async def predict_binary(i):
+                return await client.post("/api/predict/binary", content=jpegs[i % len(jpegs)],
+                                         params={"throttle": throttle(i)}, headers={"Content-Type": "image/jpeg"})
+
+            async def predict_video(i):
+                return await client.post("/api/predict-video", params={"throttle": throttle(i)},
+                                         files={"file": ("synthetic.mp4", video, "video/mp4")})
+
+            await predict_json(requests)  # warmup, with a throttle no timed request uses
+            results["predict_json"] = await _drive(predict_json, requests, concurrency)
+            results["predict_binary"] = await _drive(predict_binary, requests, concurrency)
+            if video_requests:
+                results["predict_video"] = await _drive(predict_video, video_requests, min(concurrency, 2))
+                results["predict_video"]["frames_per_video"] = video_frames
+    finally:
+        await main.shutdown_event()
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=64, help="Requests per image scenario")
+    parser.add_argument("--video-requests", type=int, default=4)
+    parser.add_argument("--video-frames", type=int, default=50)
+    parser.add_argument("--model", default=None, help="state_dict checkpoint (random weights if omitted)")
+    parser.add_argument("--runtime", default=None, help="STEERING_RUNTIME for the app")
+    args = parser.parse_args()
+    results = asyncio.run(run_load(args.concurrency, args.requests, args.video_requests, args.video_frames,
+                                   args.model, args.runtime))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Timing, memory and synthetic-input helpers shared by the benchmark suite"""
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MiB (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def summarize(latencies, items, elapsed):
+    """Throughput and latency percentiles for per-call ``latencies`` in seconds covering ``items`` items"""
+    latencies_ms = np.asarray(latencies, dtype=np.float64) * 1000.0
+    return {
+        "calls": len(latencies_ms),
+        "items": items,
+        "throughput_per_s": round(items / elapsed, 3) if elapsed > 0 else 0.0,
+        "mean_ms": round(float(latencies_ms.mean()), 3),
+        "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies_ms, 99)), 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1) if resource is not None else None
+    }
+
+
+def time_calls(fn, iterations, items_per_call=1, warmup=1):
+    """Call ``fn`` ``iterations`` times after ``warmup`` untimed calls and summarize the timings"""
+    for _ in range(warmup):
+        fn()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_start)
+    return summarize(latencies, iterations * items_per_call, time.perf_counter() - start)
+
+
+def synthetic_frames(count, height=360, width=640, seed=0):
+    """Road-like BGR frames: a vertical gradient with a moving lane stripe plus noise"""
+    rng = np.random.default_rng(seed)
+    base = np.linspace(40, 200, height, dtype=np.float32)[:, None, None] * np.ones((1, width, 3), np.float32)
+    frames = []
+    for i in range(count):
+        frame = base + rng.normal(0, 12, (height, width, 3)).astype(np.float32)
+        x = (width // 3 + 4 * i) % width
+        frame[height // 2:, x:x + 12] = 255
+        frames.append(np.clip(frame, 0, 255).astype(np.uint8))
+    return frames
+
+
+def synthetic_video(path, frames, fps=25.0):
+    """Write ``frames`` to an mp4 file and return its path"""
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Could not open a video writer for {path}")
+    try:
+        for frame in frames:
+            writer.write(frame)
+    finally:
+        writer.release()
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        raise RuntimeError(f"Could not write synthetic video {path}")
+    return path
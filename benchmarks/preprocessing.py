@@ -0,0 +1,93 @@
+"""Parity and speed of BatchPreprocessor against the torchvision transform chain
+
+Usage: python -m benchmarks.preprocessing [--video assets/solidWhiteRight.mp4] [--frames 32]
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+import torch
+import torchvision.transforms as transforms
+
+from benchmarks import ROOT
+from src.model.steering_model import SteeringModel
+from src.pipeline.preprocessing import BatchPreprocessor
+
+# Maximum absolute difference allowed in normalized pixel space (about one uint8 step / std)
+TOLERANCE = 0.02
+
+
+def reference_transform():
+    """The per-frame transform the services used before BatchPreprocessor"""
+    return transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((224, 224)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+    ])
+
+
+def read_frames(path, count):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"Could not read frames from {path}")
+    return frames
+
+
+def time_per_frame(fn, frames, repeats):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / (repeats * len(frames)) * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--video", default=os.path.join(ROOT, "assets", "solidWhiteRight.mp4"))
+    parser.add_argument("--frames", type=int, default=32)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames)
+    transform = reference_transform()
+    preprocessor = BatchPreprocessor((224, 224))
+    out = preprocessor.empty(len(frames))
+
+    def old():
+        return torch.stack([transform(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)) for frame in frames])
+
+    def new():
+        return preprocessor(frames, bgr=True, out=out)
+
+    expected, actual = old(), new()
+    diff = (expected - actual).abs()
+    torch.manual_seed(0)
+    model = SteeringModel().eval()
+    extra = torch.tensor([[0.5, 20.0]]).expand(len(frames), -1)
+    with torch.no_grad():
+        drift = (model(expected, extra) - model(actual, extra)).abs()
+
+    old_ms = time_per_frame(old, frames, args.repeats)
+    new_ms = time_per_frame(new, frames, args.repeats)
+    height, width = frames[0].shape[:2]
+    print(f"frames: {len(frames)} at {width}x{height}")
+    print(f"pixel diff: max {diff.max().item():.5f}, mean {diff.mean().item():.6f} (tolerance {TOLERANCE})")
+    print(f"model output drift: max {drift.max().item():.6f}")
+    print(f"torchvision chain: {old_ms:.3f} ms/frame")
+    print(f"BatchPreprocessor: {new_ms:.3f} ms/frame ({old_ms / new_ms:.1f}x faster)")
+    if diff.max().item() > TOLERANCE:
+        raise SystemExit("Parity check failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Accuracy drift and latency of the optimized CPU runtimes against the fp32 eager model
+
+Usage: python -m benchmarks.runtime [--model data/steering_model_v2.pth] [--runtimes fused torchscript int8]
+       [--batch-sizes 1 8] [--video assets/solidWhiteRight.mp4]
+
+Calibration uses every ``--stride``-th frame of the video; drift is measured
+on the frames halfway in between, so the int8 model is not scored on the
+frames it was calibrated on. Without ``--model`` seeded random weights are
+used, which is fine for latency but only indicative for drift.
+"""
+import argparse
+import os
+import time
+
+import torch
+
+from benchmarks import ROOT
+from benchmarks.preprocessing import read_frames
+from src.model.runtime import RUNTIMES, measure_drift, optimize_model
+from src.model.steering_model import SteeringModel
+from src.pipeline.preprocessing import BatchPreprocessor
+
+
+def load_reference(path):
+    torch.manual_seed(0)
+    model = SteeringModel()
+    if path:
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+    return model.eval()
+
+
+def latency_ms(model, images, repeats):
+    extra = torch.tensor([[0.5, 20.0]]).expand(len(images), -1)
+    with torch.inference_mode():
+        model(images, extra)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            model(images, extra)
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model", default=None, help="fp32 state_dict checkpoint (random weights if omitted)")
+    parser.add_argument("--video", default=os.path.join(ROOT, "assets", "solidWhiteRight.mp4"))
+    parser.add_argument("--runtimes", nargs="+", default=[r for r in RUNTIMES if r != "eager"], choices=RUNTIMES)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--frames", type=int, default=256, help="Frames read from the video")
+    parser.add_argument("--stride", type=int, default=4, help="Calibrate on every stride-th frame")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    frames = read_frames(args.video, args.frames)
+    preprocessor = BatchPreprocessor((224, 224))
+    calibration = preprocessor(frames[::args.stride], bgr=True)
+    evaluation = preprocessor(frames[args.stride // 2::args.stride], bgr=True)
+    reference = load_reference(args.model)
+    print(f"threads: {torch.get_num_threads()}, calibration frames: {len(calibration)}, "
+          f"evaluation frames: {len(evaluation)}, weights: {args.model or 'random'}")
+
+    baseline = {size: latency_ms(reference, evaluation[:size], args.repeats) for size in args.batch_sizes}
+    header = f"{'runtime':<12} {'build s':>8} {'max err deg':>12} {'mean err deg':>13}"
+    header += "".join(f" {f'b{size} ms':>9} {'speedup':>8}" for size in args.batch_sizes)
+    print(header)
+    row = f"{'eager':<12} {'-':>8} {0.0:>12.4f} {0.0:>13.4f}"
+    row += "".join(f" {baseline[size]:>9.2f} {1.0:>7.2f}x" for size in args.batch_sizes)
+    print(row)
+    for runtime in args.runtimes:
+        if runtime == "eager":
+            continue
+        start = time.perf_counter()
+        try:
+            model = optimize_model(reference, runtime, calibration)
+        except (RuntimeError, ValueError) as e:
+            print(f"{runtime:<12} skipped: {e}")
+            continue
+        build = time.perf_counter() - start
+        drift = measure_drift(reference, model, evaluation)
+        row = f"{runtime:<12} {build:>8.2f} {drift['max_abs_error_degrees']:>12.4f} {drift['mean_abs_error_degrees']:>13.4f}"
+        for size in args.batch_sizes:
+            ms = latency_ms(model, evaluation[:size], args.repeats)
+            row += f" {ms:>9.2f} {baseline[size] / ms:>7.2f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""Requests/sec of the pre-fork server as the number of worker processes grows
+
+Usage: python -m benchmarks.scaling [--workers 1,2,4] [--requests 200] [--clients-per-worker 4] [--model PATH]
+
+Starts ``api/main.py --workers N`` on a free local port for every N,
+waits until it reports healthy, then drives ``/api/predict/binary`` over
+real HTTP with a fixed number of concurrent clients per worker. Each
+request carries a distinct speed so the prediction caches never answer it.
+Reports throughput, speedup and scaling efficiency against one worker, and
+the resident (RSS) versus proportional (PSS) memory of the server processes:
+with the weights loaded before the fork, PSS grows much more slowly than
+RSS as workers are added. The client runs in this process, so leave it
+some cores: on a machine with C cores, benchmark up to roughly C - 2
+workers.
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import httpx
+
+from benchmarks import API_DIR
+from benchmarks.load import _drive, _random_checkpoint
+from benchmarks.measure import synthetic_frames
+from inference_pool import available_cpus
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _process_tree(pid):
+    """``pid`` and its direct children (the forked workers)"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [pid] + [int(child) for child in f.read().split()]
+    except OSError:
+        return [pid]
+
+
+def memory_mb(pids):
+    """Summed RSS and PSS of ``pids`` in MiB, from /proc/<pid>/smaps_rollup (Linux only)"""
+    totals = {"rss_mb": 0.0, "pss_mb": 0.0}
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/smaps_rollup") as f:
+                for line in f:
+                    field, _, value = line.partition(":")
+                    if field in ("Rss", "Pss"):
+                        totals[f"{field.lower()}_mb"] += int(value.split()[0]) / 1024
+        except OSError:
+            return None
+    return {name: round(value, 1) for name, value in totals.items()}
+
+
+async def _wait_healthy(client, process, timeout=300.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"Server exited with status {process.returncode}")
+        try:
+            if (await client.get("/api/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("Server did not become healthy")
+
+
+async def measure(workers, model_path, requests, clients_per_worker, jpeg):
+    port = _free_port()
+    env = dict(os.environ, STEERING_MODEL_PATH=model_path)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(API_DIR, "main.py"), "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    concurrency = workers * clients_per_worker
+    limits = httpx.Limits(max_connections=concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=600, limits=limits) as client:
+            await _wait_healthy(client, process)
+            counter = iter(range(10 ** 9))
+
+            def send(i):
+                return client.post("/api/predict/binary", params={"speed": next(counter)}, content=jpeg,
+                                   headers={"Content-Type": "image/jpeg"})
+            # Untimed round so every worker has loaded, warmed up and opened its connections
+            await _drive(send, concurrency * 4, concurrency)
+            result = await _drive(send, requests, concurrency)
+            result["workers"] = workers
+            result["memory"] = memory_mb(_process_tree(process.pid))
+            return result
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default=None,
+                        help="Comma-separated worker counts (default: powers of two up to the CPU count)")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per worker count")
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--model", default=None, help="state_dict checkpoint (random weights if omitted)")
+    args = parser.parse_args()
+
+    if args.workers:
+        counts = [int(count) for count in args.workers.split(",")]
+    else:
+        counts = [1]
+        while counts[-1] * 2 <= available_cpus():
+            counts.append(counts[-1] * 2)
+    workdir = tempfile.mkdtemp(prefix="steering-scaling-")
+    try:
+        model_path = args.model or _random_checkpoint(workdir)
+        jpeg = cv2.imencode(".jpg", synthetic_frames(1)[0])[1].tobytes()
+        print(f"{available_cpus()} CPUs available")
+        print(f"{'workers':>8}{'req/s':>10}{'speedup':>9}{'eff.':>7}{'p50 ms':>9}{'p95 ms':>9}"
+              f"{'errors':>8}{'RSS MB':>9}{'PSS MB':>9}")
+        base = None
+        for workers in counts:
+            result = asyncio.run(measure(workers, model_path, args.requests, args.clients_per_worker, jpeg))
+            rate = result["throughput_per_s"]
+            base = base or rate
+            memory = result["memory"] or {"rss_mb": float("nan"), "pss_mb": float("nan")}
+            print(f"{workers:>8}{rate:>10.1f}{rate / base:>8.2f}x{rate / base / workers * 100:>6.0f}%"
+                  f"{result['p50_ms']:>9.1f}{result['p95_ms']:>9.1f}{result['errors']:>8}"
+                  f"{memory['rss_mb']:>9.0f}{memory['pss_mb']:>9.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Aggregate throughput and fairness of StreamManager as camera streams are added
+
+Usage: python -m benchmarks.streams [--streams 1,2,4,8,16] [--max-fps 10] [--batch-sizes 1,8]
+       [--seconds 5] [--warmup 2] [--source-fps 25] [--model PATH]
+
+Every stream reads its own looping copy of a synthetic video, paced to
+``--source-fps`` like a live camera, with a per-stream cap of ``--max-fps``
+(0 for none). For each stream count and scheduler batch size the
+benchmark subscribes to all results and reports, over ``--seconds`` after
+``--warmup``: the aggregate scored frames/sec, the demand (streams x cap),
+the slowest and fastest stream, Jain's fairness index, mean and p95
+capture-to-result latency and the mean size of the shared forward passes.
+``--batch-sizes 1`` is the unbatched baseline of one forward per frame.
+Random weights are used unless ``--model`` is given.
+"""
+import argparse
+import collections
+import os
+import tempfile
+import time
+
+import numpy as np
+import torch
+
+from benchmarks.measure import synthetic_frames, synthetic_video
+from benchmarks.suite import make_service
+from src.pipeline.streams import StreamManager
+
+
+def run(service, paths, max_fps, max_batch, seconds, warmup):
+    manager = StreamManager(service.predict_batch, max_batch=max_batch)
+    try:
+        stream_ids = [manager.add_stream(path, max_fps=max_fps, loop=True) for path in paths]
+        time.sleep(warmup)
+        counts = collections.Counter()
+        latencies = []
+        batches, batched = manager.batches, manager.batched_frames
+        with manager.subscribe(maxsize=100000) as subscription:
+            start = time.perf_counter()
+            while time.perf_counter() - start < seconds:
+                for result in subscription.drain(timeout=0.1):
+                    counts[result.stream_id] += 1
+                    latencies.append(result.latency)
+            elapsed = time.perf_counter() - start
+        batches, batched = manager.batches - batches, manager.batched_frames - batched
+    finally:
+        manager.close()
+    rates = np.array([counts[stream_id] / elapsed for stream_id in stream_ids], dtype=np.float64)
+    latencies_ms = np.asarray(latencies or [0.0]) * 1000.0
+    return {
+        "fps": rates.sum(),
+        "min_fps": rates.min(),
+        "max_fps": rates.max(),
+        "fairness": rates.sum() ** 2 / (len(rates) * (rates ** 2).sum()) if rates.any() else 0.0,
+        "latency_ms": latencies_ms.mean(),
+        "p95_ms": np.percentile(latencies_ms, 95),
+        "batch": batched / batches if batches else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--streams", default="1,2,4,8,16")
+    parser.add_argument("--max-fps", type=float, default=10.0, help="Per-stream cap (0 for none)")
+    parser.add_argument("--batch-sizes", default="1,8", help="Scheduler max_batch values to compare")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--source-fps", type=float, default=25.0)
+    parser.add_argument("--frames", type=int, default=50, help="Frames per synthetic clip before it loops")
+    parser.add_argument("--model", default=None)
+    args = parser.parse_args()
+    counts = [int(value) for value in args.streams.split(",")]
+    batch_sizes = [int(value) for value in args.batch_sizes.split(",")]
+    max_fps = args.max_fps or None
+
+    service = make_service(args.model)
+    print(f"{torch.get_num_threads()} torch threads, {os.cpu_count()} cpus, "
+          f"sources at {args.source_fps:g} fps, cap {max_fps or 'none'} fps per stream")
+    print(f"{'streams':>8}{'batch':>7}{'demand':>8}{'fps':>8}{'min':>7}{'max':>7}{'fair':>7}"
+          f"{'lat_ms':>9}{'p95_ms':>9}{'mean_b':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(max(counts)):
+            # Different seeds, so the streams are not byte-identical clips
+            paths.append(synthetic_video(os.path.join(directory, f"camera{i}.mp4"),
+                                         synthetic_frames(args.frames, seed=i), args.source_fps))
+        for count in counts:
+            demand = count * (max_fps or args.source_fps)
+            for max_batch in batch_sizes:
+                result = run(service, paths[:count], max_fps, max_batch, args.seconds, args.warmup)
+                print(f"{count:>8}{max_batch:>7}{demand:>8.0f}{result['fps']:>8.1f}{result['min_fps']:>7.1f}"
+                      f"{result['max_fps']:>7.1f}{result['fairness']:>7.3f}{result['latency_ms']:>9.1f}"
+                      f"{result['p95_ms']:>9.1f}{result['batch']:>8.2f}", flush=True)
+
+
+if __name__ == "__main__":
+    main()
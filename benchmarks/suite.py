@@ -0,0 +1,179 @@
+"""Reproducible benchmark suite for the inference hot paths
+
+Usage: python -m benchmarks [--quick] [--output results.json] [--save-baseline benchmarks/baseline.json]
+       [--baseline benchmarks/baseline.json] [--tolerance 0.15] [--skip-load] [--model PATH]
+
+Times video decode, preprocessing, the raw SteeringModel forward at batch
+sizes 1-64, ModelService.predict_from_base64/predict_from_numpy and an
+in-process end-to-end load test, then prints one JSON document with
+throughput, p50/p95/p99 latency and peak RSS per case. With ``--baseline``
+every case is compared against a saved run and the process exits with
+status 1 if throughput dropped or p95 latency grew by more than
+``--tolerance``. Inputs are synthetic and seeded, so runs on the same
+machine are comparable.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import platform
+import sys
+import tempfile
+
+import cv2
+import torch
+
+from benchmarks import API_DIR  # noqa: F401  (sets up sys.path)
+from benchmarks.load import run_load
+from benchmarks.measure import peak_rss_mb, synthetic_frames, synthetic_video, time_calls
+from model_service import ModelService, SteeringModel
+
+BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+QUICK_BATCH_SIZES = (1, 8, 64)
+
+
+def make_service(model_path=None, runtime="eager"):
+    service = ModelService(runtime=runtime)
+    if model_path:
+        service.model_path = model_path
+        if not service.load_model():
+            raise SystemExit(f"Could not load {model_path}")
+    else:
+        # Random weights are fine for timing; no checkpoint is needed
+        torch.manual_seed(0)
+        service.model = service.optimize(SteeringModel().to(service.device).eval())
+    return service
+
+
+def bench_decode(video_path):
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def read():
+        if not cap.read()[0]:
+            raise RuntimeError("Synthetic video ended early")
+    try:
+        return time_calls(read, total - 1, warmup=1)
+    finally:
+        cap.release()
+
+
+def run_micro(service, frames, video_path, batch_sizes, iterations):
+    results = {"decode_video": bench_decode(video_path)}
+    preprocessor = service.preprocessor
+    batch = frames[:8]
+    results["preprocess_b1"] = time_calls(lambda: preprocessor(frames[:1], bgr=True), iterations)
+    results["preprocess_b8"] = time_calls(lambda: preprocessor(batch, bgr=True), iterations, items_per_call=8)
+
+    images = preprocessor(frames[:max(batch_sizes)] * (max(batch_sizes) // len(frames) + 1), bgr=True)
+    extra = torch.tensor([[0.5, 20.0]]).to(service.device)
+    for size in batch_sizes:
+        inputs = images[:size].to(service.device)
+        features = extra.expand(size, -1)
+
+        def forward():
+            with torch.inference_mode():
+                service.model(inputs, features)
+        # Fewer calls for big batches so every size costs roughly the same wall time
+        results[f"forward_b{size}"] = time_calls(forward, max(3, iterations // size), items_per_call=size)
+
+    jpeg = base64.b64encode(cv2.imencode(".jpg", frames[0])[1].tobytes()).decode()
+    results["predict_from_base64"] = time_calls(lambda: service.predict_from_base64(jpeg), iterations)
+    results["predict_from_numpy"] = time_calls(lambda: service.predict_from_numpy(frames[0]), iterations)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Cases whose throughput fell or p95 latency rose by more than ``tolerance`` versus ``baseline``"""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if previous["throughput_per_s"] and current["throughput_per_s"] < previous["throughput_per_s"] * (1 - tolerance):
+            regressions.append({"case": name, "metric": "throughput_per_s",
+                                "baseline": previous["throughput_per_s"], "current": current["throughput_per_s"]})
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append({"case": name, "metric": "p95_ms",
+                                "baseline": previous["p95_ms"], "current": current["p95_ms"]})
+    return regressions
+
+
+def environment(args):
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "runtime": args.runtime,
+        "weights": args.model or "random",
+        "quick": args.quick
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="Fewer iterations and batch sizes 1/8/64 only")
+    parser.add_argument("--iterations", type=int, default=None, help="Calls per case (default 30, 10 with --quick)")
+    parser.add_argument("--model", default=None, help="state_dict checkpoint (random weights if omitted)")
+    parser.add_argument("--runtime", default="eager", help="Model runtime, see src.model.runtime.RUNTIMES")
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads")
+    parser.add_argument("--skip-load", action="store_true", help="Skip the end-to-end load test")
+    parser.add_argument("--concurrency", type=int, default=8, help="Load test clients")
+    parser.add_argument("--output", default=None, help="Write the JSON results here instead of stdout")
+    parser.add_argument("--save-baseline", default=None, help="Also save the results as a baseline file")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    iterations = args.iterations or (10 if args.quick else 30)
+    batch_sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+
+    frames = synthetic_frames(16)
+    workdir = tempfile.mkdtemp(prefix="steering-bench-")
+    video_path = synthetic_video(os.path.join(workdir, "synthetic.mp4"), synthetic_frames(60, seed=1))
+    try:
+        service = make_service(args.model, args.runtime)
+        results = run_micro(service, frames, video_path, batch_sizes, iterations)
+        del service
+        if not args.skip_load:
+            requests = 16 if args.quick else 64
+            load = asyncio.run(run_load(args.concurrency, requests, 2 if args.quick else 4,
+                                        model_path=args.model, runtime=args.runtime))
+            results.update({f"load_{name}": stats for name, stats in load.items()})
+    finally:
+        os.remove(video_path)
+        os.rmdir(workdir)
+
+    report = {"environment": environment(args), "results": results, "peak_rss_mb": peak_rss_mb()}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["baseline"] = {"path": args.baseline, "tolerance": args.tolerance,
+                              "environment": baseline.get("environment"),
+                              "regressions": compare(results, baseline, args.tolerance)}
+
+    document = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(document + "\n")
+    else:
+        print(document)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(json.dumps({"environment": report["environment"], "results": results}, indent=2) + "\n")
+
+    regressions = report.get("baseline", {}).get("regressions", [])
+    for regression in regressions:
+        print(f"REGRESSION {regression['case']} {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
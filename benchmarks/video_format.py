@@ -0,0 +1,47 @@
+"""Payload size and serialization time of the video result formats
+
+Usage: python -m benchmarks.video_format [--frames 90000]
+
+Fills a VideoPredictions with ``--frames`` synthetic predictions (90000 is
+one hour at 25 fps) and times rendering it as the ``records`` JSON list
+(the VideoPredictionResponse path, including pydantic serialization), as
+``columnar`` JSON and as an ``npz`` archive.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks import API_DIR  # noqa: F401  (sets up sys.path)
+from main import VideoPredictionResponse, _json_response
+from video_results import VideoPredictions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=90000)
+    parser.add_argument("--fps", type=float, default=25.0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    predictions = VideoPredictions(0.5, 20.0)
+    for index, angle in enumerate(rng.normal(0, 0.2, args.frames).astype(np.float32).tolist()):
+        predictions.add(index, index / args.fps, angle)
+    meta = {"total_frames": args.frames, "fps": args.fps, "scored_frames": args.frames,
+            "sampling": {"stride": 1, "start_frame": 0, "end_frame": None}, "stats": None, "cached": False}
+    formats = {
+        "records": lambda: _json_response(VideoPredictionResponse(predictions=predictions.records(), **meta)).body,
+        "columnar": lambda: predictions.to_columnar_json(meta).encode(),
+        "npz": lambda: predictions.to_npz(meta),
+    }
+    print(f"{args.frames} frames")
+    print(f"{'format':<10}{'ms':>10}{'MB':>10}")
+    for name, render in formats.items():
+        start = time.perf_counter()
+        body = render()
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{elapsed * 1000:>10.1f}{len(body) / 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,7 @@ import * as React from "react"
 import { Button } from "@/components/ui/button"
 import { Card, CardContent } from "@/components/ui/card"
 import { Badge } from "@/components/ui/badge"
-import { apiClient, extractVideoFrame } from "@/lib/api-client"
+import { apiClient, extractVideoFrameBlob, PredictionStream } from "@/lib/api-client"
 
 type VideoPlayerProps = {
   onAngle?: (value: number) => void
@@ -46,22 +46,16 @@ export function VideoPlayer({ onAngle, simulate = true, onBackendStatus }: Video
     checkBackend()
   }, [isClient, onBackendStatus])
 
-  // Prediction logic
+  // Prediction logic: frames go over one WebSocket session; the server skips stale frames
+  const streamRef = React.useRef<PredictionStream | null>(null)
+
   const makePrediction = async (video: HTMLVideoElement) => {
-    if (isProcessing || !backendAvailable) return
+    const stream = streamRef.current
+    if (!stream || !stream.isOpen) return
 
     try {
       setIsProcessing(true)
-      const frameBase64 = extractVideoFrame(video)
-      const response = await apiClient.predict({
-        image: frameBase64,
-        throttle: 0.5,
-        speed: 20.0
-      })
-      
-      const angleDegrees = response.steering_angle_degrees
-      setLastPrediction(angleDegrees)
-      onAngle?.(angleDegrees)
+      await stream.sendFrame(await extractVideoFrameBlob(video))
     } catch (error) {
       console.error("Prediction error:", error)
     } finally {
@@ -98,6 +92,14 @@ export function VideoPlayer({ onAngle, simulate = true, onBackendStatus }: Video
       clearInterval(predictionIntervalRef.current)
     }
 
+    streamRef.current = new PredictionStream(
+      (prediction) => {
+        setLastPrediction(prediction.steering_angle_degrees)
+        onAngle?.(prediction.steering_angle_degrees)
+      },
+      { throttle: 0.5, speed: 20.0 }
+    )
+
     // Start prediction interval (10 FPS)
     predictionIntervalRef.current = setInterval(() => {
       if (v.currentTime > 0 && !v.paused) {
@@ -109,6 +111,8 @@ export function VideoPlayer({ onAngle, simulate = true, onBackendStatus }: Video
       if (predictionIntervalRef.current) {
         clearInterval(predictionIntervalRef.current)
       }
+      streamRef.current?.close()
+      streamRef.current = null
     }
   }, [simulate, backendAvailable, objectUrl, isClient])
 
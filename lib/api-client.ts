@@ -4,6 +4,7 @@ export interface PredictionRequest {
   image: string // base64 encoded
   throttle?: number
   speed?: number
+  model?: string // registry name; the server's default model if omitted
 }
 
 export interface PredictionResponse {
@@ -12,13 +13,55 @@ export interface PredictionResponse {
   throttle: number
   speed: number
   device: string
+  model?: string // "name:version" that produced the prediction
+}
+
+export interface BatchPredictionResponse {
+  predictions: PredictionResponse[]
+}
+
+export interface SweepRequest {
+  image: string // base64 encoded
+  throttles: number[]
+  speeds: number[]
+  model?: string
+}
+
+export interface SweepResponse {
+  throttles: number[]
+  speeds: number[]
+  steering_angles: number[][] // [throttle index][speed index]
+  steering_angles_degrees: number[][]
+  embedding_cached: boolean
+  device: string
 }
 
 export interface HealthResponse {
-  status: string
+  status: string // 'starting' while the model loads and warms up, then 'healthy'
   model_loaded: boolean
   device: string
   cuda_available: boolean
+  startup_seconds: Record<string, number>
+}
+
+export interface ModelInfo {
+  name: string
+  path: string
+  default: boolean
+  resident: boolean
+  loading: boolean
+  version: number
+  loaded_at: number | null
+  leases: number
+  error: string | null
+  runtime: string | null
+}
+
+export interface ModelsResponse {
+  default_model: string
+  max_resident: number
+  retired_in_use: number
+  models: ModelInfo[]
 }
 
 export interface VideoPredictionResponse {
@@ -33,6 +76,127 @@ export interface VideoPredictionResponse {
   }>
   total_frames: number
   fps: number
+  scored_frames: number
+  sampling: VideoSampling
+  stats?: Record<string, any>
+}
+
+// format=columnar: per-video constants once, one array per column, failed frames in `errors`
+export interface ColumnarVideoPredictions {
+  format: 'columnar'
+  total_frames: number
+  fps: number
+  scored_frames: number
+  sampling: VideoSampling
+  cached: boolean
+  stats?: Record<string, any>
+  throttle: number
+  speed: number
+  degrees_per_unit: number
+  errors: Array<{ frame: number; timestamp: number; error: string }>
+  frames: number[]
+  timestamps: number[]
+  steering_angles: number[]
+}
+
+export interface VideoSampling {
+  stride: number
+  start_frame: number
+  end_frame: number | null
+}
+
+export interface VideoSamplingOptions {
+  stride?: number
+  targetFps?: number
+  startTime?: number
+  endTime?: number
+  // Frame-difference gating: frames that changed less than gateThreshold (0-1) reuse the last prediction
+  gateThreshold?: number
+  gateMaxSkip?: number
+  gateSmoothing?: number
+}
+
+export type VideoStreamRecord =
+  | { type: 'meta'; fps: number; total_frames: number; sampling: VideoSampling }
+  | ({ type: 'prediction' } & VideoPredictionResponse['predictions'][number])
+  | { type: 'summary'; scored_frames: number; stats?: Record<string, any> }
+
+export type VideoJobStatus = 'queued' | 'running' | 'completed' | 'failed' | 'cancelled'
+
+export interface VideoJob {
+  job_id: string
+  status: VideoJobStatus
+  created_at: number
+  updated_at: number
+  params: Record<string, any>
+  progress: {
+    scored_frames: number
+    last_frame: number | null
+    total_frames: number | null
+    fraction: number
+  }
+  error: string | null
+  stats: Record<string, any> | null
+}
+
+export interface LiveStreamRequest {
+  source: string // camera index, rtsp/rtmp/http(s) URL or video file inside the server's stream directory
+  stream_id?: string
+  max_fps?: number
+  throttle?: number
+  speed?: number
+  loop?: boolean
+  gate_threshold?: number
+  gate_max_skip?: number
+  gate_smoothing?: number
+}
+
+export interface LiveStreamStats {
+  source: string
+  max_fps: number | null
+  capture_fps: number
+  fps: number
+  latency_ms: number
+  received: number
+  scored: number
+  dropped: number
+  errors: number
+  finished: boolean
+  error: string | null
+  gating?: Record<string, any>
+}
+
+export interface LiveStreamsResponse {
+  streams: Record<string, LiveStreamStats>
+  aggregate_fps: number
+  published: number
+  batches: number
+  mean_batch_size: number
+  fairness: number | null
+  subscribers: number
+}
+
+export interface LiveStreamResult {
+  stream_id: string
+  frame: number
+  steering_angle: number | null
+  latency_ms: number
+  batch_size: number
+  gated: boolean
+  error: string | null
+}
+
+function videoQuery(throttle: number, speed: number, sampling: VideoSamplingOptions, model?: string): URLSearchParams {
+  const params = new URLSearchParams({ throttle: throttle.toString(), speed: speed.toString() })
+  if (model) params.set('model', model)
+  if (sampling.stride !== undefined) params.set('stride', sampling.stride.toString())
+  if (sampling.targetFps !== undefined) params.set('target_fps', sampling.targetFps.toString())
+  if (sampling.startTime !== undefined) params.set('start_time', sampling.startTime.toString())
+  if (sampling.endTime !== undefined) params.set('end_time', sampling.endTime.toString())
+  if (sampling.gateThreshold !== undefined) params.set('gate_threshold', sampling.gateThreshold.toString())
+  if (sampling.gateMaxSkip !== undefined) params.set('gate_max_skip', sampling.gateMaxSkip.toString())
+  if (sampling.gateSmoothing !== undefined) params.set('gate_smoothing', sampling.gateSmoothing.toString())
+  return params
 }
 
 class ApiError extends Error {
@@ -88,23 +252,218 @@ export class ApiClient {
     return handleResponse<PredictionResponse>(response)
   }
 
+  async predictSweep(request: SweepRequest): Promise<SweepResponse> {
+    const response = await fetch(`${this.baseUrl}/api/predict-sweep`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify(request),
+    })
+    return handleResponse<SweepResponse>(response)
+  }
+
+  async predictImages(
+    images: Blob | Blob[],
+    throttle: number = 0.5,
+    speed: number = 20.0,
+    model?: string
+  ): Promise<BatchPredictionResponse> {
+    // Raw image bytes avoid the base64/JSON overhead of predict()
+    let body: BodyInit
+    const headers: Record<string, string> = {}
+    if (Array.isArray(images)) {
+      const formData = new FormData()
+      images.forEach((image, i) => formData.append('frames', image, `frame-${i}.jpg`))
+      body = formData
+    } else {
+      body = images
+      headers['Content-Type'] = images.type || 'image/jpeg'
+    }
+
+    const params = new URLSearchParams({ throttle: throttle.toString(), speed: speed.toString() })
+    if (model) params.set('model', model)
+    const response = await fetch(`${this.baseUrl}/api/predict/binary?${params}`, {
+      method: 'POST',
+      headers,
+      body,
+    })
+    return handleResponse<BatchPredictionResponse>(response)
+  }
+
   async predictVideo(
     file: File,
     throttle: number = 0.5,
-    speed: number = 20.0
+    speed: number = 20.0,
+    sampling: VideoSamplingOptions = {},
+    model?: string
   ): Promise<VideoPredictionResponse> {
     const formData = new FormData()
     formData.append('file', file)
-    formData.append('throttle', throttle.toString())
-    formData.append('speed', speed.toString())
 
-    const response = await fetch(`${this.baseUrl}/api/predict-video`, {
+    const params = videoQuery(throttle, speed, sampling, model)
+    const response = await fetch(`${this.baseUrl}/api/predict-video?${params}`, {
       method: 'POST',
       body: formData,
     })
     return handleResponse<VideoPredictionResponse>(response)
   }
 
+  async predictVideoColumnar(
+    file: File,
+    throttle: number = 0.5,
+    speed: number = 20.0,
+    sampling: VideoSamplingOptions = {},
+    model?: string
+  ): Promise<ColumnarVideoPredictions> {
+    // Same as predictVideo() with a much smaller payload for long videos
+    const formData = new FormData()
+    formData.append('file', file)
+
+    const params = videoQuery(throttle, speed, sampling, model)
+    params.set('format', 'columnar')
+    const response = await fetch(`${this.baseUrl}/api/predict-video?${params}`, {
+      method: 'POST',
+      body: formData,
+    })
+    return handleResponse<ColumnarVideoPredictions>(response)
+  }
+
+  async predictVideoStream(
+    file: File,
+    onRecord: (record: VideoStreamRecord) => void,
+    throttle: number = 0.5,
+    speed: number = 20.0,
+    sampling: VideoSamplingOptions = {},
+    model?: string
+  ): Promise<void> {
+    const formData = new FormData()
+    formData.append('file', file)
+
+    const params = videoQuery(throttle, speed, sampling, model)
+    const response = await fetch(`${this.baseUrl}/api/predict-video/stream?${params}`, {
+      method: 'POST',
+      body: formData,
+    })
+    if (!response.ok || !response.body) {
+      await handleResponse<unknown>(response)
+      return
+    }
+
+    // Records arrive as newline-delimited JSON while the server is still decoding
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffered = ''
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffered += decoder.decode(value, { stream: true })
+      const lines = buffered.split('\n')
+      buffered = lines.pop() ?? ''
+      for (const line of lines) {
+        if (line.trim()) onRecord(JSON.parse(line))
+      }
+    }
+    if (buffered.trim()) onRecord(JSON.parse(buffered))
+  }
+
+  async submitVideoJob(
+    file: File,
+    throttle: number = 0.5,
+    speed: number = 20.0,
+    sampling: VideoSamplingOptions = {},
+    model?: string
+  ): Promise<VideoJob> {
+    // Returns as soon as the upload is stored; scoring continues in the background
+    const formData = new FormData()
+    formData.append('file', file)
+
+    const params = videoQuery(throttle, speed, sampling, model)
+    const response = await fetch(`${this.baseUrl}/api/jobs/video?${params}`, {
+      method: 'POST',
+      body: formData,
+    })
+    return handleResponse<VideoJob>(response)
+  }
+
+  async getVideoJob(jobId: string): Promise<VideoJob> {
+    const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}`)
+    return handleResponse<VideoJob>(response)
+  }
+
+  watchVideoJob(jobId: string, onUpdate: (job: VideoJob) => void): () => void {
+    // One event per status/progress change; the server closes the stream once the job finishes
+    const source = new EventSource(`${this.baseUrl}/api/jobs/${jobId}/events`)
+    const handler = (event: MessageEvent) => {
+      const job: VideoJob = JSON.parse(event.data)
+      onUpdate(job)
+      if (job.status !== 'queued' && job.status !== 'running') source.close()
+    }
+    for (const status of ['queued', 'running', 'completed', 'failed', 'cancelled']) {
+      source.addEventListener(status, handler as EventListener)
+    }
+    return () => source.close()
+  }
+
+  async getVideoJobResult(jobId: string, partial: boolean = false): Promise<VideoPredictionResponse> {
+    const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/result?partial=${partial}`)
+    return handleResponse<VideoPredictionResponse>(response)
+  }
+
+  async getVideoJobColumnar(jobId: string, partial: boolean = false): Promise<ColumnarVideoPredictions> {
+    const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}/result?partial=${partial}&format=columnar`)
+    return handleResponse<ColumnarVideoPredictions>(response)
+  }
+
+  async deleteVideoJob(jobId: string): Promise<{ job_id: string; status: string }> {
+    // Cancels a queued/running job; deletes a finished one and its results
+    const response = await fetch(`${this.baseUrl}/api/jobs/${jobId}`, { method: 'DELETE' })
+    return handleResponse<{ job_id: string; status: string }>(response)
+  }
+
+  async addLiveStream(request: LiveStreamRequest): Promise<{ stream_id: string } & LiveStreamStats> {
+    // Needs STEERING_MAX_STREAMS on the server; the server opens and reads the source itself
+    const response = await fetch(`${this.baseUrl}/api/streams`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(request),
+    })
+    return handleResponse<{ stream_id: string } & LiveStreamStats>(response)
+  }
+
+  async listLiveStreams(): Promise<LiveStreamsResponse> {
+    const response = await fetch(`${this.baseUrl}/api/streams`)
+    return handleResponse<LiveStreamsResponse>(response)
+  }
+
+  async removeLiveStream(streamId: string): Promise<{ stream_id: string; status: string }> {
+    const response = await fetch(`${this.baseUrl}/api/streams/${encodeURIComponent(streamId)}`, { method: 'DELETE' })
+    return handleResponse<{ stream_id: string; status: string }>(response)
+  }
+
+  watchLiveStreams(onResult: (result: LiveStreamResult) => void, streamIds?: string[]): () => void {
+    // Every result of the given streams (all by default); a slow listener loses its oldest results
+    const query = streamIds?.length ? `?streams=${encodeURIComponent(streamIds.join(','))}` : ''
+    const source = new EventSource(`${this.baseUrl}/api/streams/events${query}`)
+    source.addEventListener('prediction', ((event: MessageEvent) => onResult(JSON.parse(event.data))) as EventListener)
+    return () => source.close()
+  }
+
+  async listModels(): Promise<ModelsResponse> {
+    const response = await fetch(`${this.baseUrl}/api/models`)
+    return handleResponse<ModelsResponse>(response)
+  }
+
+  async loadModel(name: string, path?: string): Promise<{ name: string; status: string }> {
+    // Loads in the background; poll listModels() until the model is resident
+    const response = await fetch(`${this.baseUrl}/api/models/${encodeURIComponent(name)}/load`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(path ? { path } : {}),
+    })
+    return handleResponse<{ name: string; status: string }>(response)
+  }
+
   async isBackendAvailable(): Promise<boolean> {
     try {
       await this.health()
@@ -115,11 +474,91 @@ export class ApiClient {
   }
 }
 
+export interface StreamPrediction extends PredictionResponse {
+  type: 'prediction'
+  seq: number
+  latency_ms: number
+  dropped: number
+  gated: boolean // the previous prediction was reused because the frame had not changed
+}
+
+export interface StreamSettings {
+  throttle?: number
+  speed?: number
+  model?: string
+  gate_threshold?: number | null // null turns gating off
+  gate_max_skip?: number
+  gate_smoothing?: number
+}
+
+// Live inference over a WebSocket: frames are sent as binary messages and the
+// server always scores the newest one, dropping frames it could not keep up with
+export class PredictionStream {
+  private socket: WebSocket
+  private seq = 0
+
+  constructor(
+    onPrediction: (prediction: StreamPrediction) => void,
+    settings: StreamSettings = {},
+    baseUrl: string = API_BASE_URL
+  ) {
+    const params = new URLSearchParams({
+      throttle: (settings.throttle ?? 0.5).toString(),
+      speed: (settings.speed ?? 20.0).toString(),
+    })
+    if (settings.model) params.set('model', settings.model)
+    if (settings.gate_threshold != null) params.set('gate_threshold', settings.gate_threshold.toString())
+    if (settings.gate_max_skip !== undefined) params.set('gate_max_skip', settings.gate_max_skip.toString())
+    if (settings.gate_smoothing !== undefined) params.set('gate_smoothing', settings.gate_smoothing.toString())
+    this.socket = new WebSocket(`${baseUrl.replace(/^http/, 'ws')}/ws/predict?${params}`)
+    this.socket.binaryType = 'arraybuffer'
+    this.socket.onmessage = (event) => {
+      const message = JSON.parse(event.data)
+      if (message.type === 'prediction') onPrediction(message)
+      else if (message.type === 'error') console.warn('Stream error:', message.detail)
+    }
+  }
+
+  get isOpen(): boolean {
+    return this.socket.readyState === WebSocket.OPEN
+  }
+
+  configure(settings: StreamSettings): void {
+    if (this.isOpen) this.socket.send(JSON.stringify(settings))
+  }
+
+  async sendFrame(image: Blob): Promise<number> {
+    const seq = this.seq++
+    const header = new Uint8Array(4)
+    new DataView(header.buffer).setUint32(0, seq)
+    const payload = new Uint8Array(await image.arrayBuffer())
+    const message = new Uint8Array(4 + payload.length)
+    message.set(header, 0)
+    message.set(payload, 4)
+    if (this.isOpen) this.socket.send(message)
+    return seq
+  }
+
+  close(): void {
+    this.socket.close()
+  }
+}
+
 // Utility functions for image processing
 export function canvasToBase64(canvas: HTMLCanvasElement): string {
   return canvas.toDataURL('image/jpeg', 0.8).split(',')[1] // Remove data:image/jpeg;base64, prefix
 }
 
+export function canvasToBlob(canvas: HTMLCanvasElement, quality: number = 0.8): Promise<Blob> {
+  return new Promise((resolve, reject) => {
+    canvas.toBlob(
+      (blob) => (blob ? resolve(blob) : reject(new Error('Could not encode canvas'))),
+      'image/jpeg',
+      quality
+    )
+  })
+}
+
 export function videoFrameToCanvas(
   video: HTMLVideoElement,
   canvas: HTMLCanvasElement,
@@ -137,6 +576,16 @@ export function videoFrameToCanvas(
   ctx.drawImage(video, 0, 0, width, height)
 }
 
+export function extractVideoFrameBlob(
+  video: HTMLVideoElement,
+  width: number = 224,
+  height: number = 224
+): Promise<Blob> {
+  const canvas = document.createElement('canvas')
+  videoFrameToCanvas(video, canvas, width, height)
+  return canvasToBlob(canvas)
+}
+
 export function extractVideoFrame(
   video: HTMLVideoElement,
   width: number = 224,
@@ -1,18 +1,40 @@
+import argparse
 import sys
 import os
 import torch
 from PyQt5.QtWidgets import QApplication
 from src.model.steering_model import load_model
 from src.dataset.video_processor import VideoProcessor
+from src.pipeline.gating import DEFAULT_MAX_SKIP, FrameGate
 from src.ui.main_window import MainWindow
 from src.workers.video_worker import VideoWorker
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Behavioural steering desktop app")
+    parser.add_argument("--model", default=os.environ.get("STEERING_MODEL_PATH", os.path.join("data", "steering_model.pth")),
+                        help="Checkpoint to load (default: $STEERING_MODEL_PATH or data/steering_model.pth)")
+    parser.add_argument("--gate-threshold", type=float, default=None,
+                        help="Reuse the last prediction while frames differ by less than this (0-1); off by default")
+    parser.add_argument("--gate-max-skip", type=int, default=DEFAULT_MAX_SKIP,
+                        help="Frames in a row that may reuse a prediction")
+    parser.add_argument("--gate-smoothing", type=float, default=0.0,
+                        help="Weight of the previous prediction when smoothing new ones (0-1)")
+    args, qt_args = parser.parse_known_args()
+    gate_settings = None
+    if args.gate_threshold is not None:
+        gate_settings = {"threshold": args.gate_threshold, "max_skip": args.gate_max_skip,
+                         "smoothing": args.gate_smoothing}
+        try:
+            FrameGate(**gate_settings)  # fail on invalid settings before loading anything
+        except ValueError as e:
+            parser.error(str(e))
+    app = QApplication(sys.argv[:1] + qt_args)
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    model = load_model(os.path.join("data", "steering_model.pth"), device)
+    model = load_model(args.model, device,
+                       runtime=os.environ.get("STEERING_RUNTIME", "eager"),
+                       calibration_video=os.path.join("assets", "solidWhiteRight.mp4"))
     processor = VideoProcessor(device)
-    window = MainWindow(model, processor, device)
+    window = MainWindow(model, processor, device, gate_settings)
     window.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,86 @@
+from typing import Sequence
+
+import torch
+from torch.utils.data import WeightedRandomSampler
+
+from src.dataset.packed import normalize_batch
+
+# Share of zero-angle samples the notebook kept (zero_df = ...sample(frac=0.05))
+ZERO_ANGLE_FRACTION = 0.05
+
+
+class BatchAugment:
+    """Random augmentation of a whole uint8 batch in memory, usable as a DataLoader ``collate_fn``
+
+    Replaces writing ``_flipped.jpg`` copies next to the originals:
+
+    - ``flip``: probability of mirroring a sample horizontally, negating its
+      steering angle.
+    - ``brightness``: scale each sample's pixels by a factor drawn from
+      ``[1 - brightness, 1 + brightness]`` (0 disables).
+    - ``shift``: translate each sample sideways by up to ``shift`` pixels,
+      repeating the edge column, and add ``shift * shift_angle`` per pixel
+      to its angle so the label follows the car's offset (0 disables).
+
+    Every op draws one random value per sample and is applied to the batch
+    at once. Random numbers come from torch's global generator, which
+    DataLoader seeds differently in every worker. Called on a
+    PackedDrivingDataset batch it returns the normalized
+    ``(images, extra_features, angles)`` like ``normalize_batch``.
+    """
+    def __init__(self, flip: float = 0.5, brightness: float = 0.0, shift: int = 0, shift_angle: float = 0.004):
+        self.flip = flip
+        self.brightness = brightness
+        self.shift = shift
+        self.shift_angle = shift_angle
+
+    def augment(self, images: torch.Tensor, angles: torch.Tensor):
+        """Augmented copies of an (N, 3, H, W) image batch and its (N,) angles"""
+        count, width = images.shape[0], images.shape[-1]
+        angles = angles.clone()
+        # Flip and shift are both a per-sample remapping of columns, done in one gather
+        columns = torch.arange(width).expand(count, width)
+        remap = False
+        if self.flip > 0:
+            flipped = torch.rand(count) < self.flip
+            if flipped.any():
+                columns = torch.where(flipped.unsqueeze(1), columns.flip(1), columns)
+                angles[flipped] = -angles[flipped]
+                remap = True
+        if self.shift > 0:
+            offsets = torch.randint(-self.shift, self.shift + 1, (count,))
+            # Shifting after the flip: read the flipped column ``offset`` pixels to the left, clamped to the edges
+            columns = columns.gather(1, (torch.arange(width).unsqueeze(0) - offsets.unsqueeze(1)).clamp_(0, width - 1))
+            angles += offsets.to(angles.dtype) * self.shift_angle
+            remap = True
+        if remap:
+            images = images.gather(3, columns.view(count, 1, 1, width).expand(images.shape))
+        if self.brightness > 0:
+            factors = torch.empty(count).uniform_(1 - self.brightness, 1 + self.brightness)
+            images = images.float().mul_(factors.view(count, 1, 1, 1)).clamp_(0, 255)
+        return images, angles
+
+    def __call__(self, batch):
+        images, extra_features, angles = batch
+        images, angles = self.augment(images, angles)
+        return normalize_batch((images, extra_features, angles))
+
+
+def zero_angle_sampler(angles: Sequence[float], zero_fraction: float = ZERO_ANGLE_FRACTION,
+                       num_samples: int = None, generator: torch.Generator = None) -> WeightedRandomSampler:
+    """Sampler that keeps every steering sample but only ``zero_fraction`` of the straight-ahead ones
+
+    The weighted equivalent of the notebook's ``non_zero_df`` plus
+    ``zero_df.sample(frac=0.05)``: zero-angle samples are drawn
+    ``zero_fraction`` times as often as the others, and an epoch defaults to
+    the size of that downsampled set. Pass the angles of exactly the samples
+    being loaded, e.g. ``dataset.angles[subset.indices]`` for a random_split
+    Subset. Unlike a rebuilt DataFrame, every epoch sees a different subset
+    of the zero-angle frames.
+    """
+    angles = torch.as_tensor(angles)
+    zero = angles == 0
+    weights = torch.where(zero, zero_fraction, 1.0).double()
+    if num_samples is None:
+        num_samples = max(1, int((~zero).sum()) + round(zero_fraction * int(zero.sum())))
+    return WeightedRandomSampler(weights, num_samples, replacement=True, generator=generator)
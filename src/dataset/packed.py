@@ -0,0 +1,202 @@
+import csv
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, NamedTuple, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+
+from src.pipeline.preprocessing import BatchPreprocessor
+
+# Column order of the simulator's driving_log.csv (no header row)
+LOG_COLUMNS = ("centercam", "leftcam", "rightcam", "steering_angle", "throttle", "reverse", "speed")
+# Files of a packed dataset directory; meta.json is written last and marks the pack complete
+IMAGES_FILE = "images.u8"  # raw (N, 3, H, W) uint8, shape in meta.json
+COLUMN_FILES = {"steering_angle": "steering_angle.npy", "throttle": "throttle.npy", "speed": "speed.npy"}
+META_FILE = "meta.json"
+# Frames decoded and resized per chunk while packing
+PACK_CHUNK = 64
+
+# normalize() only; resizing happens once, at pack time
+_normalizer = BatchPreprocessor()
+
+
+class LogRow(NamedTuple):
+    image_path: str
+    steering_angle: float
+    throttle: float
+    speed: float
+
+
+def read_driving_log(log_path: str, img_dir: str = None) -> List[LogRow]:
+    """Center-camera rows of a driving_log.csv, image paths resolved against ``img_dir``
+
+    The simulator records absolute paths from the machine it ran on
+    (often with Windows separators), so only the file name is kept and
+    looked up in ``img_dir``, by default the ``IMG`` folder next to the log.
+    """
+    if img_dir is None:
+        img_dir = os.path.join(os.path.dirname(os.path.abspath(log_path)), "IMG")
+    rows = []
+    with open(log_path, newline="") as f:
+        for record in csv.reader(f):
+            if len(record) < len(LOG_COLUMNS):
+                continue
+            values = dict(zip(LOG_COLUMNS, record))
+            try:
+                angle, throttle, speed = (float(values[name]) for name in ("steering_angle", "throttle", "speed"))
+            except ValueError:  # header row
+                continue
+            name = values["centercam"].strip().replace("\\", "/").split("/")[-1]
+            rows.append(LogRow(os.path.join(img_dir, name), angle, throttle, speed))
+    return rows
+
+
+def _source_info(log_paths: Sequence[str]) -> list:
+    return [{"path": os.path.abspath(path), "size": os.path.getsize(path), "mtime": os.path.getmtime(path)}
+            for path in log_paths]
+
+
+def _read_meta(out_dir: str):
+    path = os.path.join(out_dir, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _read_image(row: LogRow):
+    return cv2.imread(row.image_path) if os.path.exists(row.image_path) else None
+
+
+def pack_driving_log(log_paths: Union[str, Sequence[str]], out_dir: str, size: Tuple[int, int] = (224, 224),
+                     img_dirs: Sequence[str] = None, workers: int = 4, overwrite: bool = False) -> dict:
+    """Decode and resize every frame of one or more driving logs once into a packed array on disk
+
+    Writes ``images.u8``, a raw (N, 3, H, W) uint8 RGB array resized the way
+    BatchPreprocessor (and so the serving path) resizes, one float32 array
+    per label column and ``meta.json``. Rows whose image is missing or
+    unreadable are left out and listed in the metadata. An existing pack of
+    the same logs and size is reused unless ``overwrite`` is set or a log
+    changed since. Returns the pack's metadata.
+    """
+    if isinstance(log_paths, str):
+        log_paths = [log_paths]
+    size = tuple(size)
+    sources = _source_info(log_paths)
+    meta = _read_meta(out_dir)
+    if not overwrite and meta is not None and meta["sources"] == sources and tuple(meta["size"]) == size:
+        return meta
+
+    rows = []
+    for i, log_path in enumerate(log_paths):
+        rows.extend(read_driving_log(log_path, img_dirs[i] if img_dirs else None))
+    if not rows:
+        raise ValueError(f"No samples in {', '.join(log_paths)}")
+    os.makedirs(out_dir, exist_ok=True)
+    # Invalidate any previous pack before its arrays are overwritten
+    if meta is not None:
+        os.remove(os.path.join(out_dir, META_FILE))
+
+    images_path = os.path.join(out_dir, IMAGES_FILE)
+    images = np.memmap(images_path, mode="w+", dtype=np.uint8, shape=(len(rows), 3) + size)
+    preprocessor = BatchPreprocessor(size)
+    kept, missing = [], []
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for start in range(0, len(rows), PACK_CHUNK):
+            chunk = rows[start:start + PACK_CHUNK]
+            # cv2.imread releases the GIL, so the JPEG decodes run in parallel
+            frames = list(executor.map(_read_image, chunk))
+            decoded = []
+            for row, frame in zip(chunk, frames):
+                if frame is None:
+                    missing.append(row.image_path)
+                else:
+                    decoded.append(frame)
+                    kept.append(row)
+            if decoded:
+                resized = preprocessor.resize(decoded)
+                images[len(kept) - len(decoded):len(kept)] = resized.flip(1).numpy()  # BGR -> RGB
+    images.flush()
+    del images
+    if missing:
+        print(f"Warning: skipped {len(missing)} rows whose image could not be read")
+    if not kept:
+        raise ValueError(f"None of the {len(rows)} images in {', '.join(log_paths)} could be read")
+    # Frames were written in order, so dropping rows only leaves unused space at the end
+    os.truncate(images_path, len(kept) * 3 * size[0] * size[1])
+
+    for name, filename in COLUMN_FILES.items():
+        np.save(os.path.join(out_dir, filename), np.array([getattr(row, name) for row in kept], dtype=np.float32))
+    meta = {
+        "count": len(kept),
+        "size": list(size),
+        "sources": sources,
+        "image_paths": [row.image_path for row in kept],
+        "missing": missing
+    }
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def normalize_batch(batch):
+    """``collate_fn`` for PackedDrivingDataset: one normalize op for the whole uint8 batch
+
+    Returns ``(images, extra_features, angles)`` like the notebook's
+    DrivingDataset batches: (N, 3, H, W) float32 normalized RGB, (N, 2)
+    throttle/speed and (N,) steering angles.
+    """
+    images, extra_features, angles = batch
+    return _normalizer.normalize(images), extra_features, angles
+
+
+class PackedDrivingDataset(Dataset):
+    """Driving samples served straight from a pack written by ``pack_driving_log``
+
+    The image array is memory-mapped, so opening it is instant, samples are
+    views into the page cache rather than decoded JPEGs, and DataLoader
+    workers share the pages. Items are ``(image uint8 CHW, [throttle,
+    speed], angle)``; batches fetched through a DataLoader are gathered
+    with one sorted read (``__getitems__``) and should be collated with
+    ``normalize_batch``.
+    """
+    def __init__(self, path: str):
+        meta = _read_meta(path)
+        if meta is None:
+            raise FileNotFoundError(f"No packed dataset in {path} (missing {META_FILE})")
+        self.path = path
+        self.meta = meta
+        columns = {name: np.load(os.path.join(path, filename)) for name, filename in COLUMN_FILES.items()}
+        self.angles = torch.from_numpy(columns["steering_angle"])
+        self.extra_features = torch.from_numpy(np.stack([columns["throttle"], columns["speed"]], axis=1))
+        self._open()
+
+    def _open(self):
+        # Copy-on-write mapping: writable for torch.from_numpy, never written back to the file
+        self.images = np.memmap(os.path.join(self.path, IMAGES_FILE), mode="c", dtype=np.uint8,
+                                shape=(self.meta["count"], 3) + tuple(self.meta["size"]))
+
+    def __getstate__(self):
+        # Re-map in the receiving process instead of pickling the whole array
+        state = self.__dict__.copy()
+        del state["images"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+    def __len__(self):
+        return len(self.angles)
+
+    def __getitem__(self, idx):
+        return torch.from_numpy(self.images[idx]), self.extra_features[idx], self.angles[idx]
+
+    def __getitems__(self, indices):
+        indices = np.sort(np.asarray(indices, dtype=np.int64))  # sequential reads; batch order is irrelevant
+        index = torch.from_numpy(indices)
+        return torch.from_numpy(self.images[indices]), self.extra_features[index], self.angles[index]
@@ -1,21 +1,15 @@
 import cv2
 import torch
-import torchvision.transforms as transforms
 import numpy as np
+from src.pipeline.preprocessing import BatchPreprocessor
 
 class VideoProcessor:
     def __init__(self, device):
         self.device = device
-        self.transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-        ])
+        self.preprocessor = BatchPreprocessor((224, 224))
 
     def process_frame(self, frame, throttle=0.5, speed=20.0):
-        input_img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        input_tensor = self.transform(input_img).unsqueeze(0).to(self.device)
+        input_tensor = self.preprocessor([frame], bgr=True).to(self.device)
         extra_features = torch.tensor([[throttle, speed]], dtype=torch.float32).to(self.device)
         return input_tensor, extra_features
 
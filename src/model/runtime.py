@@ -0,0 +1,162 @@
+import copy
+import inspect
+import io
+from typing import List, Optional
+
+import cv2
+import numpy as np
+import torch
+import torch.nn as nn
+
+# eager: the fp32 model as trained
+# fused: conv-bn folded, channels_last
+# torchscript: fused, traced and frozen
+# int8: static int8 backbone calibrated on sample frames, traced and frozen
+# onnx: fused backbone exported to ONNX and run by ONNX Runtime (needs the onnx and onnxruntime packages)
+RUNTIMES = ("eager", "fused", "torchscript", "int8", "onnx")
+
+
+class ChannelsLast(nn.Module):
+    """Runs ``module`` on channels_last inputs, the layout oneDNN convolutions are fastest with"""
+    def __init__(self, module):
+        super(ChannelsLast, self).__init__()
+        self.module = module.to(memory_format=torch.channels_last)
+
+    def forward(self, x):
+        return self.module(x.contiguous(memory_format=torch.channels_last))
+
+
+class OnnxBackbone(nn.Module):
+    """Backbone stand-in that runs an exported ONNX graph with ONNX Runtime"""
+    def __init__(self, session):
+        super(OnnxBackbone, self).__init__()
+        self.session = session
+        self.input_name = session.get_inputs()[0].name
+
+    def forward(self, x):
+        features = self.session.run(None, {self.input_name: x.detach().cpu().numpy()})[0]
+        return torch.from_numpy(features)
+
+
+def quantized_engine() -> str:
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            return engine
+    raise RuntimeError("This torch build has no quantized CPU engine")
+
+
+def calibration_frames(video_path: str, count: int = 32) -> List[np.ndarray]:
+    """Read ``count`` BGR frames spread evenly over a video, for int8 calibration and drift checks"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Could not open calibration video: {video_path}")
+    try:
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        step = max(1, total // count) if total > 0 else 1
+        frames = []
+        index = 0
+        while len(frames) < count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+    finally:
+        cap.release()
+    if not frames:
+        raise ValueError(f"No frames read from calibration video: {video_path}")
+    return frames
+
+
+def _fuse(backbone):
+    from torch.fx.experimental.optimization import fuse
+    return fuse(backbone)
+
+
+def _trace(backbone, example):
+    with torch.inference_mode():
+        return torch.jit.freeze(torch.jit.trace(backbone.eval(), example))
+
+
+def _quantize(backbone, calibration, batch_size):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = quantized_engine()
+    torch.backends.quantized.engine = engine
+    # prepare_fx folds conv-bn itself and inserts observers on every activation
+    prepared = prepare_fx(backbone, get_default_qconfig_mapping(engine), (calibration[:1],))
+    with torch.inference_mode():
+        for start in range(0, len(calibration), batch_size):
+            prepared(calibration[start:start + batch_size])
+    return convert_fx(prepared)
+
+
+def _export_onnx(backbone, example):
+    try:
+        import onnxruntime
+    except ImportError:
+        raise RuntimeError("The onnx runtime needs the onnx and onnxruntime packages")
+    buffer = io.BytesIO()
+    # Newer torch defaults to the torch.export based exporter; keep the TorchScript one where selectable
+    kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    torch.onnx.export(backbone, example, buffer, input_names=["images"], output_names=["features"],
+                      dynamic_axes={"images": {0: "batch"}, "features": {0: "batch"}}, **kwargs)
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = onnxruntime.InferenceSession(buffer.getvalue(), options, providers=["CPUExecutionProvider"])
+    return OnnxBackbone(session)
+
+
+def optimize_model(model, runtime: str = "eager", calibration: Optional[torch.Tensor] = None,
+                   batch_size: int = 8):
+    """Return a copy of an eval-mode SteeringModel with its backbone swapped for a faster CPU version
+
+    Only ``model.resnet`` is replaced, so ``embed``/``head``/``forward`` keep
+    working and the small fc head stays in fp32. ``calibration`` is a
+    preprocessed (N, 3, 224, 224) batch of representative frames; it is
+    required for ``int8`` and otherwise only used as the tracing example.
+    """
+    if runtime not in RUNTIMES:
+        raise ValueError(f"Unknown runtime '{runtime}', expected one of {', '.join(RUNTIMES)}")
+    if runtime == "eager":
+        return model
+    device = next(model.parameters()).device
+    if runtime in ("int8", "onnx") and device.type != "cpu":
+        raise ValueError(f"The {runtime} runtime only runs on CPU")
+    if runtime == "int8" and (calibration is None or len(calibration) == 0):
+        raise ValueError("The int8 runtime needs calibration frames")
+
+    optimized = copy.deepcopy(model).eval()
+    example = calibration[:batch_size] if calibration is not None else torch.randn(1, 3, 224, 224)
+    example = example.to(device)
+    backbone = optimized.resnet
+    if runtime == "int8":
+        backbone = _trace(_quantize(backbone, calibration.to(device), batch_size), example)
+    elif runtime == "onnx":
+        backbone = _export_onnx(_fuse(backbone), example)
+    else:
+        backbone = ChannelsLast(_fuse(backbone))
+        if runtime == "torchscript":
+            backbone = _trace(backbone, example)
+    optimized.resnet = backbone
+    return optimized
+
+
+def measure_drift(reference, optimized, images: torch.Tensor, throttle: float = 0.5, speed: float = 20.0) -> dict:
+    """Steering-angle error of ``optimized`` against the fp32 ``reference`` on the same images"""
+    device = next(reference.parameters()).device
+    images = images.to(device)
+    extra = torch.tensor([[throttle, speed]], dtype=torch.float32, device=device).expand(len(images), -1)
+    with torch.inference_mode():
+        error = (optimized(images, extra) - reference(images, extra)).abs().squeeze(1)
+    error_degrees = error * 30
+    return {
+        "frames": len(images),
+        "max_abs_error": error.max().item(),
+        "mean_abs_error": error.mean().item(),
+        "max_abs_error_degrees": error_degrees.max().item(),
+        "mean_abs_error_degrees": error_degrees.mean().item()
+    }
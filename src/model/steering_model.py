@@ -1,25 +1,72 @@
+import time
+
 import torch
 import torch.nn as nn
-import torchvision.models as models
 
 class SteeringModel(nn.Module):
     def __init__(self):
         super(SteeringModel, self).__init__()
+        # Deferred: importing torchvision pulls in torch._dynamo and takes seconds
+        import torchvision.models as models
         self.resnet = models.resnet18(pretrained=False)
         num_ftrs = self.resnet.fc.in_features
         self.resnet.fc = nn.Identity()
         self.fc1 = nn.Linear(num_ftrs + 2, 128)  # +2 for throttle, speed
         self.fc2 = nn.Linear(128, 1)
 
-    def forward(self, x, extra_features):
-        x = self.resnet(x)
-        x = torch.cat((x, extra_features), dim=1)
+    def embed(self, x):
+        return self.resnet(x)  # (N, 512); throttle and speed only enter in head()
+
+    def head(self, features, extra_features):
+        x = torch.cat((features, extra_features), dim=1)
         x = torch.relu(self.fc1(x))
         x = self.fc2(x)
         return x
 
-def load_model(model_path, device):
-    model = SteeringModel().to(device)
-    model.load_state_dict(torch.load(model_path, map_location=device))
-    model.eval()
+    def forward(self, x, extra_features):
+        return self.head(self.embed(x), extra_features)
+
+def read_checkpoint(model_path, device):
+    """Read a state_dict checkpoint, memory-mapped so tensors are paged in on use"""
+    try:
+        return torch.load(model_path, map_location=device, mmap=True, weights_only=True)
+    except RuntimeError as e:
+        # Checkpoints written with the legacy (non-zip) serializer cannot be mapped
+        if "mmap" not in str(e):
+            raise
+        return torch.load(model_path, map_location=device, weights_only=True)
+
+def load_weights(model_class, model_path, device, timings=None):
+    """Build ``model_class`` directly from a checkpoint, skipping its random initialization
+
+    The module is constructed on the meta device (no storage, no init
+    kernels) and the checkpoint tensors are assigned in place of its
+    parameters instead of being copied into freshly initialised ones. Pass a
+    dict as ``timings`` to get the read/build seconds back.
+    """
+    start = time.perf_counter()
+    state_dict = read_checkpoint(model_path, device)
+    read = time.perf_counter()
+    with torch.device("meta"):
+        model = model_class()
+    model.load_state_dict(state_dict, assign=True)
+    missing = [name for name, tensor in model.state_dict().items() if tensor.is_meta]
+    if missing:
+        raise RuntimeError(f"Checkpoint {model_path} does not initialise {', '.join(missing)}")
+    model = model.to(device).eval()
+    if timings is not None:
+        timings["read_checkpoint"] = read - start
+        timings["build_model"] = time.perf_counter() - read
+    return model
+
+def load_model(model_path, device, runtime="eager", calibration_video=None):
+    model = load_weights(SteeringModel, model_path, device)
+    if runtime != "eager":
+        # Imported here so the plain eager path does not pull in the quantization/export toolchain
+        from src.model.runtime import calibration_frames, optimize_model
+        from src.pipeline.preprocessing import BatchPreprocessor
+        calibration = None
+        if calibration_video:
+            calibration = BatchPreprocessor((224, 224))(calibration_frames(calibration_video), bgr=True)
+        model = optimize_model(model, runtime, calibration)
     return model
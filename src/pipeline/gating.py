@@ -0,0 +1,85 @@
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Mean absolute pixel difference (0-1) below which a frame counts as unchanged
+DEFAULT_THRESHOLD = 0.005
+# Consecutive frames that may reuse a prediction before the model runs again regardless
+DEFAULT_MAX_SKIP = 10
+# Width and height of the thumbnails that are compared
+SIGNATURE_SIZE = (32, 18)
+
+
+def frame_signature(frame: np.ndarray, size: Tuple[int, int] = SIGNATURE_SIZE) -> np.ndarray:
+    """Tiny area-averaged float32 thumbnail of a frame, cheap to compare and robust to sensor noise"""
+    return cv2.resize(frame, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+class FrameGate:
+    """Skips inference on frames that barely differ from the last frame the model scored
+
+    ``should_score(frame)`` compares a downsampled thumbnail of the frame
+    with the one of the last scored frame (not the previous frame, so slow
+    drift still adds up to a change) and returns False while the mean
+    absolute difference stays below ``threshold``, for at most ``max_skip``
+    frames in a row. ``output(angle)`` turns the model's prediction, or
+    None for a gated frame, into the value to report: gated frames repeat
+    the last output, and with ``smoothing`` > 0 scored predictions are
+    blended into it as an exponential moving average
+    (``smoothing`` is the weight of the previous output).
+
+    The two halves keep separate state so the decision can be made by a
+    decoding thread and the output produced by the inference thread, as long
+    as both see the frames in the same order.
+    """
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_skip: int = DEFAULT_MAX_SKIP,
+                 smoothing: float = 0.0, size: Tuple[int, int] = SIGNATURE_SIZE):
+        if not 0.0 <= threshold <= 1.0:
+            raise ValueError("gate threshold must be between 0 and 1")
+        if max_skip < 0:
+            raise ValueError("gate max_skip must be >= 0")
+        if not 0.0 <= smoothing < 1.0:
+            raise ValueError("gate smoothing must be in [0, 1)")
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.smoothing = smoothing
+        self.size = tuple(size)
+        self.frames = 0
+        self.gated = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the reference frame and last output, e.g. when the inputs to the model change"""
+        self._reference = None
+        self._run = 0
+        self._last = None
+
+    def should_score(self, frame: np.ndarray) -> bool:
+        self.frames += 1
+        signature = frame_signature(frame, self.size)
+        if (self._reference is not None and self._run < self.max_skip
+                and signature.shape == self._reference.shape
+                and float(np.abs(signature - self._reference).mean()) / 255.0 < self.threshold):
+            self._run += 1
+            self.gated += 1
+            return False
+        self._reference = signature
+        self._run = 0
+        return True
+
+    def output(self, angle: Optional[float]) -> Optional[float]:
+        if angle is None:
+            return self._last
+        if self._last is not None and self.smoothing > 0:
+            angle = self.smoothing * self._last + (1.0 - self.smoothing) * angle
+        self._last = angle
+        return angle
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.gated / self.frames if self.frames else 0.0
+
+    def as_dict(self):
+        return {"threshold": self.threshold, "max_skip": self.max_skip, "smoothing": self.smoothing,
+                "frames": self.frames, "gated_frames": self.gated, "skip_ratio": round(self.skip_ratio, 4)}
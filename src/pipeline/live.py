@@ -0,0 +1,174 @@
+import collections
+import os
+import sys
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import numpy as np
+
+
+class CapturedFrame(NamedTuple):
+    index: int
+    frame: np.ndarray  # BGR, as decoded
+    captured_at: float  # time.perf_counter() when the frame was read
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox between a producer and a slower consumer
+
+    ``put`` replaces whatever the consumer has not taken yet (counted in
+    ``dropped``), so the consumer always gets the newest item and a slow
+    consumer never builds up a backlog. ``get`` blocks until an item newer
+    than the last one taken arrives or the slot is closed. A consumer that
+    serves several slots can pass the same ``ready`` event to all of them;
+    it is set on every put and on close.
+    """
+    def __init__(self, ready: Optional[threading.Event] = None):
+        self._condition = threading.Condition()
+        self._ready = ready
+        self._item = None
+        self.closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self.received += 1
+            self._condition.notify()
+        if self._ready is not None:
+            self._ready.set()
+
+    def get(self, timeout: Optional[float] = None):
+        """The newest item, or None on timeout or once the slot is closed and drained"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._item is not None or self.closed, timeout)
+            item, self._item = self._item, None
+            return item
+
+    def close(self):
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+        if self._ready is not None:
+            self._ready.set()
+
+
+class RateMeter:
+    """Events per second over a sliding window, plus a moving average of an optional value per event"""
+    def __init__(self, window: float = 2.0):
+        self.window = window
+        self._events = collections.deque()  # (time, value)
+        self._lock = threading.Lock()
+
+    def tick(self, value: float = 0.0, now: Optional[float] = None):
+        now = time.perf_counter() if now is None else now
+        with self._lock:
+            self._events.append((now, value))
+            self._expire(now)
+
+    def _expire(self, now):
+        while self._events and now - self._events[0][0] > self.window:
+            self._events.popleft()
+
+    @property
+    def rate(self) -> float:
+        with self._lock:
+            self._expire(time.perf_counter())
+            if len(self._events) < 2:
+                return 0.0
+            span = self._events[-1][0] - self._events[0][0]
+            return (len(self._events) - 1) / span if span > 0 else 0.0
+
+    @property
+    def mean(self) -> float:
+        with self._lock:
+            if not self._events:
+                return 0.0
+            return sum(value for _, value in self._events) / len(self._events)
+
+
+def lower_thread_priority(increment: int):
+    """Raise the calling thread's nice value by ``increment`` (Linux only, best effort)"""
+    # Elsewhere setpriority applies to the whole process, not just this thread
+    if increment <= 0 or not sys.platform.startswith("linux"):
+        return
+    try:
+        thread_id = threading.get_native_id()
+        os.setpriority(os.PRIO_PROCESS, thread_id, os.getpriority(os.PRIO_PROCESS, thread_id) + increment)
+    except OSError:
+        pass
+
+
+class FrameCapture(threading.Thread):
+    """Reads a camera or video file on its own thread into a LatestFrameSlot
+
+    Cameras are read as fast as they deliver. Files are paced to their
+    frame rate (``realtime``) so playback runs at normal speed and a slow
+    consumer skips frames instead of slowing the video down; with ``loop``
+    a file restarts when it ends, standing in for a live camera. With
+    ``max_fps`` frames closer together than ``1 / max_fps`` are grabbed
+    but not retrieved (no color conversion or copy). ``niceness`` lowers
+    the reader thread's priority so that, when the CPU is saturated,
+    decoding falls behind rather than the consumer. The slot is closed
+    when the source ends, fails to open or ``stop()`` is called.
+    """
+    def __init__(self, source, slot: LatestFrameSlot, realtime: bool = True, loop: bool = False,
+                 max_fps: Optional[float] = None, niceness: int = 0, name: str = "frame-capture"):
+        super(FrameCapture, self).__init__(name=name, daemon=True)
+        self.source = source
+        self.slot = slot
+        self.realtime = realtime
+        self.loop = loop
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.niceness = niceness
+        self.fps = 0.0
+        self.error = None
+        self.meter = RateMeter()
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    def run(self):
+        lower_thread_priority(self.niceness)
+        cap = cv2.VideoCapture(self.source)
+        try:
+            if not cap.isOpened():
+                self.error = f"Could not open video source {self.source!r}"
+                return
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+            live = isinstance(self.source, int)
+            pace = self.realtime and not live and self.fps > 0
+            # Half a source frame of slack, so a cap that divides the source rate is met exactly
+            min_interval = max(0.0, self.min_interval - (0.5 / self.fps if self.fps > 0 else 0.0))
+            start = time.perf_counter()
+            index = 0
+            played = 0  # frames since the pacing clock was started
+            last_put = None
+            while not self._stopping.is_set():
+                if not cap.grab():
+                    if self.loop and not live and index > 0 and cap.set(cv2.CAP_PROP_POS_FRAMES, 0):
+                        continue
+                    break
+                if pace:
+                    delay = start + played / self.fps - time.perf_counter()
+                    if delay > 0 and self._stopping.wait(delay):
+                        break
+                played += 1
+                now = time.perf_counter()
+                if last_put is None or now - last_put >= min_interval:
+                    ok, frame = cap.retrieve()
+                    if not ok:
+                        break
+                    self.slot.put(CapturedFrame(index, frame, now))
+                    self.meter.tick(now=now)
+                    last_put = now
+                index += 1
+        finally:
+            cap.release()
+            self.slot.close()
@@ -0,0 +1,72 @@
+import threading
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class BatchPreprocessor:
+    """Vectorized replacement for ToPILImage -> Resize -> ToTensor -> Normalize
+
+    Frames (HxWx3 uint8, BGR from OpenCV or RGB) are resized straight from
+    their numpy memory with torch's antialiased bilinear filter, which
+    matches PIL's ``Resize``, into a reusable per-thread uint8 buffer. The
+    color swap, 1/255 scaling and mean/std normalization are then applied to
+    the whole batch in two ops. Pass ``out`` (see ``empty``) to write the
+    float result into a preallocated buffer instead of a new tensor.
+    """
+    def __init__(self, size: Tuple[int, int] = (224, 224),
+                 mean: Sequence[float] = IMAGENET_MEAN, std: Sequence[float] = IMAGENET_STD):
+        self.size = tuple(size)
+        mean = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        std = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+        # (x / 255 - mean) / std == x * scale - bias
+        self._scale = 1.0 / (255.0 * std)
+        self._bias = mean / std
+        self._local = threading.local()
+
+    def empty(self, batch_size: int) -> torch.Tensor:
+        """Allocate an output buffer for up to ``batch_size`` frames"""
+        return torch.empty((batch_size, 3) + self.size, dtype=torch.float32)
+
+    def _resize_buffer(self, batch_size: int) -> torch.Tensor:
+        buffer = getattr(self._local, "resized", None)
+        if buffer is None or buffer.shape[0] < batch_size:
+            buffer = torch.empty((batch_size, 3) + self.size, dtype=torch.uint8)
+            self._local.resized = buffer
+        return buffer[:batch_size]
+
+    def resize(self, frames: List[np.ndarray]) -> torch.Tensor:
+        """Resize HxWx3 uint8 frames into an (N, 3, H, W) uint8 tensor without changing channel order"""
+        resized = self._resize_buffer(len(frames))
+        for i, frame in enumerate(frames):
+            if frame.ndim != 3 or frame.shape[2] != 3 or frame.dtype != np.uint8:
+                raise ValueError(f"Expected an HxWx3 uint8 image, got shape {frame.shape} and dtype {frame.dtype}")
+            # Zero-copy CHW view of the numpy frame
+            image = torch.from_numpy(frame).permute(2, 0, 1).unsqueeze(0)
+            if image.shape[-2:] == self.size:
+                resized[i] = image[0]
+            else:
+                resized[i] = F.interpolate(image, size=self.size, mode="bilinear", antialias=True, align_corners=False)[0]
+        return resized
+
+    def normalize(self, images: torch.Tensor, bgr: bool = False, out: torch.Tensor = None) -> torch.Tensor:
+        """Scale and normalize an (N, 3, H, W) uint8 batch, reordering BGR to RGB if needed"""
+        if bgr:
+            images = images.flip(1)
+        if out is None:
+            out = torch.empty(images.shape, dtype=torch.float32)
+        else:
+            out = out[:images.shape[0]]
+        torch.mul(images, self._scale, out=out)
+        return out.sub_(self._bias)
+
+    def __call__(self, frames: List[np.ndarray], bgr: bool = True, out: torch.Tensor = None) -> torch.Tensor:
+        """Preprocess a batch of frames into an (N, 3, H, W) float32 tensor"""
+        if len(frames) == 0:
+            raise ValueError("No frames to preprocess")
+        return self.normalize(self.resize(frames), bgr=bgr, out=out)
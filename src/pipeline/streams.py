@@ -0,0 +1,367 @@
+import asyncio
+import collections
+import itertools
+import threading
+import time
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+import torch
+
+from src.pipeline.gating import FrameGate
+from src.pipeline.live import FrameCapture, LatestFrameSlot, RateMeter
+from src.pipeline.preprocessing import BatchPreprocessor
+
+# Results a subscriber may fall behind by before its oldest ones are dropped
+SUBSCRIPTION_SIZE = 256
+# Nice value added to reader threads: on a saturated CPU the shared forward pass keeps
+# running at full speed and the readers decode fewer frames, which would be dropped anyway
+READER_NICENESS = 19
+
+
+class StreamResult(NamedTuple):
+    stream_id: str
+    frame: int  # frame index in the stream's source
+    captured_at: float  # time.perf_counter() when the frame was read
+    steering_angle: Optional[float]
+    latency: float  # seconds from capture to publication
+    batch_size: int  # frames in the forward pass that scored it (0 for gated frames)
+    gated: bool = False
+    error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {"stream_id": self.stream_id, "frame": self.frame, "steering_angle": self.steering_angle,
+                "latency_ms": round(self.latency * 1000.0, 3), "batch_size": self.batch_size,
+                "gated": self.gated, "error": self.error}
+
+
+def model_predictor(model, device) -> Callable:
+    """``predict(images, features)`` for a bare SteeringModel, matching ModelService.predict_batch"""
+    def predict(images: torch.Tensor, features: List[Tuple[float, float]]) -> List[float]:
+        extra_features = torch.tensor(features, dtype=torch.float32).to(device)
+        with torch.inference_mode():
+            return model(images.to(device), extra_features).squeeze(1).tolist()
+    return predict
+
+
+class Subscription:
+    """Results of some or all streams, queued for one subscriber
+
+    The queue is bounded: a subscriber that falls more than ``maxsize``
+    results behind loses the oldest ones (counted in ``dropped``) rather
+    than slowing down inference for everyone else. ``get`` and ``drain``
+    block the calling thread; ``drain_async`` waits on the event loop.
+    """
+    def __init__(self, manager: "StreamManager", streams: Optional[Iterable[str]], maxsize: int):
+        self._manager = manager
+        self.streams = set(streams) if streams is not None else None
+        self._results = collections.deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self._waiter = None  # (loop, future) of a pending drain_async
+        self.closed = False
+        self.dropped = 0
+
+    def _offer(self, result: StreamResult):
+        if self.streams is not None and result.stream_id not in self.streams:
+            return
+        with self._condition:
+            if len(self._results) == self._results.maxlen:
+                self.dropped += 1
+            self._results.append(result)
+            self._condition.notify()
+            self._wake()
+
+    def get(self, timeout: Optional[float] = None) -> Optional[StreamResult]:
+        """The next result, or None on timeout or once closed"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._results or self.closed, timeout)
+            return self._results.popleft() if self._results else None
+
+    def drain(self, timeout: Optional[float] = None) -> List[StreamResult]:
+        """Every queued result, waiting up to ``timeout`` for the first one"""
+        with self._condition:
+            self._condition.wait_for(lambda: self._results or self.closed, timeout)
+            results = list(self._results)
+            self._results.clear()
+            return results
+
+    async def drain_async(self, timeout: Optional[float] = None) -> List[StreamResult]:
+        """``drain`` for event-loop callers, without holding a thread while waiting"""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            if not (self._results or self.closed):
+                waiter = loop.create_future()
+                self._waiter = (loop, waiter)
+            else:
+                waiter = None
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(waiter, timeout)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._condition:
+                    if self._waiter is not None and self._waiter[1] is waiter:
+                        self._waiter = None
+        return self.drain(timeout=0)
+
+    def _wake(self):
+        """Resolve a pending drain_async from the publishing thread; called with the condition held"""
+        if self._waiter is None:
+            return
+        loop, waiter = self._waiter
+        self._waiter = None
+        try:
+            loop.call_soon_threadsafe(_resolve, waiter)
+        except RuntimeError:
+            pass  # the loop is already closed
+
+    def __iter__(self):
+        while not self.closed:
+            result = self.get(timeout=0.5)
+            if result is not None:
+                yield result
+
+    def close(self):
+        self._manager._unsubscribe(self)
+        with self._condition:
+            self.closed = True
+            self._condition.notify_all()
+            self._wake()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _Stream:
+    def __init__(self, stream_id, source, slot, capture, max_fps, throttle, speed, gate):
+        self.id = stream_id
+        self.source = source
+        self.slot = slot
+        self.capture = capture
+        self.max_fps = max_fps
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.throttle = throttle
+        self.speed = speed
+        self.gate = gate
+        self.next_due = 0.0
+        self.scored = 0
+        self.meter = RateMeter()  # published results, with their latency as the value
+        self.errors = 0
+
+    def stats(self) -> dict:
+        stats = {
+            "source": str(self.source),
+            "max_fps": self.max_fps,
+            "capture_fps": round(self.capture.meter.rate, 2),
+            "fps": round(self.meter.rate, 2),
+            "latency_ms": round(self.meter.mean * 1000.0, 2),
+            "received": self.slot.received,
+            "scored": self.scored,
+            "dropped": self.slot.dropped,
+            "errors": self.errors,
+            "finished": self.slot.closed,
+            "error": self.capture.error
+        }
+        if self.gate is not None:
+            stats["gating"] = self.gate.as_dict()
+        return stats
+
+
+class StreamManager:
+    """Scores many live sources with shared batched forward passes
+
+    Each registered source gets its own FrameCapture reader thread feeding a
+    LatestFrameSlot, so a stream never queues more than one frame. A single
+    scheduler thread takes the newest frame of every stream that is due,
+    visiting streams round-robin from where the previous batch stopped so
+    that no stream is starved when there are more streams than
+    ``max_batch``. It preprocesses the frames as one batch and runs one
+    ``predict(images, features)`` call (e.g. ModelService.predict_batch)
+    for all of them. ``max_fps`` caps how often a stream is scored; its
+    reader skips the color conversion of frames the cap would discard
+    anyway. Readers run at ``reader_niceness`` below normal priority so that
+    decoding many streams cannot starve inference. Results are published
+    to every matching Subscription.
+    """
+    def __init__(self, predict: Callable, max_batch: int = 8, max_streams: Optional[int] = None,
+                 preprocessor: Optional[BatchPreprocessor] = None, reader_niceness: int = READER_NICENESS):
+        self.predict = predict
+        self.max_batch = max(1, max_batch)
+        self.max_streams = max_streams
+        self.reader_niceness = reader_niceness
+        self.preprocessor = preprocessor or BatchPreprocessor()
+        self._buffer = self.preprocessor.empty(self.max_batch)
+        self._streams = collections.OrderedDict()
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._stopping = threading.Event()
+        self._cursor = 0
+        self._ids = itertools.count(1)
+        self.published = 0
+        self.batches = 0
+        self.batched_frames = 0
+        self._thread = threading.Thread(target=self._run, name="stream-scheduler", daemon=True)
+        self._thread.start()
+
+    def add_stream(self, source, stream_id: Optional[str] = None, max_fps: Optional[float] = None,
+                   throttle: float = 0.5, speed: float = 20.0, realtime: bool = True, loop: bool = False,
+                   gate: Optional[FrameGate] = None) -> str:
+        """Start reading ``source`` (file, URL or camera index) and return its stream id"""
+        if max_fps is not None and max_fps <= 0:
+            raise ValueError("max_fps must be positive")
+        with self._lock:
+            if self.max_streams is not None and len(self._streams) >= self.max_streams:
+                raise ValueError(f"At most {self.max_streams} streams can be registered")
+            if stream_id is None:
+                stream_id = f"stream-{next(self._ids)}"
+                while stream_id in self._streams:
+                    stream_id = f"stream-{next(self._ids)}"
+            elif stream_id in self._streams:
+                raise ValueError(f"Stream '{stream_id}' already exists")
+            slot = LatestFrameSlot(self._ready)
+            capture = FrameCapture(source, slot, realtime=realtime, loop=loop, max_fps=max_fps,
+                                   niceness=self.reader_niceness, name=f"stream-{stream_id}")
+            self._streams[stream_id] = _Stream(stream_id, source, slot, capture, max_fps, throttle, speed, gate)
+        capture.start()
+        return stream_id
+
+    def remove_stream(self, stream_id: str) -> bool:
+        with self._lock:
+            stream = self._streams.pop(stream_id, None)
+        if stream is None:
+            return False
+        stream.capture.stop()
+        stream.capture.join()
+        return True
+
+    def stream_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._streams)
+
+    def subscribe(self, streams: Optional[Iterable[str]] = None, maxsize: int = SUBSCRIPTION_SIZE) -> Subscription:
+        """Results of ``streams`` (all streams, including ones added later, if None)"""
+        subscription = Subscription(self, streams, maxsize)
+        with self._lock:
+            self._subscribers.append(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription in self._subscribers:
+                self._subscribers.remove(subscription)
+
+    def _publish(self, stream: _Stream, result: StreamResult):
+        stream.meter.tick(result.latency)
+        self.published += 1
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._offer(result)
+
+    def _collect(self, now: float) -> List[tuple]:
+        """Newest frames of the due streams, round-robin from the cursor, up to max_batch"""
+        with self._lock:
+            streams = list(self._streams.values())
+        if not streams:
+            return []
+        start = self._cursor % len(streams)
+        batch = []
+        for offset in range(len(streams)):
+            stream = streams[(start + offset) % len(streams)]
+            if stream.next_due > now:
+                continue
+            item = stream.slot.get(timeout=0)
+            if item is None:
+                continue
+            # Stay on the fps grid unless the stream fell a whole interval behind
+            stream.next_due = stream.next_due + stream.interval if now - stream.next_due < stream.interval \
+                else now + stream.interval
+            if stream.gate is not None and not stream.gate.should_score(item.frame):
+                self._publish(stream, StreamResult(stream.id, item.index, item.captured_at,
+                                                   stream.gate.output(None), now - item.captured_at, 0, True))
+                continue
+            batch.append((stream, item))
+            if len(batch) == self.max_batch:
+                # The next batch starts with the first stream this one could not take
+                self._cursor = (start + offset + 1) % len(streams)
+                return batch
+        self._cursor = (start + 1) % len(streams)
+        return batch
+
+    def _score(self, batch: List[tuple]):
+        try:
+            images = self.preprocessor([item.frame for _, item in batch], bgr=True, out=self._buffer)
+            angles = self.predict(images, [(stream.throttle, stream.speed) for stream, _ in batch])
+            error = None
+        except Exception as e:
+            angles, error = [None] * len(batch), str(e)
+        self.batches += 1
+        self.batched_frames += len(batch)
+        now = time.perf_counter()
+        for (stream, item), angle in zip(batch, angles):
+            if error is not None:
+                stream.errors += 1
+                if stream.gate is not None:
+                    stream.gate.reset()
+            else:
+                stream.scored += 1
+                if stream.gate is not None:
+                    angle = stream.gate.output(angle)
+            self._publish(stream, StreamResult(stream.id, item.index, item.captured_at, angle,
+                                               now - item.captured_at, len(batch), error=error))
+
+    def _next_wakeup(self, now: float) -> float:
+        """Seconds until the earliest capped stream becomes due (bounded, for shutdown checks)"""
+        with self._lock:
+            waiting = [stream.next_due for stream in self._streams.values() if stream.next_due > now]
+        return min([0.1] + [due - now for due in waiting])
+
+    def _run(self):
+        while not self._stopping.is_set():
+            # Cleared before looking, so a frame put during the scan still wakes the next wait
+            self._ready.clear()
+            now = time.perf_counter()
+            batch = self._collect(now)
+            if batch:
+                self._score(batch)
+            else:
+                self._ready.wait(self._next_wakeup(now))
+
+    def stats(self) -> dict:
+        with self._lock:
+            streams = {stream_id: stream.stats() for stream_id, stream in self._streams.items()}
+            subscribers = len(self._subscribers)
+        fps = [stream["fps"] for stream in streams.values() if not stream["finished"]]
+        return {
+            "streams": streams,
+            # Summed per stream: one batch publishes a burst of results, too close together to rate as a whole
+            "aggregate_fps": round(sum(fps), 2),
+            "published": self.published,
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_frames / self.batches, 2) if self.batches else 0.0,
+            # Jain's index over the active streams' rates: 1.0 when every stream is scored equally often
+            "fairness": round(sum(fps) ** 2 / (len(fps) * sum(rate ** 2 for rate in fps)), 3)
+            if fps and any(fps) else None,
+            "subscribers": subscribers
+        }
+
+    def close(self):
+        """Stop the scheduler, every reader and every subscription"""
+        self._stopping.set()
+        self._ready.set()
+        self._thread.join()
+        for stream_id in self.stream_ids():
+            self.remove_stream(stream_id)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.close()
@@ -0,0 +1,348 @@
+import math
+import queue
+import threading
+import time
+from typing import NamedTuple, Optional
+
+import cv2
+import torch
+
+from src.pipeline.gating import FrameGate
+from src.pipeline.preprocessing import BatchPreprocessor
+
+_END = object()  # end-of-stream marker passed between stages
+# Gaps of at least this many frames are skipped by seeking instead of grabbing frame by frame
+SEEK_THRESHOLD = 60
+
+
+class FramePrediction(NamedTuple):
+    index: int
+    timestamp: float
+    steering_angle: Optional[float]
+    error: Optional[str] = None
+    gated: bool = False  # the prediction was reused because the frame had not changed
+
+
+
+class FrameSampler:
+    """Which frames of a video get scored: every ``stride``-th frame in [start_frame, end_frame)"""
+    def __init__(self, stride: int = 1, start_frame: int = 0, end_frame: Optional[int] = None,
+                 seek_threshold: int = SEEK_THRESHOLD):
+        if stride < 1:
+            raise ValueError("stride must be at least 1")
+        if start_frame < 0 or (end_frame is not None and end_frame < start_frame):
+            raise ValueError("Invalid frame range")
+        self.stride = stride
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.seek_threshold = seek_threshold
+
+    @classmethod
+    def from_times(cls, fps: float, stride: int = 1, target_fps: Optional[float] = None,
+                   start_time: Optional[float] = None, end_time: Optional[float] = None):
+        """Build a sampler from a stride, a target output fps and/or a [start_time, end_time) window in seconds"""
+        if (target_fps is not None or start_time is not None or end_time is not None) and not fps:
+            raise ValueError("Video reports no frame rate; only stride sampling is supported")
+        if target_fps is not None:
+            if target_fps <= 0:
+                raise ValueError("target_fps must be positive")
+            stride = max(stride, int(round(fps / target_fps)))
+        if (start_time is not None and start_time < 0) or (end_time is not None and end_time < 0):
+            raise ValueError("start_time and end_time must not be negative")
+        start_frame = int(math.ceil(start_time * fps)) if start_time is not None else 0
+        end_frame = int(math.ceil(end_time * fps)) if end_time is not None else None
+        return cls(stride, start_frame, end_frame)
+
+    def resume_after(self, frame: int) -> "FrameSampler":
+        """The same sampling restricted to the frames after ``frame``, keeping the stride alignment"""
+        start_frame = max(self.start_frame, frame + self.stride)
+        if self.end_frame is not None:
+            start_frame = min(start_frame, self.end_frame)
+        return FrameSampler(self.stride, start_frame, self.end_frame, self.seek_threshold)
+
+    def as_dict(self):
+        return {"stride": self.stride, "start_frame": self.start_frame, "end_frame": self.end_frame}
+
+
+class StageStats:
+    """Frames handled and time spent working (not waiting on queues) by one stage"""
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy_seconds = 0.0
+
+    def add(self, frames, seconds):
+        self.frames += frames
+        self.busy_seconds += seconds
+
+    @property
+    def fps(self):
+        return self.frames / self.busy_seconds if self.busy_seconds > 0 else 0.0
+
+
+class PipelineStats:
+    def __init__(self):
+        self.decode = StageStats("decode")
+        self.preprocess = StageStats("preprocess")
+        self.inference = StageStats("inference")
+        self.skipped_frames = 0  # frames passed over by grab()/seek without being decoded for scoring
+        self.gate = None  # the pipeline's FrameGate, if any
+        self.started = time.perf_counter()
+        self.finished = None
+
+    @property
+    def predicted_frames(self):
+        return self.inference.frames + (self.gate.gated if self.gate is not None else 0)
+
+    @property
+    def wall_seconds(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self):
+        stages = {
+            stage.name: {"frames": stage.frames, "busy_seconds": round(stage.busy_seconds, 4), "fps": round(stage.fps, 2)}
+            for stage in (self.decode, self.preprocess, self.inference)
+        }
+        wall = self.wall_seconds
+        stats = {
+            "stages": stages,
+            "skipped_frames": self.skipped_frames,
+            "wall_seconds": round(wall, 4),
+            # Frames predicted per second, including gated frames that reused a prediction
+            "fps": round(self.predicted_frames / wall, 2) if wall > 0 else 0.0,
+            # The slowest stage bounds the pipeline's throughput
+            "bottleneck": min(stages, key=lambda name: stages[name]["fps"] or float("inf"))
+        }
+        if self.gate is not None:
+            stats["gating"] = self.gate.as_dict()
+        return stats
+
+
+class VideoPipeline:
+    """Three-stage video scoring pipeline: decode -> preprocess -> batched inference
+
+    A decoder thread reads frames from ``capture``, a preprocessing thread
+    groups them into batches of up to ``batch_size`` and turns each batch into
+    one stacked tensor, and the thread iterating over the pipeline runs one
+    forward pass per batch. Stages are connected by bounded queues so a slow
+    stage applies backpressure instead of buffering the whole video.
+
+    Only the frames selected by ``sampler`` are decoded; frames in between are
+    passed over with ``grab()`` (no color conversion or copy), or by seeking
+    when the gap is long.
+
+    Batches are written into a ring of preallocated buffers sized so that a
+    buffer is never reused while it is still queued or being inferred.
+
+    With a ``gate`` (FrameGate), the decoder marks frames that barely changed
+    since the last scored one; they skip preprocessing and inference and
+    get the gate's reused prediction instead.
+    """
+    def __init__(self, model, device, capture, preprocessor: BatchPreprocessor, batch_size: int = 8,
+                 queue_size: int = 4, throttle: float = 0.5, speed: float = 20.0,
+                 sampler: Optional[FrameSampler] = None, gate: Optional[FrameGate] = None):
+        self.model = model
+        self.device = device
+        self.capture = capture
+        self.preprocessor = preprocessor
+        self.batch_size = max(1, batch_size)
+        self.throttle = throttle
+        self.speed = speed
+        self.sampler = sampler or FrameSampler()
+        self.fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.total_frames = max(0, int(capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.gate = gate
+        self.stats = PipelineStats()
+        self.stats.gate = gate
+        self._frames = queue.Queue(maxsize=self.batch_size * queue_size)
+        self._batches = queue.Queue(maxsize=queue_size)
+        # queue_size batches queued + one being filled + one being inferred
+        self._buffers = [preprocessor.empty(self.batch_size) for _ in range(queue_size + 2)]
+        self._next_buffer = 0
+        self._stop = threading.Event()
+        self._threads = []
+
+    def stop(self):
+        self._stop.set()
+
+    def close(self):
+        """Stop the pipeline; the capture is released here only if iteration never started"""
+        self.stop()
+        if not self._threads:
+            self.capture.release()
+
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopped"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _timestamp(self, index):
+        return index / self.fps if self.fps else 0.0
+
+    def _skip(self, position, target):
+        """Advance the capture from ``position`` to ``target`` without decoding; returns False at end of video"""
+        if self.total_frames and target >= self.total_frames:
+            return False
+        if target - position >= self.sampler.seek_threshold and self.capture.set(cv2.CAP_PROP_POS_FRAMES, target):
+            self.stats.skipped_frames += target - position
+            return True
+        while position < target:
+            if self._stop.is_set() or not self.capture.grab():
+                return False
+            position += 1
+            self.stats.skipped_frames += 1
+        return True
+
+    def _decode(self):
+        sampler = self.sampler
+        index = sampler.start_frame
+        try:
+            start = time.perf_counter()
+            ok = self._skip(0, index)
+            self.stats.decode.add(0, time.perf_counter() - start)
+            while ok and not self._stop.is_set():
+                if sampler.end_frame is not None and index >= sampler.end_frame:
+                    break
+                start = time.perf_counter()
+                ret, frame = self.capture.read()
+                if not ret:
+                    break
+                gated = self.gate is not None and not self.gate.should_score(frame)
+                self.stats.decode.add(1, time.perf_counter() - start)
+                if not self._put(self._frames, (index, frame, gated)):
+                    break
+                # Pass over the frames between this one and the next sampled frame
+                target = index + sampler.stride
+                if sampler.end_frame is not None and target >= sampler.end_frame:
+                    break
+                start = time.perf_counter()
+                ok = self._skip(index + 1, target)
+                self.stats.decode.add(0, time.perf_counter() - start)
+                index = target
+        except Exception as e:
+            self._put(self._frames, e)
+        finally:
+            self._put(self._frames, _END)
+
+    def _preprocess_batch(self, items):
+        """Preprocess a batch; if that fails, isolate the bad frames one by one
+
+        Returns ``(images, indices, errors, gated)``, where ``gated`` holds
+        the indices of the frames that are not run through the model.
+        """
+        gated = [index for index, _, skip in items if skip]
+        items = [(index, frame) for index, frame, skip in items if not skip]
+        if not items:
+            return None, [], [], gated
+        frames = [frame for _, frame in items]
+        out = self._buffers[self._next_buffer]
+        self._next_buffer = (self._next_buffer + 1) % len(self._buffers)
+        try:
+            return self.preprocessor(frames, out=out), [index for index, _ in items], [], gated
+        except Exception:
+            tensors, indices, errors = [], [], []
+            for index, frame in items:
+                try:
+                    tensors.append(self.preprocessor([frame])[0])
+                    indices.append(index)
+                except Exception as e:
+                    errors.append((index, str(e)))
+            images = torch.stack(tensors) if tensors else None
+            return images, indices, errors, gated
+
+    def _preprocess(self):
+        done = False
+        try:
+            while not done and not self._stop.is_set():
+                item = self._get(self._frames)
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    self._put(self._batches, item)
+                    break
+                items = [item]
+                # Wait until the batch is full or the decoder reaches the end of the video
+                while len(items) < self.batch_size:
+                    item = self._get(self._frames)
+                    if item is _END or isinstance(item, Exception):
+                        done = True
+                        break
+                    items.append(item)
+                start = time.perf_counter()
+                batch = self._preprocess_batch(items)
+                self.stats.preprocess.add(len(items), time.perf_counter() - start)
+                if not self._put(self._batches, batch):
+                    break
+                if isinstance(item, Exception):
+                    self._put(self._batches, item)
+        finally:
+            self._put(self._batches, _END)
+
+    def _gate_outputs(self, results):
+        """Fill in gated frames and apply the gate's smoothing, in frame order"""
+        outputs = []
+        for result in results:
+            if result.error is not None:
+                outputs.append(result)
+                continue
+            angle = self.gate.output(result.steering_angle)
+            if angle is None:
+                # Gated before any frame was scored successfully
+                outputs.append(result._replace(error="No earlier prediction to reuse"))
+            else:
+                outputs.append(result._replace(steering_angle=angle))
+        return outputs
+
+    def __iter__(self):
+        self._threads = [
+            threading.Thread(target=self._decode, name="pipeline-decode", daemon=True),
+            threading.Thread(target=self._preprocess, name="pipeline-preprocess", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        extra = torch.tensor([[self.throttle, self.speed]], dtype=torch.float32).to(self.device)
+        try:
+            while True:
+                batch = self._get(self._batches)
+                if batch is _END:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                images, indices, errors, gated = batch
+                results = [FramePrediction(index, self._timestamp(index), None, error=message) for index, message in errors]
+                results.extend(FramePrediction(index, self._timestamp(index), None, gated=True) for index in gated)
+                if images is not None:
+                    start = time.perf_counter()
+                    with torch.inference_mode():
+                        outputs = self.model(images.to(self.device), extra.expand(len(indices), -1))
+                    # One device sync per batch instead of one .item() per frame
+                    angles = outputs.squeeze(1).tolist()
+                    self.stats.inference.add(len(indices), time.perf_counter() - start)
+                    results.extend(
+                        FramePrediction(index, self._timestamp(index), angle)
+                        for index, angle in zip(indices, angles)
+                    )
+                if errors or gated:
+                    results.sort(key=lambda result: result.index)
+                if self.gate is not None:
+                    results = self._gate_outputs(results)
+                yield from results
+        finally:
+            self.stop()
+            for thread in self._threads:
+                thread.join()
+            self.capture.release()
+            self.stats.finished = time.perf_counter()
@@ -0,0 +1,260 @@
+"""Train the steering model on CPU from simulator driving logs
+
+Usage: python -m src.train --log jungle/driving_log.csv --log lake/driving_log.csv [--epochs 25]
+       [--batch-size 32] [--accumulate 1] [--workers 2] [--prefetch 2] [--procs 1] [--threads N]
+       [--output data/steering_model.pth]
+
+The logs are packed once into ``--pack-dir`` (see src/dataset/packed.py)
+and streamed from the memory-mapped pack with batched augmentation and
+zero-angle downsampling. ``--procs N`` runs N data-parallel processes on
+this machine (DistributedDataParallel over gloo), splitting the cores
+between them; under ``torchrun`` (RANK/WORLD_SIZE set) the ranks can span
+several nodes instead. Every epoch logs losses, samples/sec and how long
+was spent waiting for data, and the best checkpoint by validation loss is
+saved as a plain state_dict that ModelService.load_model and the desktop
+app load directly.
+"""
+import argparse
+import contextlib
+import os
+import socket
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+import torch.nn as nn
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader, Sampler, random_split
+from torch.utils.data.distributed import DistributedSampler
+
+from src.dataset.augment import ZERO_ANGLE_FRACTION, BatchAugment, zero_angle_sampler
+from src.dataset.packed import PackedDrivingDataset, normalize_batch, pack_driving_log
+from src.model.steering_model import SteeringModel
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", action="append", required=True, help="driving_log.csv to train on (repeatable)")
+    parser.add_argument("--img-dir", action="append", help="IMG folder of each --log (default: next to the log)")
+    parser.add_argument("--pack-dir", default=os.path.join("data", "packed"), help="Packed dataset cache")
+    parser.add_argument("--output", default=os.path.join("data", "steering_model.pth"))
+    parser.add_argument("--epochs", type=int, default=25)
+    parser.add_argument("--batch-size", type=int, default=32, help="Samples per step, per process")
+    parser.add_argument("--accumulate", type=int, default=1, help="Batches per optimizer step")
+    parser.add_argument("--lr", type=float, default=1e-4)
+    parser.add_argument("--val-split", type=float, default=0.2)
+    parser.add_argument("--zero-fraction", type=float, default=ZERO_ANGLE_FRACTION,
+                        help="Sampling weight of zero-angle frames (1 keeps them all)")
+    parser.add_argument("--flip", type=float, default=0.5)
+    parser.add_argument("--brightness", type=float, default=0.0)
+    parser.add_argument("--shift", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=2, help="DataLoader worker processes, per process")
+    parser.add_argument("--prefetch", type=int, default=2, help="Batches each DataLoader worker loads ahead")
+    parser.add_argument("--procs", type=int, default=1, help="Data-parallel processes to start on this machine")
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Torch threads per process (default: available cores / processes)")
+    parser.add_argument("--pretrained", action="store_true", help="Start from ImageNet ResNet-18 weights")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def available_cpus() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS, Windows
+        return os.cpu_count() or 1
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ShardedZeroAngleSampler(Sampler):
+    """zero_angle_sampler split across data-parallel ranks
+
+    Every rank draws the same weighted sample for the epoch (the generator
+    is seeded with ``seed + epoch``) and keeps every ``world_size``-th
+    index, so the shards are disjoint and equally long, which DDP needs to
+    keep the ranks' gradient all-reduces in step.
+    """
+    def __init__(self, angles, zero_fraction: float, rank: int = 0, world_size: int = 1, seed: int = 0):
+        self.generator = torch.Generator()
+        self.sampler = zero_angle_sampler(angles, zero_fraction, generator=self.generator)
+        self.rank = rank
+        self.world_size = world_size
+        self.seed = seed
+        self.epoch = 0
+        self.num_samples = len(self.sampler) // world_size
+
+    def set_epoch(self, epoch: int):
+        self.epoch = epoch
+
+    def __iter__(self):
+        self.generator.manual_seed(self.seed + self.epoch)
+        indices = list(self.sampler)
+        return iter(indices[self.rank:self.num_samples * self.world_size:self.world_size])
+
+    def __len__(self):
+        return self.num_samples
+
+
+def build_loaders(args, dataset, rank, world_size):
+    # Same seed on every rank, so all ranks agree on the split
+    train_set, val_set = random_split(dataset, [1 - args.val_split, args.val_split],
+                                      generator=torch.Generator().manual_seed(args.seed))
+    loader_args = {"batch_size": args.batch_size, "num_workers": args.workers}
+    if args.workers > 0:
+        loader_args.update(persistent_workers=True, prefetch_factor=args.prefetch)
+    train_sampler = ShardedZeroAngleSampler(dataset.angles[train_set.indices], args.zero_fraction,
+                                            rank, world_size, args.seed)
+    augment = BatchAugment(flip=args.flip, brightness=args.brightness, shift=args.shift)
+    train_loader = DataLoader(train_set, sampler=train_sampler, collate_fn=augment, **loader_args)
+    val_sampler = DistributedSampler(val_set, world_size, rank, shuffle=False, drop_last=False)
+    val_loader = DataLoader(val_set, sampler=val_sampler, collate_fn=normalize_batch, **loader_args)
+    return train_loader, val_loader
+
+
+def build_model(pretrained: bool) -> SteeringModel:
+    model = SteeringModel()
+    if pretrained:
+        import torchvision.models as models
+        weights = models.resnet18(weights=models.ResNet18_Weights.DEFAULT).state_dict()
+        # SteeringModel replaces the classifier with its own head
+        model.resnet.load_state_dict({name: tensor for name, tensor in weights.items()
+                                      if not name.startswith("fc.")})
+    return model
+
+
+def train_epoch(model, loader, optimizer, criterion, accumulate):
+    """One pass over ``loader``; returns (summed loss, samples, seconds waiting for data)"""
+    model.train()
+    total_loss, samples, data_seconds = 0.0, 0, 0.0
+    batches = len(loader)
+    optimizer.zero_grad(set_to_none=True)
+    wait_start = time.perf_counter()
+    for step, (images, extra_features, angles) in enumerate(loader, 1):
+        data_seconds += time.perf_counter() - wait_start
+        # The last group of an epoch may be short; it still gets its own step
+        boundary = step % accumulate == 0 or step == batches
+        group = accumulate if step <= batches - batches % accumulate else batches % accumulate
+        # Only all-reduce gradients on the batch that completes a step
+        skip_sync = isinstance(model, DistributedDataParallel) and not boundary
+        with model.no_sync() if skip_sync else contextlib.nullcontext():
+            loss = criterion(model(images, extra_features), angles.unsqueeze(1))
+            (loss / group).backward()
+        if boundary:
+            optimizer.step()
+            optimizer.zero_grad(set_to_none=True)
+        total_loss += loss.item() * len(angles)
+        samples += len(angles)
+        wait_start = time.perf_counter()
+    return total_loss, samples, data_seconds
+
+
+def evaluate(model, loader, criterion):
+    model.eval()
+    total_loss, samples = 0.0, 0
+    with torch.inference_mode():
+        for images, extra_features, angles in loader:
+            total_loss += criterion(model(images, extra_features), angles.unsqueeze(1)).item() * len(angles)
+            samples += len(angles)
+    return total_loss, samples
+
+
+def _all_sum(*values):
+    """Sum numbers over all ranks (identity when not distributed)"""
+    if not dist.is_initialized():
+        return values
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor)
+    return tuple(tensor.tolist())
+
+
+def save_checkpoint(model: SteeringModel, path: str):
+    """Write the plain state_dict the loaders expect, atomically so a crash never leaves half a file"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    torch.save(model.state_dict(), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def train(args, rank: int = 0, world_size: int = 1, local_rank: int = 0):
+    distributed = world_size > 1
+    if distributed:
+        dist.init_process_group("gloo", rank=rank, world_size=world_size)
+    local_procs = int(os.environ.get("LOCAL_WORLD_SIZE", args.procs))
+    threads = args.threads or max(1, available_cpus() // max(1, local_procs))
+    torch.set_num_threads(threads)
+    main = rank == 0
+    try:
+        # One process per machine packs; the others wait for it
+        if local_rank == 0:
+            pack_driving_log(args.log, args.pack_dir, img_dirs=args.img_dir)
+        if distributed:
+            dist.barrier()
+        dataset = PackedDrivingDataset(args.pack_dir)
+        train_loader, val_loader = build_loaders(args, dataset, rank, world_size)
+
+        torch.manual_seed(args.seed)  # identical initial weights on every rank
+        model = build_model(args.pretrained)
+        network = DistributedDataParallel(model) if distributed else model
+        criterion = nn.MSELoss()
+        optimizer = torch.optim.Adam(network.parameters(), lr=args.lr)
+        torch.manual_seed(args.seed + rank)  # but different augmentation per rank
+        if main:
+            print(f"{len(dataset)} samples, {len(train_loader.sampler) * world_size} drawn per epoch, "
+                  f"{world_size} process(es) x {threads} threads, {args.workers} loader workers each, "
+                  f"effective batch {args.batch_size * args.accumulate * world_size}", flush=True)
+
+        best = float("inf")
+        for epoch in range(args.epochs):
+            train_loader.sampler.set_epoch(epoch)
+            start = time.perf_counter()
+            train_loss, train_samples, data_seconds = train_epoch(network, train_loader, optimizer, criterion,
+                                                                  args.accumulate)
+            train_seconds = time.perf_counter() - start
+            val_loss, val_samples = evaluate(model, val_loader, criterion)
+            elapsed = time.perf_counter() - start
+            train_loss, train_samples, val_loss, val_samples = _all_sum(train_loss, train_samples, val_loss,
+                                                                        val_samples)
+            train_loss /= max(1, train_samples)
+            val_loss /= max(1, val_samples)
+            if main:
+                saved = val_loss < best
+                if saved:
+                    best = val_loss
+                    save_checkpoint(model, args.output)
+                print(f"Epoch {epoch}: train loss {train_loss:.5f}, val loss {val_loss:.5f}, "
+                      f"{train_samples / train_seconds:.1f} samples/s, train {train_seconds:.1f}s "
+                      f"(data wait {data_seconds:.1f}s), epoch {elapsed:.1f}s"
+                      f"{', saved ' + args.output if saved else ''}", flush=True)
+    finally:
+        if distributed:
+            dist.destroy_process_group()
+
+
+def _spawned(rank, args, world_size):
+    train(args, rank, world_size, local_rank=rank)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if "WORLD_SIZE" in os.environ:
+        # Launched by torchrun, possibly across several nodes
+        world_size = int(os.environ["WORLD_SIZE"])
+        train(args, int(os.environ["RANK"]), world_size, int(os.environ.get("LOCAL_RANK", 0)))
+    elif args.procs > 1:
+        # Pack before spawning so the processes do not race for the cache
+        pack_driving_log(args.log, args.pack_dir, img_dirs=args.img_dir)
+        os.environ.setdefault("MASTER_ADDR", "127.0.0.1")
+        os.environ.setdefault("MASTER_PORT", str(_free_port()))
+        mp.spawn(_spawned, args=(args, args.procs), nprocs=args.procs)
+    else:
+        train(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,13 @@
 from PyQt5.QtWidgets import QWidget, QPushButton, QLabel, QVBoxLayout, QFileDialog, QHBoxLayout, QFrame, QDial, QSizePolicy
 from PyQt5.QtGui import QImage, QPixmap
 from PyQt5.QtCore import Qt
-import cv2
 import sys
 import torch
+from src.pipeline.gating import FrameGate
 from src.workers.video_worker import VideoWorker
 
 class MainWindow(QWidget):
-    def __init__(self, model, processor, device):
+    def __init__(self, model, processor, device, gate_settings=None):
         super().__init__()
         self.setWindowTitle("Steering Prediction UI")
         self.setMinimumSize(980, 640)
@@ -39,6 +39,7 @@ class MainWindow(QWidget):
         self.model = model
         self.processor = processor
         self.device = device
+        self.gate_settings = gate_settings  # FrameGate arguments; None runs the model on every frame
         self.worker = None
 
         header = QVBoxLayout()
@@ -67,6 +68,9 @@ class MainWindow(QWidget):
         self.device_label = QLabel(f"Device: {'CUDA' if torch.cuda.is_available() else 'CPU'}")
         self.device_label.setObjectName("Pill")
         self.device_label.setAlignment(Qt.AlignLeft)
+        self.stats_label = QLabel("FPS: -- | Latency: -- ms")
+        self.stats_label.setObjectName("Subtitle")
+        self.stats_label.setAlignment(Qt.AlignLeft)
 
         self.gauge = QDial()
         self.gauge.setRange(-30, 30)  # degrees
@@ -86,6 +90,8 @@ class MainWindow(QWidget):
         right_layout.addWidget(self.gauge)
         right_layout.addSpacing(8)
         right_layout.addWidget(self.device_label)
+        right_layout.addSpacing(8)
+        right_layout.addWidget(self.stats_label)
         right_layout.addStretch(1)
         right_card.setLayout(right_layout)
 
@@ -128,9 +134,12 @@ class MainWindow(QWidget):
 
     def start_video(self, source):
         self.stop_video()  # ensure any existing worker is stopped
-        self.worker = VideoWorker(self.model, self.processor, self.device, source)
-        self.worker.frame_signal.connect(self.update_frame)
+        gate = FrameGate(**self.gate_settings) if self.gate_settings else None
+        self.worker = VideoWorker(self.model, self.processor, self.device, source, gate=gate)
+        self.worker.set_display_size(self.video_label.width(), self.video_label.height())
+        self.worker.image_signal.connect(self.update_frame)
         self.worker.prediction_signal.connect(self.update_prediction)
+        self.worker.stats_signal.connect(self.update_stats)
         self.worker.finished.connect(self.on_worker_finished)
         self.worker.start()
         self.stop_btn.setEnabled(True)
@@ -142,13 +151,11 @@ class MainWindow(QWidget):
         if file_path:
             self.start_video(file_path)
 
-    def update_frame(self, frame):
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        height, width, _ = frame.shape
-        bytes_per_line = 3 * width
-        q_img = QImage(frame.data, width, height, bytes_per_line, QImage.Format_RGB888)
-        pix = QPixmap.fromImage(q_img).scaled(self.video_label.size(), Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.video_label.setPixmap(pix)
+    def update_frame(self, image: QImage):
+        # The worker already converted and scaled the frame to the label size
+        self.video_label.setPixmap(QPixmap.fromImage(image))
+        if self.worker is not None:
+            self.worker.image_shown()
 
     def update_prediction(self, pred_value: float):
         angle_deg = float(pred_value) * 30.0
@@ -158,6 +165,28 @@ class MainWindow(QWidget):
         except Exception:
             pass
 
+    def update_stats(self, stats: dict):
+        if stats.get("finished"):
+            # Final counts once the source has ended or was stopped
+            text = (f"Captured {stats['received_frames']} frames, dropped {stats['dropped_frames']} stale frames"
+                    + (f" | Gated: {stats['gated_ratio']:.0%}" if self.gate_settings else ""))
+            if stats["error"] is not None:
+                text = f"{stats['error']}\n{text}"
+            self.stats_label.setText(text)
+            return
+        self.stats_label.setText(
+            f"Capture: {stats['capture_fps']:.1f} fps | Inference: {stats['inference_fps']:.1f} fps "
+            f"({stats['inference_ms']:.0f} ms)\n"
+            f"Display: {stats['display_fps']:.1f} fps | Latency: {stats['latency_ms']:.0f} ms\n"
+            f"Dropped frames: {stats['dropped_frames']}"
+            + (f" | Gated: {stats['gated_ratio']:.0%}" if self.gate_settings else "")
+        )
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.worker is not None:
+            self.worker.set_display_size(self.video_label.width(), self.video_label.height())
+
     def on_worker_finished(self):
         self.stop_btn.setEnabled(False)
         self.webcam_btn.setEnabled(True)
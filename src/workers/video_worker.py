@@ -1,35 +1,129 @@
 from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QImage
 import cv2
-import numpy as np
-import torch  # added torch import for inference context
+import time
+import torch
+from src.pipeline.gating import FrameGate
+from src.pipeline.live import FrameCapture, LatestFrameSlot, RateMeter
+
+# Seconds between stats_signal updates
+STATS_INTERVAL = 0.5
 
 class VideoWorker(QThread):
-    frame_signal = pyqtSignal(np.ndarray)  # existing: frame with overlay
-    prediction_signal = pyqtSignal(float)  # new: emit raw steering prediction
+    """Inference thread of the desktop app: always scores the newest captured frame
+
+    A FrameCapture thread reads the source into a single-slot mailbox; this
+    thread takes the latest frame, predicts, draws the overlay and converts
+    and scales the result to the display size, so the GUI thread only has
+    to show a ready QImage. Frames that arrive while inference is busy are
+    dropped instead of queued, and a new image is only emitted once the GUI
+    has shown the previous one, so neither latency nor memory grows when
+    inference is slower than the source.
 
-    def __init__(self, model, processor, device, source):
+    With a ``gate`` (FrameGate), frames that barely changed since the last
+    scored one reuse its prediction instead of running the model.
+    """
+    image_signal = pyqtSignal(QImage)  # frame with overlay, display-sized RGB
+    prediction_signal = pyqtSignal(float)  # raw steering prediction
+    stats_signal = pyqtSignal(dict)  # capture/inference/display fps, latency, drop counts and gated share;
+                                     # the last one has finished=True, the frame total and any capture error
+
+    def __init__(self, model, processor, device, source, throttle=0.5, speed=20.0, gate: FrameGate = None):
         super().__init__()
         self.model = model
         self.processor = processor
         self.device = device
         self.source = source
+        self.throttle = throttle
+        self.speed = speed
+        self.gate = gate
         self.running = False
+        self.capture = None
+        self.display_size = (640, 360)
+        self._image_pending = False
+        self.skipped_images = 0
+
+    def set_display_size(self, width, height):
+        """Called from the GUI thread when the video area is resized"""
+        self.display_size = (max(1, width), max(1, height))
+
+    def image_shown(self):
+        """Called from the GUI thread once it has displayed the last emitted image"""
+        self._image_pending = False
+
+    def _predict(self, frame):
+        input_tensor, extra_features = self.processor.process_frame(frame, self.throttle, self.speed)
+        with torch.inference_mode():
+            return float(self.model(input_tensor, extra_features).item())
+
+    def _render(self, frame):
+        """Scale to fit the display area and convert to an RGB QImage, off the GUI thread"""
+        height, width = frame.shape[:2]
+        target_width, target_height = self.display_size
+        scale = min(target_width / width, target_height / height)
+        if scale != 1.0:
+            size = (max(1, int(width * scale)), max(1, int(height * scale)))
+            frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA if scale < 1 else cv2.INTER_LINEAR)
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = rgb.shape[:2]
+        # copy() detaches the image from the numpy buffer before it crosses threads
+        return QImage(rgb.data, width, height, 3 * width, QImage.Format_RGB888).copy()
 
     def run(self):
         self.running = True
-        cap = cv2.VideoCapture(self.source)
-        while self.running and cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            input_tensor, extra_features = self.processor.process_frame(frame)
-            with torch.no_grad():
-                pred = self.model(input_tensor, extra_features).item()
-            processed_frame = self.processor.visualize_steering(frame.copy(), pred)  # overlay the steering
-            self.prediction_signal.emit(float(pred))  # emit raw prediction separately
-            self.frame_signal.emit(processed_frame)   # emit frame last to keep UI smooth
-
-        cap.release()
+        slot = LatestFrameSlot()
+        self.capture = FrameCapture(self.source, slot)
+        self.capture.start()
+        inference = RateMeter()
+        display = RateMeter()
+        last_stats = time.perf_counter()
+        try:
+            while self.running:
+                item = slot.get(timeout=0.1)
+                if item is None:
+                    if slot.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                if self.gate is None:
+                    steering_angle = self._predict(item.frame)
+                elif self.gate.should_score(item.frame):
+                    steering_angle = self.gate.output(self._predict(item.frame))
+                else:
+                    steering_angle = self.gate.output(None)
+                processed_frame = self.processor.visualize_steering(item.frame, steering_angle)  # overlay the steering
+                image = self._render(processed_frame)
+                now = time.perf_counter()
+                inference.tick(now - start, now=now)
+                self.prediction_signal.emit(steering_angle)
+                if self._image_pending:
+                    self.skipped_images += 1
+                else:
+                    self._image_pending = True
+                    display.tick(now - item.captured_at, now=now)  # capture-to-display latency
+                    self.image_signal.emit(image)
+                if now - last_stats >= STATS_INTERVAL:
+                    last_stats = now
+                    self.stats_signal.emit(self._stats(slot, inference, display))
+        finally:
+            self.capture.stop()
+            self.capture.join()
+            self.stats_signal.emit(dict(self._stats(slot, inference, display), finished=True,
+                                        received_frames=slot.received, error=self.capture.error))
+
+    def _stats(self, slot, inference, display):
+        return {
+            "capture_fps": self.capture.meter.rate,
+            "inference_fps": inference.rate,
+            "display_fps": display.rate,
+            "inference_ms": inference.mean * 1000.0,
+            "latency_ms": display.mean * 1000.0,
+            "dropped_frames": slot.dropped,
+            "skipped_images": self.skipped_images,
+            "gated_ratio": self.gate.skip_ratio if self.gate is not None else 0.0
+        }
 
     def stop(self):
         self.running = False
+        if self.capture is not None:
+            self.capture.stop()